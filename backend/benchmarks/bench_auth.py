@@ -0,0 +1,99 @@
+"""
+Benchmark: per-request authentication overhead with and without the user cache.
+
+Authenticates requests the way current_active_user does (token from the
+Authorization header, then the user by ID) against a simulated database that
+charges a fixed round-trip latency per read. Compares reading the user on
+every request with the in-process user cache, for requests one after another
+and for bursts of parallel requests from the same client (a sidebar load).
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_auth --latency-ms 1 --requests 2000 --burst 30
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from beanie import PydanticObjectId
+from starlette.requests import Request
+
+from src.auth.services import create_jwt_token, get_current_user
+from src.user.cache import UserCache
+from src.user.schema import User
+
+
+class SimulatedUsers:
+    """Answers user reads from memory, sleeping once per read."""
+
+    def __init__(self, users: List[User], latency: float):
+        self.users = {str(user.id): user for user in users}
+        self.latency = latency
+        self.reads = 0
+
+    async def fetch(self, user_id: str) -> Optional[User]:
+        self.reads += 1
+        await asyncio.sleep(self.latency)
+        return self.users.get(user_id)
+
+
+def make_request(token: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/connections/workspace/x",
+        "headers": [(b"authorization", f"Bearer {token}".encode("ascii"))],
+    })
+
+
+async def authenticate(request: Request, load: Callable[[str], Awaitable[Optional[User]]]) -> User:
+    return await load(get_current_user(request))
+
+
+async def measure(
+    requests: List[Request],
+    load: Callable[[str], Awaitable[Optional[User]]],
+    burst: int
+) -> float:
+    """Authenticate all requests, ``burst`` at a time; return seconds per request."""
+    started = time.perf_counter()
+    for start in range(0, len(requests), burst):
+        await asyncio.gather(*(authenticate(request, load) for request in requests[start:start + burst]))
+    return (time.perf_counter() - started) / len(requests)
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    users = [
+        User.model_construct(id=PydanticObjectId(), first_name="Ada", last_name="Lovelace", email=f"user{i}@example.com")
+        for i in range(args.users)
+    ]
+    tokens = [create_jwt_token({"user_id": str(user.id), "user_email": user.email}) for user in users]
+    # Each client sends its requests together, as the frontend does
+    requests = [make_request(tokens[(i // args.burst) % len(tokens)]) for i in range(args.requests)]
+
+    print(f"{args.requests} requests from {args.users} users, {args.latency_ms} ms per database read")
+    print(f"{'mode':>22} | {'burst':>5} | {'us/request':>10} | {'db reads':>8} | {'hit rate':>8}")
+    print("-" * 66)
+    for burst in (1, args.burst):
+        database = SimulatedUsers(users, args.latency_ms / 1000)
+        seconds = await measure(requests, database.fetch, burst)
+        print(f"{'database every time':>22} | {burst:>5} | {seconds * 1e6:>10.1f} | {database.reads:>8} | {'-':>8}")
+
+        database = SimulatedUsers(users, args.latency_ms / 1000)
+        cache = UserCache(max_entries=args.users, ttl=60)
+        seconds = await measure(requests, lambda user_id: cache.get_or_load(user_id, database.fetch), burst)
+        print(f"{'user cache':>22} | {burst:>5} | {seconds * 1e6:>10.1f} | {database.reads:>8} | "
+              f"{cache.stats()['hitRate']:>8.2%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated database round trip")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=30, help="Parallel requests per client")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
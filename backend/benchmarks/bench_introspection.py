@@ -0,0 +1,113 @@
+"""
+Benchmark: per-table (N+1) schema introspection vs. the set-based introspection engine.
+
+Runs both strategies against a simulated MySQL cursor that charges a fixed
+round-trip latency per query, over synthetic schemas of 10, 1k and 10k tables.
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_introspection --latency-ms 2 --sizes 10 1000 10000
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from src.connections.handlers.mysql import introspect_mysql_schema, map_mysql_type
+from src.connections.schema import ColumnSchema, TableSchema
+
+
+COLUMN_TYPES = ["int", "varchar", "datetime", "decimal", "text", "bigint"]
+
+
+class SimulatedCursor:
+    """Answers the introspection queries from an in-memory schema, sleeping once per execute."""
+
+    def __init__(self, tables: Dict[str, List[Tuple[str, str, str, str, str]]], latency: float):
+        self.tables = tables
+        self.latency = latency
+        self.queries = 0
+        self._rows: List[tuple] = []
+
+    def execute(self, sql: str, params: tuple = ()):
+        self.queries += 1
+        time.sleep(self.latency)
+        if sql.startswith("SHOW TABLES"):
+            self._rows = [(name,) for name in self.tables]
+        elif "KEY_COLUMN_USAGE" in sql and "c.TABLE_NAME" in sql:
+            # Legacy per-table query: COLUMNS joined with KEY_COLUMN_USAGE
+            columns = self.tables[params[1]]
+            self._rows = [(col, dtype, "YES", key, "", ref_t, ref_c) for col, dtype, key, ref_t, ref_c in columns]
+        elif "KEY_COLUMN_USAGE" in sql:
+            self._rows = [
+                (table, col, ref_t, ref_c)
+                for table, columns in self.tables.items()
+                for col, _, _, ref_t, ref_c in columns if ref_t
+            ]
+        else:
+            self._rows = [
+                (table, col, dtype, key)
+                for table, columns in self.tables.items()
+                for col, dtype, key, _, _ in columns
+            ]
+
+    def fetchall(self):
+        return self._rows
+
+
+def make_schema(table_count: int, columns_per_table: int = 12):
+    """Build a synthetic schema where every table after the first references its predecessor."""
+    tables = {}
+    for t in range(table_count):
+        columns = [("id", "int", "PRI", None, None)]
+        if t > 0:
+            columns.append(("parent_id", "int", "MUL", f"table_{t - 1:05d}", "id"))
+        for c in range(len(columns), columns_per_table):
+            columns.append((f"col_{c}", COLUMN_TYPES[c % len(COLUMN_TYPES)], "", None, None))
+        tables[f"table_{t:05d}"] = columns
+    return tables
+
+
+def legacy_introspection(cursor, database_name: str) -> Dict[str, TableSchema]:
+    """The original SHOW TABLES + one query per table strategy, without its logging."""
+    cursor.execute(f"SHOW TABLES FROM `{database_name}`")
+    tables = [table[0] for table in cursor.fetchall()]
+    schema_dict = {}
+    for table_name in tables:
+        cursor.execute("""SELECT ... FROM INFORMATION_SCHEMA.COLUMNS c
+            LEFT JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu ...
+            WHERE c.TABLE_SCHEMA = %s AND c.TABLE_NAME = %s""", (database_name, table_name))
+        columns = [
+            ColumnSchema(
+                name=column_name,
+                type=map_mysql_type(data_type),
+                isPrimary=column_key == "PRI",
+                referenceTable=ref_table,
+                referenceColumn=ref_column
+            )
+            for column_name, data_type, _, column_key, _, ref_table, ref_column in cursor.fetchall()
+        ]
+        schema_dict[f"{database_name}.{table_name}"] = TableSchema(
+            name=table_name, database_schema=database_name, columns=columns
+        )
+    return schema_dict
+
+
+def run(sizes: List[int], latency_ms: float) -> None:
+    print(f"{'tables':>8} {'strategy':>10} {'queries':>8} {'seconds':>10}")
+    for size in sizes:
+        tables = make_schema(size)
+        results = {}
+        for label, strategy in (("n+1", legacy_introspection), ("bulk", introspect_mysql_schema)):
+            cursor = SimulatedCursor(tables, latency_ms / 1000)
+            started = time.perf_counter()
+            results[label] = strategy(cursor, "bench")
+            elapsed = time.perf_counter() - started
+            print(f"{size:>8} {label:>10} {cursor.queries:>8} {elapsed:>10.3f}")
+        assert results["n+1"] == results["bulk"], "strategies disagree on the resulting schema"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated round trip per query")
+    args = parser.parse_args()
+    run(args.sizes, args.latency_ms)
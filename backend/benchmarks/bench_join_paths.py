@@ -0,0 +1,82 @@
+"""
+Benchmark: foreign key graph build time and join path query latency.
+
+Builds a synthetic schema where every table has a few foreign keys to random
+other tables (so the graph is full of cycles and most tables are a handful of
+joins apart) and times shortest-path queries between two random tables and
+join trees over several random tables.
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_join_paths --tables 10000 --foreign-keys 3
+"""
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+
+from src.connections.joins import ForeignKeyGraph
+from src.connections.schema import ColumnSchema
+
+
+def make_tables(table_count: int, foreign_keys: int, seed: int = 7) -> List[Tuple[str, str, str, List[ColumnSchema]]]:
+    rng = random.Random(seed)
+    tables = []
+    for i in range(table_count):
+        columns = [ColumnSchema(name="id", type="int", isPrimary=True)]
+        for j in range(foreign_keys):
+            columns.append(ColumnSchema(
+                name=f"fk_{j}",
+                type="int",
+                referenceTable=f"t_{rng.randrange(table_count)}",
+                referenceColumn="id"
+            ))
+        tables.append((f"app.t_{i}", "app", f"t_{i}", columns))
+    return tables
+
+
+def time_queries(query: Callable[[], object], iterations: int) -> Tuple[float, float, float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        query()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    p99 = samples[min(int(0.99 * len(samples)), len(samples) - 1)]
+    return mean, p99, samples[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=10000)
+    parser.add_argument("--foreign-keys", type=int, default=3, help="foreign keys per table")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    tables = make_tables(args.tables, args.foreign_keys)
+    started = time.perf_counter()
+    graph = ForeignKeyGraph(tables)
+    build_seconds = time.perf_counter() - started
+    print(f"{args.tables} tables, {len(graph.edges)} foreign keys; built in {build_seconds * 1000:.0f} ms")
+
+    rng = random.Random(11)
+    keys = graph.keys
+
+    def random_keys(count: int) -> List[str]:
+        return rng.sample(keys, count)
+
+    queries = [
+        ("2 tables, 1 path", lambda: graph.shortest_paths(*random_keys(2), limit=1)),
+        ("2 tables, 5 paths", lambda: graph.shortest_paths(*random_keys(2), limit=5)),
+        ("3-table tree", lambda: graph.steiner_tree(random_keys(3))),
+        ("6-table tree", lambda: graph.steiner_tree(random_keys(6))),
+    ]
+    print(f"{'query':>18} | {'mean ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 51)
+    for label, query in queries:
+        mean, p99, worst = time_queries(query, args.iterations)
+        print(f"{label:>18} | {mean * 1000:>8.3f} | {p99 * 1000:>8.3f} | {worst * 1000:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark: outbound cost of the Google OAuth calls of a login, with a client
+per call versus the shared pooled client.
+
+Runs a local stub OAuth server (token and userinfo endpoints) behind a TCP
+proxy that simulates the network: every new connection waits
+``--handshake-ms`` (TCP plus TLS handshakes to Google are a few round trips)
+and every request waits ``--rtt-ms``. Each login exchanges a code for a token
+and fetches the profile, through the real exchange_code_for_token and
+fetch_google_user_profile for the shared client, and through a fresh
+httpx.AsyncClient per call as before.
+
+The stub speaks HTTP/1.1 without TLS, so the shared client runs HTTP/1.1
+here; against Google it negotiates HTTP/2 when h2 is installed.
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_oauth_client --logins 200 --concurrency 10 --rtt-ms 20 --handshake-ms 60
+"""
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+from typing import Awaitable, Callable, List
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+async def token_endpoint(request: Request) -> JSONResponse:
+    form = await request.form()
+    return JSONResponse({"access_token": f"stub-{form['code']}", "expires_in": 3599, "token_type": "Bearer"})
+
+
+async def userinfo_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse({
+        "given_name": "Ada",
+        "family_name": "Lovelace",
+        "email": "ada@example.com",
+        "picture": "https://example.com/ada.png",
+    })
+
+
+stub_app = Starlette(routes=[
+    Route("/token", token_endpoint, methods=["POST"]),
+    Route("/userinfo", userinfo_endpoint),
+])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+class LatencyProxy:
+    """Forwards TCP connections to the stub, delaying new connections and requests."""
+
+    def __init__(self, target_port: int, handshake: float, rtt: float):
+        self.target_port = target_port
+        self.handshake = handshake
+        self.rtt = rtt
+        self.connections = 0
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            await asyncio.sleep(self.handshake)
+            server_reader, server_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+            await asyncio.gather(
+                self.pipe(client_reader, server_writer, self.rtt),
+                self.pipe(server_reader, client_writer, 0),
+                return_exceptions=True,
+            )
+        except asyncio.CancelledError:
+            # Kept-alive connections are still open when the benchmark ends
+            client_writer.close()
+
+    @staticmethod
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        self.server.close()
+
+
+async def login_with_fresh_clients(base_url: str, code: str) -> None:
+    """The login's outbound calls as they were: a new client, and connection, per call."""
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f"{base_url}/token", data={"code": code, "grant_type": "authorization_code"})
+        access_token = response.json()["access_token"]
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}/userinfo", headers={"Authorization": f"Bearer {access_token}"})
+        response.json()
+
+
+async def measure(logins: int, concurrency: int, login: Callable[[str], Awaitable[None]]) -> List[float]:
+    """Run ``logins`` logins, ``concurrency`` at a time; return each login's seconds."""
+    durations: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await login(f"code-{i}")
+            durations.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(timed(i) for i in range(logins)))
+    return sorted(durations)
+
+
+def percentile(durations: List[float], fraction: float) -> float:
+    return durations[min(len(durations) - 1, int(len(durations) * fraction))]
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    stub = start_stub_server(free_port())
+    proxy = LatencyProxy(stub.config.port, args.handshake_ms / 1000, args.rtt_ms / 1000)
+    base_url = f"http://127.0.0.1:{await proxy.start()}"
+
+    # The endpoints are read from settings, which are loaded on first import
+    os.environ["GOOGLE_OAUTH_TOKEN_URL"] = f"{base_url}/token"
+    os.environ["GOOGLE_OAUTH_USERINFO_URL"] = f"{base_url}/userinfo"
+    from src.auth.http import http_client
+    from src.auth.services import exchange_code_for_token, fetch_google_user_profile
+
+    async def login_with_shared_client(code: str) -> None:
+        access_token = await exchange_code_for_token(code, "client-id", "client-secret", "http://localhost/callback")
+        await fetch_google_user_profile(access_token)
+
+    print(f"{args.logins} logins, {args.concurrency} at a time, "
+          f"{args.rtt_ms} ms per request, {args.handshake_ms} ms per new connection")
+    print(f"{'client':>14} | {'p50 ms':>8} | {'p95 ms':>8} | {'logins/s':>8} | {'connections':>11}")
+    print("-" * 62)
+    for name, login in (
+        ("per call", lambda code: login_with_fresh_clients(base_url, code)),
+        ("shared", login_with_shared_client),
+    ):
+        proxy.connections = 0
+        started = time.perf_counter()
+        durations = await measure(args.logins, args.concurrency, login)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>14} | {percentile(durations, 0.5) * 1000:>8.1f} | {percentile(durations, 0.95) * 1000:>8.1f} | "
+              f"{args.logins / elapsed:>8.1f} | {proxy.connections:>11}")
+
+    await http_client.close()
+    await proxy.close()
+    stub.should_exit = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="Simulated round trip per request")
+    parser.add_argument("--handshake-ms", type=float, default=60.0, help="Simulated TCP and TLS setup per connection")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Load test: query latency of a light workspace while a heavy workspace saturates the governor.
+
+A heavy workspace runs many concurrent clients in a closed loop, each issuing
+queries back to back, enough to keep every slot busy and a long queue waiting.
+A light workspace issues one short query at a time. Queries are simulated with
+asyncio.sleep, so only the scheduling is measured. The light workspace's
+latency (queue wait + run time) is reported for:
+
+- alone: the light workspace with no competition
+- fifo: the heavy workspace running, waiters served in arrival order
+- wfq: the heavy workspace running, with the governor's weighted fair queuing
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_scheduler --slots 4 --heavy-clients 64 --seconds 5
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+from src.connections.governor import QueryGovernor
+
+
+class FifoGovernor(QueryGovernor):
+    """The same governor with arrival order as the only scheduling criterion."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._arrivals = itertools.count()
+
+    def _next_tag(self, workspace_id: str) -> Tuple[float, float]:
+        arrival = float(next(self._arrivals))
+        return arrival, arrival
+
+
+def make_governor(kind: str, slots: int) -> QueryGovernor:
+    governor_class = FifoGovernor if kind == "fifo" else QueryGovernor
+    # One workspace may use every slot, so the heavy one can saturate the system
+    return governor_class(
+        max_running=slots,
+        max_per_connection=slots,
+        max_per_workspace=slots,
+        max_queued=100_000,
+        queue_timeout=600,
+        statement_timeout=0,
+    )
+
+
+async def run_query(governor: QueryGovernor, workspace_id: str, service_time: float) -> float:
+    started = time.perf_counter()
+    ticket = await governor.admit(f"{workspace_id}-connection", workspace_id, "user")
+    try:
+        await asyncio.sleep(service_time)
+    finally:
+        governor.release(ticket)
+    return time.perf_counter() - started
+
+
+async def heavy_client(governor: QueryGovernor, service_time: float, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        await run_query(governor, "heavy", service_time)
+
+
+async def light_client(
+    governor: QueryGovernor,
+    service_time: float,
+    think_time: float,
+    stop: asyncio.Event,
+    latencies: List[float]
+) -> None:
+    while not stop.is_set():
+        latencies.append(await run_query(governor, "light", service_time))
+        await asyncio.sleep(think_time)
+
+
+async def run_scenario(
+    kind: Optional[str],
+    slots: int,
+    heavy_clients: int,
+    seconds: float,
+    heavy_service: float,
+    light_service: float,
+    think_time: float
+) -> List[float]:
+    governor = make_governor(kind or "wfq", slots)
+    stop = asyncio.Event()
+    latencies: List[float] = []
+
+    tasks = [asyncio.create_task(light_client(governor, light_service, think_time, stop, latencies))]
+    if kind is not None:
+        tasks += [
+            asyncio.create_task(heavy_client(governor, heavy_service, stop))
+            for _ in range(heavy_clients)
+        ]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=4, help="concurrent query slots")
+    parser.add_argument("--heavy-clients", type=int, default=64, help="concurrent clients of the heavy workspace")
+    parser.add_argument("--seconds", type=float, default=5, help="duration of each scenario")
+    parser.add_argument("--heavy-ms", type=float, default=40, help="run time of a heavy query")
+    parser.add_argument("--light-ms", type=float, default=10, help="run time of a light query")
+    parser.add_argument("--think-ms", type=float, default=20, help="pause between light queries")
+    args = parser.parse_args()
+
+    print(f"{args.slots} slots, {args.heavy_clients} heavy clients x {args.heavy_ms:g} ms, "
+          f"light queries of {args.light_ms:g} ms every {args.think_ms:g} ms")
+    print(f"{'scenario':>10} | {'queries':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 66)
+    for label, kind in (("alone", None), ("fifo", "fifo"), ("wfq", "wfq")):
+        latencies = asyncio.run(run_scenario(
+            kind,
+            args.slots,
+            args.heavy_clients,
+            args.seconds,
+            args.heavy_ms / 1000,
+            args.light_ms / 1000,
+            args.think_ms / 1000,
+        ))
+        print(f"{label:>10} | {len(latencies):>8} | {percentile(latencies, 0.50) * 1000:>8.1f} | "
+              f"{percentile(latencies, 0.95) * 1000:>8.1f} | {percentile(latencies, 0.99) * 1000:>8.1f} | "
+              f"{max(latencies) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: schema context builder index build time and per-question latency.
+
+Builds a synthetic schema with word-based table names, shared columns and
+foreign keys to random other tables, then times context building for a few
+questions, uncached and memoized, and reports how much of the full schema
+text the context replaces.
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_schema_context --tables 10000 --max-tokens 2000
+"""
+import argparse
+import random
+import time
+from typing import List, Optional, Tuple
+
+from src.connections.context import BYTES_PER_TOKEN, SchemaContextIndex
+from src.connections.joins import ForeignKeyGraph
+from src.connections.schema import ColumnSchema
+
+
+WORDS = [
+    "customer", "order", "invoice", "payment", "product", "inventory", "shipment", "account",
+    "employee", "office", "supplier", "warehouse", "campaign", "session", "event", "audit",
+    "ledger", "refund", "discount", "category", "review", "address", "contract", "subscription",
+]
+SHARED_COLUMNS = [
+    ("id", "int"), ("created_at", "datetime"), ("updated_at", "datetime"), ("status", "varchar"),
+    ("name", "varchar"), ("amount", "decimal"), ("is_active", "boolean"), ("description", "varchar"),
+]
+QUESTIONS = [
+    "total payments per customer last month",
+    "which warehouses hold the most inventory of each product category",
+    "refunds for invoices of suspended subscriptions",
+    "custmer adress changes",  # typos
+    "how many rows are there",  # nothing schema specific
+]
+
+
+def make_tables(table_count: int, seed: int = 7) -> List[Tuple[str, str, List[ColumnSchema], Optional[int]]]:
+    rng = random.Random(seed)
+    names = [f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}" for i in range(table_count)]
+
+    tables = []
+    for name in names:
+        columns = [ColumnSchema(name=column, type=column_type, isPrimary=column == "id")
+                   for column, column_type in SHARED_COLUMNS]
+        for _ in range(3):
+            target = rng.choice(names)
+            columns.append(ColumnSchema(name=f"{target}_id", type="int", referenceTable=target, referenceColumn="id"))
+        tables.append((f"app.{name}", name, columns, rng.choice([None, rng.randrange(10 ** rng.randrange(1, 9))])))
+    return tables
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=10000)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    tables = make_tables(args.tables)
+    started = time.perf_counter()
+    index = SchemaContextIndex([(key, columns, row_count) for key, _, columns, row_count in tables])
+    graph = ForeignKeyGraph([(key, "app", name, columns) for key, name, columns, _ in tables])
+    build_seconds = time.perf_counter() - started
+    full_bytes = sum(len(index._render_table(table_id, None)) + 1 for table_id in range(len(index.keys)))
+    print(f"{args.tables} tables, {len(index.vocabulary)} words; built in {build_seconds * 1000:.0f} ms; "
+          f"full schema text {full_bytes / 1024:.0f} KiB")
+
+    max_bytes = args.max_tokens * BYTES_PER_TOKEN
+    print(f"{'question':>45} | {'tables':>6} | {'bytes':>6} | {'cold ms':>8} | {'memo us':>8}")
+    print("-" * 86)
+    for question in QUESTIONS:
+        cold = []
+        for _ in range(args.iterations):
+            index._memo.clear()
+            started = time.perf_counter()
+            context = index.build_context(question, graph, max_bytes)
+            cold.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            index.build_context(question, graph, max_bytes)
+        memo = (time.perf_counter() - started) / args.iterations
+        print(f"{question[:45]:>45} | {len(context['tables']):>6} | {context['bytes']:>6} | "
+              f"{sum(cold) / len(cold) * 1000:>8.2f} | {memo * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
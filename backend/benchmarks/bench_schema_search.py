@@ -0,0 +1,94 @@
+"""
+Benchmark: schema search index build time and query latency.
+
+Builds a synthetic schema with realistic naming (word-based table names,
+shared column names like ``id``/``created_at`` plus foreign keys named after
+other tables) and times prefix, fuzzy and type-filter queries against it.
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_schema_search --tables 10000 --columns 12
+"""
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from src.connections.schema import ColumnSchema
+from src.connections.search import SchemaSearchIndex
+
+
+WORDS = [
+    "customer", "order", "invoice", "payment", "product", "inventory", "shipment", "account",
+    "employee", "office", "supplier", "warehouse", "campaign", "session", "event", "audit",
+    "ledger", "refund", "discount", "category", "review", "address", "contract", "subscription",
+]
+SHARED_COLUMNS = [
+    ("id", "int"), ("created_at", "datetime"), ("updated_at", "datetime"), ("status", "varchar"),
+    ("name", "varchar"), ("amount", "decimal"), ("is_active", "boolean"), ("metadata", "json"),
+    ("description", "varchar"), ("deleted_at", "datetime"), ("version", "int"), ("checksum", "binary"),
+]
+QUERIES = [
+    ("prefix table", {"query": "cust"}),
+    ("prefix column", {"query": "created", "kind": "column"}),
+    ("exact shared column", {"query": "id", "kind": "column"}),
+    ("fuzzy typo", {"query": "custmer_ordr"}),
+    ("fuzzy column", {"query": "invoce_id", "kind": "column"}),
+    ("type only", {"column_type": "datetime"}),
+    ("prefix + type", {"query": "upd", "column_type": "datetime"}),
+    ("no match", {"query": "zzqxv"}),
+]
+
+
+def make_tables(table_count: int, columns_per_table: int, seed: int = 7) -> List[Tuple[str, str, List[ColumnSchema]]]:
+    rng = random.Random(seed)
+    names = []
+    for i in range(table_count):
+        names.append(f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}")
+
+    tables = []
+    for i, name in enumerate(names):
+        columns = [ColumnSchema(name=column, type=column_type, isPrimary=column == "id")
+                   for column, column_type in SHARED_COLUMNS[:columns_per_table]]
+        # Foreign keys named after a few other tables
+        for _ in range(3):
+            columns.append(ColumnSchema(name=f"{rng.choice(names)}_id", type="int"))
+        tables.append((f"app.{name}", name, columns))
+    return tables
+
+
+def time_query(index: SchemaSearchIndex, params: dict, iterations: int) -> Tuple[float, float, int]:
+    samples = []
+    results = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        results = len(index.search(limit=20, **params))
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    p99 = samples[min(int(0.99 * len(samples)), len(samples) - 1)]
+    return mean, p99, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=12, help="shared columns per table (max 12)")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    tables = make_tables(args.tables, args.columns)
+    started = time.perf_counter()
+    index = SchemaSearchIndex(tables)
+    build_seconds = time.perf_counter() - started
+    print(f"{args.tables} tables, {len(index.entries) - args.tables} columns, "
+          f"{len(index.names)} distinct names; built in {build_seconds * 1000:.0f} ms")
+
+    print(f"{'query':>20} | {'results':>7} | {'mean us':>8} | {'p99 us':>8}")
+    print("-" * 53)
+    for label, params in QUERIES:
+        mean, p99, results = time_query(index, params, args.iterations)
+        print(f"{label:>20} | {results:>7} | {mean * 1e6:>8.1f} | {p99 * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
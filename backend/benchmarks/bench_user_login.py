@@ -0,0 +1,156 @@
+"""
+Benchmark: the login path's user lookup at scale, before and after the
+normalized-email index and the atomic upsert.
+
+Seeds a scratch database with ``--users`` users (1M by default), then logs in
+existing and new users:
+
+- ``find + insert``: the old path, find_one on an unindexed email followed by
+  an insert when there is no user (a collection scan per login)
+- ``upsert``: get_or_create_user, one find_one_and_update with upsert on the
+  unique normalized_email index
+
+and reports latency, documents examined per lookup (explain) and how many
+users a burst of concurrent first logins with one email leaves behind.
+
+Needs a MongoDB server; the scratch database is dropped before and after.
+
+Usage (from the backend directory, with the app's .env available):
+    python -m benchmarks.bench_user_login --mongo-uri mongodb://localhost:27017 --users 1000000 --logins 200
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List
+
+import motor.motor_asyncio
+from beanie import init_beanie
+
+from src.user.crud import get_or_create_user
+from src.user.schema import User, UserCreate, normalize_email
+
+SEED_BATCH_SIZE = 10_000
+
+
+def user_email(i: int) -> str:
+    # Mixed case, as providers return them
+    return f"User{i}@Example.com"
+
+
+def user_profile(email: str) -> UserCreate:
+    return UserCreate(first_name="Ada", last_name="Lovelace", email=email)
+
+
+async def seed(collection, users: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, users, SEED_BATCH_SIZE):
+        await collection.insert_many([
+            {
+                "first_name": "Ada",
+                "last_name": "Lovelace",
+                "email": user_email(i),
+                "normalized_email": normalize_email(user_email(i)),
+                "profile_url": None,
+                "created_at": datetime.now(),
+                "membership_version": 0,
+            }
+            for i in range(start, min(start + SEED_BATCH_SIZE, users))
+        ], ordered=False)
+    return time.perf_counter() - started
+
+
+async def find_then_insert(collection, email: str) -> None:
+    """The login's user lookup as it was."""
+    existing = await collection.find_one({"email": email})
+    if existing is None:
+        await collection.insert_one({
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "email": email,
+            "profile_url": None,
+            "created_at": datetime.now(),
+        })
+
+
+async def measure(emails: List[str], login: Callable[[str], Awaitable[object]]) -> List[float]:
+    durations = []
+    for email in emails:
+        started = time.perf_counter()
+        await login(email)
+        durations.append(time.perf_counter() - started)
+    return sorted(durations)
+
+
+def percentile(durations: List[float], fraction: float) -> float:
+    return durations[min(len(durations) - 1, int(len(durations) * fraction))]
+
+
+async def docs_examined(collection, query: dict) -> int:
+    plan = await collection.find(query).explain()
+    return plan["executionStats"]["totalDocsExamined"]
+
+
+async def race(collection, login: Callable[[str], Awaitable[object]], email: str, concurrency: int) -> int:
+    """Log in ``concurrency`` times at once with a new email; return how many users it left."""
+    await asyncio.gather(*(login(email) for _ in range(concurrency)), return_exceptions=True)
+    return await collection.count_documents({"email": email})
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    client = motor.motor_asyncio.AsyncIOMotorClient(args.mongo_uri)
+    database = client[args.database]
+    await client.drop_database(args.database)
+    collection = database[User.Settings.name]
+
+    seconds = await seed(collection, args.users)
+    print(f"Seeded {args.users} users in {seconds:.1f} s")
+
+    step = max(1, args.users // args.logins)
+    existing = [user_email(i) for i in range(0, args.users, step)][:args.logins]
+    print(f"{args.logins} logins per row, one at a time")
+    print(f"{'path':>14} | {'users':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'docs examined':>13} | {'race users':>10}")
+    print("-" * 78)
+
+    def report(path: str, kind: str, durations: List[float], examined: int, race_users: object) -> None:
+        print(f"{path:>14} | {kind:>8} | {percentile(durations, 0.5) * 1000:>8.2f} | "
+              f"{percentile(durations, 0.95) * 1000:>8.2f} | {examined:>13} | {race_users:>10}")
+
+    async def old_login(email: str) -> None:
+        await find_then_insert(collection, email)
+
+    examined = await docs_examined(collection, {"email": existing[0]})
+    report("find + insert", "existing", await measure(existing, old_login), examined, "-")
+    race_users = await race(collection, old_login, "race-old@example.com", args.race)
+    report("find + insert", "new", await measure([f"old{i}@example.com" for i in range(args.logins)], old_login),
+           examined, race_users)
+
+    # init_beanie builds the unique normalized_email index over the seeded users
+    started = time.perf_counter()
+    await init_beanie(database=database, document_models=[User])
+    print(f"{'':>14}   built the normalized_email index in {time.perf_counter() - started:.1f} s")
+
+    async def new_login(email: str) -> User:
+        return await get_or_create_user(user_profile(email))
+
+    examined = await docs_examined(collection, {"normalized_email": normalize_email(existing[0])})
+    report("upsert", "existing", await measure(existing, new_login), examined, "-")
+    race_users = await race(collection, new_login, "race-new@example.com", args.race)
+    report("upsert", "new", await measure([f"new{i}@example.com" for i in range(args.logins)], new_login),
+           examined, race_users)
+
+    await client.drop_database(args.database)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--database", default="meruem_bench_user_login", help="Scratch database, dropped")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--race", type=int, default=20, help="Concurrent first logins with one email")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,57 @@ class Settings(BaseSettings):
     GOOGLE_OAUTH_CLIENT_ID:str
     GOOGLE_OAUTH_CLIENT_SECRET:str
     GOOGLE_OAUTH_REDIRECT_URI:str
+    GOOGLE_OAUTH_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_OAUTH_USERINFO_URL: str = "https://www.googleapis.com/oauth2/v2/userinfo"
+
+    # MySQL connection pooling (per Connection document)
+    MYSQL_POOL_SIZE: int = 5
+    MYSQL_POOL_IDLE_TIMEOUT: int = 300  # seconds before an unused pool is closed
+    MYSQL_POOL_ACQUIRE_TIMEOUT: int = 10  # seconds to wait for a free connection
+    MYSQL_POOL_HEALTH_CHECK_INTERVAL: int = 30  # ping connections idle longer than this
+    MYSQL_DRIVER: str = "mysql-connector"  # "aiomysql" runs introspection and queries on the event loop instead of worker threads
+
+    # Background schema jobs
+    SCHEMA_JOB_WORKERS: int = 4
+    SCHEMA_INTROSPECTION_PARALLELISM: int = 4  # databases of a multi-database connection introspected at once, capped at MYSQL_POOL_SIZE - QUERY_MAX_CONCURRENT_PER_CONNECTION
+    SCHEMA_REFRESH_INTERVAL: int = 3600  # seconds between scheduled refreshes, 0 disables
+    TABLE_STATS_REFRESH_INTERVAL: int = 900  # seconds between row count / index statistics refreshes, 0 disables
+    SCHEMA_INDEX_MAX_CONNECTIONS: int = 64  # connections whose derived schema structures (search, joins, context, encoded body) stay in memory
+
+    # Query execution
+    QUERY_STREAM_CHUNK_ROWS: int = 1000  # rows fetched from MySQL per streamed chunk
+    QUERY_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # total size of cached results
+    QUERY_CACHE_MAX_ENTRY_BYTES: int = 8 * 1024 * 1024  # larger results are never cached
+    QUERY_CACHE_TTL: int = 300  # seconds a cached result stays valid
+    QUERY_MAX_CONCURRENT: int = 16  # across all workspaces; waiting queries are scheduled fairly
+    QUERY_MAX_CONCURRENT_PER_CONNECTION: int = 4  # keep below MYSQL_POOL_SIZE so table browsing still gets a session
+    QUERY_MAX_CONCURRENT_PER_WORKSPACE: int = 8
+    QUERY_QUEUE_SIZE: int = 64  # queries waiting for a slot, per workspace
+    QUERY_QUEUE_TIMEOUT: int = 30  # seconds a query may wait for a slot
+    QUERY_STATEMENT_TIMEOUT: int = 300  # seconds before a running statement is killed, 0 disables
+    QUERY_SCAN_WARN_ROWS: int = 1_000_000  # warn when a statement without WHERE/LIMIT reads a larger table, 0 disables
+    QUERY_SCAN_BLOCK_ROWS: int = 50_000_000  # refuse such statements unless allowLargeScan is set, 0 disables
+
+    # Materialized results (large results written to disk for paging)
+    RESULT_STORE_DIR: str = ""  # defaults to <tmp>/meruem-results
+    RESULT_STORE_MAX_BYTES: int = 4 * 1024 * 1024 * 1024  # total size of result files
+    RESULT_STORE_TTL: int = 1800  # seconds a result is kept after it was last read
+    RESULT_STORE_GC_INTERVAL: int = 60  # seconds between expiry sweeps
+
+    # Authentication
+    USER_CACHE_TTL: int = 60  # seconds an authenticated user is served from memory, 0 disables the cache
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    WORKSPACE_ROLE_CLAIMS: bool = False  # embed workspace roles in tokens and answer membership checks from them
+    JWT_CACHE_MAX_ENTRIES: int = 10000  # verified tokens whose signature check is skipped until they expire, 0 disables
+    STATS_ADMIN_EMAILS: str = ""  # comma-separated; only these users may read server-wide counters (e.g. /connections/cache/stats)
+
+    # Outbound HTTP (Google OAuth), one client shared for the app's lifetime
+    OUTBOUND_HTTP2: bool = True  # needs h2; falls back to HTTP/1.1 without it
+    OUTBOUND_HTTP_MAX_CONNECTIONS: int = 20
+    OUTBOUND_HTTP_MAX_KEEPALIVE: int = 10
+    OUTBOUND_HTTP_KEEPALIVE_EXPIRY: float = 60  # seconds an idle connection is kept open
+    OUTBOUND_HTTP_TIMEOUT: float = 10  # seconds for reading, writing and waiting for a pooled connection
+    OUTBOUND_HTTP_CONNECT_TIMEOUT: float = 5
 
     # DB_HOS = SettingsConfigDict(env_file=".env")
     model_config= SettingsConfigDict(env_file=".env", env_file_encoding="utf-8",extra="ignore")
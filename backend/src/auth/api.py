@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse, RedirectResponse
 from pydantic import BaseModel
 import os
@@ -7,7 +7,12 @@ from beanie import PydanticObjectId
 from ..user.schema import User, UserCreate
 from config import get_settings
 from .config import get_google_oauth_config
-from .services import create_jwt_token, fetch_google_user_profile, exchange_code_for_token, generate_google_oauth_url, get_access_token_from_code
+from ..user.cache import user_cache
+from ..user.crud import get_or_create_user
+from ..workspace.services import workspace_role_claims
+from .http import http_client
+from .tokens import verified_tokens
+from .services import current_stats_admin, create_jwt_token, fetch_google_user_profile, exchange_code_for_token, generate_google_oauth_url, get_access_token_from_code
 router = APIRouter(prefix="/auth")
 
 
@@ -52,37 +57,22 @@ async def google_oauth_callback(request: GoogleCallbackRequest):
         email = profile_data["email"]
         picture = profile_data["picture"]
         
-        # Check if user already exists by email
-        existing_user = await User.find_one(User.email == email)
-
-        print('existing_user',existing_user)
-        
-        if existing_user:
-            user = existing_user
-        else:
-            # Create new user
-            user_data = UserCreate(
-                first_name=given_name,
-                last_name=family_name,
-                email=email,
-                profile_url=picture if picture else None
-            )
-            
-            # Save user to database
-            user = User(
-                first_name=user_data.first_name,
-                last_name=user_data.last_name,
-                email=user_data.email,
-                profile_url=user_data.profile_url
-            )
-            
-            await user.insert()
+        # Find the user by email or create it, atomically
+        user = await get_or_create_user(UserCreate(
+            first_name=given_name,
+            last_name=family_name,
+            email=email,
+            profile_url=picture if picture else None
+        ))
         
         # Generate JWT token with 2-hour expiration using service
         token_payload = {
             "user_id": str(user.id),
             "user_email": user.email
         }
+        if get_settings().WORKSPACE_ROLE_CLAIMS:
+            # Workspace roles, so membership checks need no workspace lookups
+            token_payload.update(await workspace_role_claims(user))
         
         # Generate JWT token using service function
         meruem_access_token = create_jwt_token(token_payload, lifespan=2)
@@ -146,4 +136,21 @@ async def logout():
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error during logout: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/cache/stats")
+async def get_user_cache_stats(current_user: User = Depends(current_stats_admin)):
+    """
+    Get authentication cache counters.
+    
+    The counters cover every user, so only stats admins (STATS_ADMIN_EMAILS) may read them.
+    
+    - **users**: entries, hits, misses, coalesced loads, hit rate, evictions,
+      expirations and invalidations of the user cache
+    - **tokens**: entries, hits, misses, hit rate, evictions and expirations of
+      the verified-token cache
+    - **http**: whether the shared outbound HTTP client is open, HTTP/2, its
+      connection limits and the number of requests it sent
+    """
+    return {"users": user_cache.stats(), "tokens": verified_tokens.stats(), "http": http_client.stats()}
@@ -4,11 +4,14 @@ from config import get_settings
 def get_google_oauth_config():
     """
     Get Google OAuth configuration from main settings.
-    Returns a dictionary with client_id, client_secret, and redirect_uri.
+    Returns a dictionary with client_id, client_secret, redirect_uri and the
+    token and userinfo endpoint URLs.
     """
     settings = get_settings()
     return {
         "client_id": settings.GOOGLE_OAUTH_CLIENT_ID,
         "client_secret": settings.GOOGLE_OAUTH_CLIENT_SECRET,
-        "redirect_uri": settings.GOOGLE_OAUTH_REDIRECT_URI
+        "redirect_uri": settings.GOOGLE_OAUTH_REDIRECT_URI,
+        "token_url": settings.GOOGLE_OAUTH_TOKEN_URL,
+        "userinfo_url": settings.GOOGLE_OAUTH_USERINFO_URL
     }
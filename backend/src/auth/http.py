@@ -0,0 +1,85 @@
+from typing import Any, Dict, Optional
+
+import httpx
+
+from config import get_settings
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SharedHttpClient:
+    """
+    One app-lifetime ``httpx.AsyncClient`` for outbound calls (Google OAuth).
+
+    Reusing the client keeps connections alive between logins, so a login does
+    not pay new TCP and TLS handshakes; with HTTP/2 the token exchange and the
+    profile request share a single connection per host. Opened in the app's
+    lifespan and closed on shutdown; a call made outside it (scripts,
+    benchmarks) opens the client on first use.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        timeout: float,
+        connect_timeout: float,
+        http2: bool,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.http2 = http2 and http2_available()
+        if http2 and not self.http2:
+            print("⚠️ h2 is not installed; outbound HTTP falls back to HTTP/1.1")
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+
+    def open(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        return self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.open()
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        self.requests += 1
+        return await self.client.request(method, url, **kwargs)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "maxConnections": self.limits.max_connections,
+            "maxKeepaliveConnections": self.limits.max_keepalive_connections,
+            "requests": self.requests,
+        }
+
+
+_settings = get_settings()
+http_client = SharedHttpClient(
+    max_connections=_settings.OUTBOUND_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=_settings.OUTBOUND_HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=_settings.OUTBOUND_HTTP_KEEPALIVE_EXPIRY,
+    timeout=_settings.OUTBOUND_HTTP_TIMEOUT,
+    connect_timeout=_settings.OUTBOUND_HTTP_CONNECT_TIMEOUT,
+    http2=_settings.OUTBOUND_HTTP2,
+)
@@ -4,10 +4,15 @@ import urllib.parse
 from jwt import ExpiredSignatureError, InvalidTokenError
 from fastapi import Request, HTTPException, Depends
 from beanie import PydanticObjectId
+from bson.errors import InvalidId
 from datetime import datetime, timedelta, timezone
-from ..user.schema import User
+from typing import Any, Dict, Mapping, Optional
+from ..user.cache import user_cache
+from ..user.schema import User, normalize_email
 from config import get_settings
 from .config import get_google_oauth_config
+from .http import http_client
+from .tokens import WorkspaceClaims, current_workspace_claims, verified_tokens
 
 
 SECRET_KEY = get_settings().JWT_SECRET
@@ -15,6 +20,11 @@ ALGORITHM = "HS256"
 print("............................",SECRET_KEY)
 def get_current_user(request: Request):
     """Extract user ID from JWT token in Authorization header (Bearer) or cookies."""
+    return get_current_claims(request)["user_id"]
+
+
+def get_current_claims(request: Request) -> Dict[str, Any]:
+    """Verify the JWT token in the Authorization header (Bearer) or cookies and return its claims."""
     # Check if JWT secret is configured
     if not SECRET_KEY:
         raise HTTPException(
@@ -38,7 +48,7 @@ def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail="Unauthenticated: Token missing")
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_jwt_token(token)
         user_id: str = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token payload")
@@ -47,26 +57,49 @@ def get_current_user(request: Request):
     except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid or tampered token")
 
-    return user_id
+    return payload
+
+def decode_jwt_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a token and return its claims.
+    
+    Tokens verified before are answered from the verified-token cache without
+    checking the signature again, until they expire.
+    
+    Raises:
+        ExpiredSignatureError: If the token has expired
+        InvalidTokenError: If the token is malformed or its signature does not match
+    """
+    digest = verified_tokens.digest(token)
+    payload = verified_tokens.get(digest)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        verified_tokens.put(digest, payload)
+    return payload
+
+
+async def fetch_user(user_id: str) -> Optional[User]:
+    """Read a user from the database by ID."""
+    return await User.get(PydanticObjectId(user_id))
+
 
 async def current_active_user(request: Request) -> User:
-    """FastAPI dependency to get the current authenticated user from database."""
-    user_id = get_current_user(request)
+    """
+    FastAPI dependency to get the current authenticated user.
+    
+    Users are served from the in-process user cache (USER_CACHE_TTL) and only
+    read from the database on a miss.
+    
+    With WORKSPACE_ROLE_CLAIMS, the workspace roles in the token are published
+    for get_user_role_in_workspace if they were issued at the user's current
+    membership version.
+    """
+    claims = get_current_claims(request)
+    user_id = claims["user_id"]
     
     try:
-        # Convert string to ObjectId and find user
-        user_object_id = PydanticObjectId(user_id)
-        user = await User.get(user_object_id)
-        
-        if not user:
-            raise HTTPException(
-                status_code=401, 
-                detail="User not found"
-            )
-        
-        return user
-        
-    except ValueError:
+        user = await user_cache.get_or_load(user_id, fetch_user)
+    except (ValueError, InvalidId):
         raise HTTPException(
             status_code=401, 
             detail="Invalid user ID format"
@@ -76,6 +109,37 @@ async def current_active_user(request: Request) -> User:
             status_code=500, 
             detail=f"Failed to fetch user: {str(e)}"
         )
+    
+    if not user:
+        raise HTTPException(
+            status_code=401, 
+            detail="User not found"
+        )
+    
+    roles = claims.get("ws")
+    if get_settings().WORKSPACE_ROLE_CLAIMS and isinstance(roles, Mapping) and claims.get("mv") == user.membership_version:
+        current_workspace_claims.set(WorkspaceClaims(user_id, roles))
+    else:
+        current_workspace_claims.set(None)
+    
+    return user
+
+
+async def current_stats_admin(current_user: User = Depends(current_active_user)) -> User:
+    """
+    FastAPI dependency for endpoints exposing process-wide counters, which cover
+    every workspace: only users listed in STATS_ADMIN_EMAILS may read them.
+    
+    Raises:
+        HTTPException: 403 if the user is not a stats admin
+    """
+    admins = {normalize_email(email) for email in get_settings().STATS_ADMIN_EMAILS.split(",") if email.strip()}
+    if normalize_email(current_user.email) not in admins:
+        raise HTTPException(
+            status_code=403,
+            detail="Only administrators can read server-wide statistics"
+        )
+    return current_user
 
 
 def create_jwt_token(payload: dict, lifespan: int = 2) -> str:
@@ -134,40 +198,45 @@ async def fetch_google_user_profile(access_token: str) -> dict:
     Raises:
         HTTPException: If profile fetching fails
     """
-    profile_url = "https://www.googleapis.com/oauth2/v2/userinfo"
+    profile_url = get_google_oauth_config()["userinfo_url"]
     headers = {"Authorization": f"Bearer {access_token}"}
     
-    async with httpx.AsyncClient() as client:
-        profile_response = await client.get(profile_url, headers=headers)
-        
-        if profile_response.status_code != 200:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to get user profile: {profile_response.text}"
-            )
-        
-        profile_data = profile_response.json()
-        
-        # Extract user information
-        given_name = profile_data.get("given_name", "")
-        family_name = profile_data.get("family_name", "")
-        email = profile_data.get("email", "")
-        picture = profile_data.get("picture", "")
+    try:
+        profile_response = await http_client.request("GET", profile_url, headers=headers)
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Failed to reach Google for the user profile: {str(e)}"
+        )
+    
+    if profile_response.status_code != 200:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to get user profile: {profile_response.text}"
+        )
+    
+    profile_data = profile_response.json()
+    
+    # Extract user information
+    given_name = profile_data.get("given_name", "")
+    family_name = profile_data.get("family_name", "")
+    email = profile_data.get("email", "")
+    picture = profile_data.get("picture", "")
 
-        print("profile_data", profile_data)
-        
-        if not given_name or not family_name or not email:
-            raise HTTPException(
-                status_code=400,
-                detail="Missing required user information from Google profile"
-            )
-        
-        return {
-            "given_name": given_name,
-            "family_name": family_name,
-            "email": email,
-            "picture": picture
-        }
+    print("profile_data", profile_data)
+    
+    if not given_name or not family_name or not email:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing required user information from Google profile"
+        )
+    
+    return {
+        "given_name": given_name,
+        "family_name": family_name,
+        "email": email,
+        "picture": picture
+    }
 
 
 async def exchange_code_for_token(code: str, client_id: str, client_secret: str, redirect_uri: str) -> str:
@@ -186,7 +255,7 @@ async def exchange_code_for_token(code: str, client_id: str, client_secret: str,
     Raises:
         HTTPException: If token exchange fails
     """
-    token_url = "https://oauth2.googleapis.com/token"
+    token_url = get_google_oauth_config()["token_url"]
     token_data = {
         "code": code,
         "client_id": client_id,
@@ -195,27 +264,31 @@ async def exchange_code_for_token(code: str, client_id: str, client_secret: str,
         "grant_type": "authorization_code",
     }
     
-    async with httpx.AsyncClient() as client:
-        # Get access token
-        token_response = await client.post(token_url, data=token_data)
-        print("token_response", token_response)
-        
-        if token_response.status_code != 200:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to exchange code for token: {token_response.text}"
-            )
-        
-        token_info = token_response.json()
-        access_token = token_info.get("access_token")
-        
-        if not access_token:
-            raise HTTPException(
-                status_code=400,
-                detail="No access token received from Google"
-            )
-        
-        return access_token
+    try:
+        token_response = await http_client.request("POST", token_url, data=token_data)
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Failed to reach Google for the token exchange: {str(e)}"
+        )
+    print("token_response", token_response)
+    
+    if token_response.status_code != 200:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to exchange code for token: {token_response.text}"
+        )
+    
+    token_info = token_response.json()
+    access_token = token_info.get("access_token")
+    
+    if not access_token:
+        raise HTTPException(
+            status_code=400,
+            detail="No access token received from Google"
+        )
+    
+    return access_token
 
 
 async def get_access_token_from_code(code: str) -> str:
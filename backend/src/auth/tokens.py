@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from jwt import ExpiredSignatureError
+
+from config import get_settings
+
+
+class VerifiedTokenCache:
+    """
+    LRU cache of verified JWT claims, keyed by the SHA-256 digest of the token.
+
+    A token is only added after ``jwt.decode`` verified its signature and
+    claims, so random or forged tokens never take up space; at most
+    ``max_entries`` tokens are kept, least recently used first out. Raw tokens
+    are not stored.
+
+    Of the time-based claims, only ``exp`` can change outcome after a
+    successful verification (``nbf`` and ``iat`` were already in the past), so
+    a hit re-checks ``exp`` exactly as PyJWT does: the token is expired once
+    the current time reaches it. Tokens without ``exp`` are not cached.
+
+    Claims are stored read-only and every hit gets its own top-level dict, so a
+    caller modifying its payload cannot change what later requests see.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[Mapping[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached claims of a token, or None if it was not verified recently.
+
+        Raises:
+            ExpiredSignatureError: If the token is cached but has expired since
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                self.expirations += 1
+                raise ExpiredSignatureError("Signature has expired")
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, digest: bytes, claims: Dict[str, Any]) -> None:
+        """Remember the claims of a token that was just verified."""
+        if self.max_entries <= 0 or "exp" not in claims:
+            return
+        with self._lock:
+            self._entries[digest] = (_freeze(claims), int(claims["exp"]))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def _freeze(value: Any) -> Any:
+    """A read-only copy of decoded JSON: mappings become MappingProxyType, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+verified_tokens = VerifiedTokenCache(max_entries=get_settings().JWT_CACHE_MAX_ENTRIES)
+
+
+class WorkspaceClaims(NamedTuple):
+    """Workspace roles carried by the current request's token, known to be current."""
+    user_id: str
+    roles: Mapping[str, str]  # workspace ID -> role code
+
+
+# Set by current_active_user when the token's roles match the user's membership version
+current_workspace_claims: ContextVar[Optional[WorkspaceClaims]] = ContextVar("current_workspace_claims", default=None)
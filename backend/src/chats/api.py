@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 from beanie import PydanticObjectId
 from pymongo.errors import DuplicateKeyError
@@ -9,7 +10,9 @@ from src.workspace.schema import Workspace
 from src.workspace.services import get_user_role_in_workspace, UserRole
 from src.connections.schema import Connection
 from .schema import Chat
-from .models import CreateChatRequest, ChatResponse
+from src.connections.context import BYTES_PER_TOKEN, schema_context_indexes
+from src.connections.joins import foreign_key_graphs
+from .models import CreateChatRequest, ChatResponse, SchemaContextRequest, SchemaContextResponse
 from fastapi import Response
 
 
@@ -234,6 +237,68 @@ async def get_chat(
             detail=f"An error occurred while fetching the chat: {str(e)}"
         )
     
+@router.post("/{chat_id}/schema-context", response_model=SchemaContextResponse)
+async def get_chat_schema_context(
+    chat_id: str,
+    context_request: SchemaContextRequest,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Build the schema description to send with a question for SQL generation.
+    
+    - **question**: The user's question
+    - **maxTokens**: Budget of the description, in approximate prompt tokens
+    
+    Instead of the chat connection's full schema, only the tables relevant to the
+    question are described, best first: tables and columns named in the question
+    (typos tolerated), the tables needed to join them along foreign keys, and their
+    neighbours. Once the budget runs low, tables are listed with only their key and
+    matched columns. `omittedTables` counts relevant tables that did not fit.
+    
+    Indexes are built once per schema version and repeated questions are memoized.
+    """
+    try:
+        chat = await Chat.get(PydanticObjectId(chat_id))
+        if not chat:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat not found"
+            )
+        
+        # Check if user has access to the workspace that owns this chat
+        await get_user_role_in_workspace(str(chat.workspace_id.ref.id), str(current_user.id))
+        
+        connection = await Connection.get(chat.connection_id.ref.id)
+        if not connection:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="The chat's connection no longer exists"
+            )
+        
+        index = await schema_context_indexes.get(connection)
+        graph = await foreign_key_graphs.get(connection)
+        context = await run_in_threadpool(
+            index.build_context,
+            context_request.question,
+            graph,
+            context_request.maxTokens * BYTES_PER_TOKEN
+        )
+        return SchemaContextResponse(schemaVersion=connection.schemaVersion, **context)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while building the schema context: {str(e)}"
+        )
+
+
 @router.delete("/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_chat(
     chat_id: str,
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List
 
 
 # Request models
@@ -7,6 +8,11 @@ class CreateChatRequest(BaseModel):
     name: str
 
 
+class SchemaContextRequest(BaseModel):
+    question: str = Field(..., min_length=1, description="Question the SQL is generated for")
+    maxTokens: int = Field(2000, ge=50, le=100_000, description="Approximate prompt tokens the schema may use")
+
+
 # Response models
 class ChatResponse(BaseModel):
     id: str
@@ -18,3 +24,16 @@ class ChatResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class SchemaContextTable(BaseModel):
+    table: str
+    score: float
+
+
+class SchemaContextResponse(BaseModel):
+    text: str
+    tables: List[SchemaContextTable]
+    bytes: int
+    omittedTables: int
+    schemaVersion: int
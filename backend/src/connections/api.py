@@ -1,25 +1,160 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from typing import Dict, List, Optional
 import mysql.connector
 from mysql.connector import Error
 from beanie import PydanticObjectId
+from beanie.operators import Set
+from bson import DBRef
 from pymongo.errors import DuplicateKeyError
 from urllib.parse import urlparse
-from .handlers.mysql import parse_mysql_connection_string,get_mysql_schema
+import time
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from config import get_settings
+from .handlers.mysql import MySQLQueryStream, fetch_mysql_rows, parse_mysql_connection_string
+from .handlers import mysql_async
 from src.user.schema import User
-from ..auth.services import current_active_user
+from ..auth.services import current_active_user, current_stats_admin
 from src.workspace.schema import Workspace
+from src.workspace.services import check_workspace_access, get_user_role_in_workspace
+from .crud import get_connection_table, get_connection_tables, get_table_stats
+from .jobs import schema_jobs
+from .governor import QueryPriority, query_governor
+from .cache import query_cache
+from .formats import (
+    ARROW_STREAM_MEDIA_TYPE,
+    RESULT_MEDIA_TYPES,
+    SCHEMA_STREAM_MEDIA_TYPES,
+    arrow_cached_stream,
+    arrow_query_stream,
+    arrow_table_rows,
+    encode_arrow_table,
+    encode_json_line,
+    ndjson_cached_stream,
+    ndjson_query_stream,
+    negotiate_content_encoding,
+    negotiate_result_format,
+)
+from .guard import check_table_scans
+from .joins import foreign_key_graphs
+from .pagination import build_page_query, next_page_cursor
+from .results import StoredResult, result_store
+from .schema_body import encoded_schemas, etag_matches, schema_etag
+from .schema_stream import decode_schema_cursor, encode_schema_stream, schema_stream_events, schema_stream_finished
+from .search import COLUMN, TABLE, schema_search_indexes
+from .services import get_connection_for_user, start_schema_introspection
 from .schema import (
     Connection, 
     ConnectionCreate, 
+    ConnectionCreateResponse,
     ConnectionResponse, 
+    QueryRequest,
+    ResultSetCreate,
+    ResultSetResponse,
+    SchemaJobResponse,
+    SchemaStatus,
 )
 
 router = APIRouter(prefix="/connections", tags=["connections"])
 
 
+# Routes under literal prefixes (/queries, /results, /cache, /jobs) come first:
+# routes match in registration order, and /{connection_id}/... would take them.
+
+@router.post("/queries/{query_id}/cancel")
+async def cancel_query(
+    query_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Cancel a running query with KILL QUERY on the MySQL server.
+    
+    - **query_id**: The `X-Query-Id` header of the query response
+    
+    Only the user who started a query can cancel it. The query's response ends
+    with an error once MySQL has stopped the statement.
+    """
+    ticket = query_governor.get(query_id)
+    if not ticket or ticket.user_id != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Query not found or already finished"
+        )
+    
+    return {"queryId": query_id, "cancelled": query_governor.cancel(ticket, "cancelled")}
+
+
+@router.get("/queries/stats")
+async def get_query_governor_stats(current_user: User = Depends(current_stats_admin)):
+    """
+    Get query governor counters: running and queued queries, limits, rejections,
+    queue timeouts and cancellations by reason.
+    
+    The counters cover every workspace, so only stats admins (STATS_ADMIN_EMAILS)
+    may read them; members see their workspace's queue at `/queries/stats/{workspace_id}`.
+    """
+    return query_governor.stats()
+
+
+@router.get("/queries/stats/{workspace_id}")
+async def get_workspace_query_stats(
+    workspace_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Get a workspace's query queue: queued and running queries, rejections, queue
+    timeouts and p50/p95/p99/max queue wait over its recent queries.
+    """
+    # Raises 404 if the user is not a member of the workspace
+    await get_user_role_in_workspace(workspace_id, str(current_user.id))
+    return query_governor.workspace_stats(workspace_id)
+
+
+@router.get("/results/stats")
+async def get_result_store_stats(current_user: User = Depends(current_stats_admin)):
+    """
+    Get stored result counters: results, bytes on disk, evictions and expirations.
+    
+    The counters cover every workspace, so only stats admins (STATS_ADMIN_EMAILS) may read them.
+    """
+    return result_store.stats()
+
+
+@router.get("/cache/stats")
+async def get_query_cache_stats(current_user: User = Depends(current_stats_admin)):
+    """
+    Get query result cache counters: entries, bytes, hits, misses, evictions,
+    expirations and invalidations.
+    
+    The counters cover every workspace, so only stats admins (STATS_ADMIN_EMAILS) may read them.
+    """
+    return query_cache.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=SchemaJobResponse)
+async def get_schema_job_status(
+    job_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Get the progress of a background schema job.
+    
+    Reports tables done out of total and the elapsed time in seconds.
+    """
+    job = schema_jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    # Raises 404 if the user is not a member of the connection's workspace
+    await get_user_role_in_workspace(job.workspace_id, str(current_user.id))
+    
+    return SchemaJobResponse(**job.snapshot())
+
 
-@router.post("/{workspace_id}/create", response_model=ConnectionResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/{workspace_id}/create", response_model=ConnectionCreateResponse, status_code=status.HTTP_202_ACCEPTED)
 async def create_connection(
     workspace_id: str,
     connection_data: ConnectionCreate,
@@ -30,48 +165,32 @@ async def create_connection(
     
     This endpoint:
     1. Validates the connection string
-    2. Tests the connection to the MySQL database
-    3. Fetches the database schema
-    4. Creates a new connection document
+    2. Creates a new connection document
+    3. Starts a background job that tests the connection and fetches the database schema
+    
+    Returns 202 with the job ID. Poll `GET /connections/jobs/{job_id}` for progress;
+    the schema is stored when the job completes. If the database cannot be reached,
+    the job fails and the connection document is removed.
     
     - **name**: Display name for the connection
     - **config**: MySQL configuration including connection string
     - **workspace_id**: ID of the workspace this connection belongs to (query parameter)
     """
     try:
-        # Validate workspace exists and user has access
-        workspace = await Workspace.get(PydanticObjectId(workspace_id))
-        if not workspace:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Workspace not found"
-            )
-        
-        # Check if user has access to this workspace
-        print("workspace",workspace)
-        user_has_access = any(
-            str(member.user_id.ref.id) == str(current_user.id) for member in workspace.members
-        )
-        if not user_has_access:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have access to this workspace"
-            )
+        # Validate workspace exists and user has access (from the token's role claims when current)
+        await check_workspace_access(workspace_id, str(current_user.id))
         
         # Parse and validate connection string
         connection_params = parse_mysql_connection_string(connection_data.config.connectionString)
         
-        # Test connection and fetch schema
-        db_schema = get_mysql_schema(connection_params)
-        
-        # Create connection document
+        # Create connection document; the schema is filled by the background job
         connection = Connection(
             name=connection_data.name,
             driver="mysql",
             config=connection_data.config,
-            dbSchema=db_schema,
+            schemaStatus=SchemaStatus.PENDING,
             createdBy=current_user,
-            workspaceId=workspace
+            workspaceId=DBRef(Workspace.get_collection_name(), PydanticObjectId(workspace_id))
         )
         
         try:
@@ -82,14 +201,25 @@ async def create_connection(
                 detail="A connection with this configuration already exists in this workspace"
             )
         
+        # Test connection and fetch schema off the event loop
+        job = await start_schema_introspection(
+            connection,
+            workspace_id=workspace_id,
+            remove_on_failure=True,
+            # The user is waiting for the new connection's schema
+            priority=QueryPriority.INTERACTIVE
+        )
+        
         # Return response
-        return ConnectionResponse(
+        return ConnectionCreateResponse(
             id=str(connection.id),
             name=connection.name,
             driver=connection.driver,
-            workspaceId=str(workspace.id),
+            workspaceId=workspace_id,
             createdAt=connection.createdAt,
-            hasSchema=len(connection.dbSchema) > 0
+            hasSchema=False,
+            schemaStatus=connection.schemaStatus,
+            jobId=job.id
         )
         
     except HTTPException:
@@ -110,23 +240,8 @@ async def get_workspace_connections(
     Get all connections for a specific workspace.
     """
     try:
-        # Validate workspace exists and user has access
-        workspace = await Workspace.get(PydanticObjectId(workspace_id))
-        if not workspace:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Workspace not found"
-            )
-        
-        # Check if user has access to this workspace
-        user_has_access = any(
-            str(member.user_id.ref.id) == str(current_user.id) for member in workspace.members
-        )
-        if not user_has_access:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have access to this workspace"
-            )
+        # Validate workspace exists and user has access (from the token's role claims when current)
+        await check_workspace_access(workspace_id, str(current_user.id))
         
         # Get all connections for this workspace
         connections = await Connection.find(
@@ -140,7 +255,9 @@ async def get_workspace_connections(
                 driver=conn.driver,
                 workspaceId=str(conn.workspaceId.ref.id),
                 createdAt=conn.createdAt,
-                hasSchema=len(conn.dbSchema) > 0
+                hasSchema=conn.tableCount > 0,
+                schemaStatus=conn.schemaStatus,
+                failedDatabases=conn.failedDatabases
             )
             for conn in connections
         ]
@@ -157,10 +274,26 @@ async def get_workspace_connections(
 @router.get("/{connection_id}/schema")
 async def get_connection_schema(
     connection_id: str,
+    response: Response,
+    table: Optional[List[str]] = Query(None, description="Only return these \"schema.table\" keys"),
+    prefix: Optional[str] = Query(None, description="Only return tables whose key starts with this prefix"),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size; all matching tables when omitted"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     current_user: User = Depends(current_active_user)
 ):
     """
-    Get the database schema for a specific connection.
+    Get the database schema for a specific connection, keyed by "schema.table".
+    
+    Tables are read from the per-table collection and can be filtered by key or
+    prefix and paged with skip/limit. The total number of tables of the connection
+    is returned in the X-Total-Count header.
+    
+    The full, unfiltered schema is served from a body encoded once per schema
+    version, gzip or brotli compressed per `Accept-Encoding`, with an `ETag`.
+    Send it back in `If-None-Match` to get `304 Not Modified` while the schema
+    is unchanged.
     """
     try:
         # Get connection
@@ -171,18 +304,26 @@ async def get_connection_schema(
                 detail="Connection not found"
             )
         
-        # Check if user has access to this workspace
-        workspace = await connection.workspaceId.fetch()
-        user_has_access = any(
-            str(member.user_id.id) == str(current_user.id) for member in workspace.members
+        # Check if user has access to this workspace (from the token's role claims when current)
+        await check_workspace_access(
+            str(connection.workspaceId.ref.id),
+            str(current_user.id),
+            detail="You don't have access to this connection"
         )
-        if not user_has_access:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have access to this connection"
-            )
         
-        return connection.dbSchema
+        if not table and not prefix and skip == 0 and limit is None:
+            return await full_schema_response(connection, if_none_match, accept_encoding)
+        
+        tables = await get_connection_tables(
+            connection.id,
+            tables=table,
+            prefix=prefix,
+            skip=skip,
+            limit=limit
+        )
+        response.headers["X-Total-Count"] = str(connection.tableCount)
+        
+        return {stored.key: stored.to_table_schema() for stored in tables}
         
     except HTTPException:
         raise 
@@ -191,4 +332,670 @@ async def get_connection_schema(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch schema: {str(e)}"
         )
-    
\ No newline at end of file
+
+
+async def full_schema_response(
+    connection: Connection,
+    if_none_match: Optional[str],
+    accept_encoding: Optional[str]
+) -> Response:
+    """Answer a full schema request from the cached encoded body, or with 304 if the client has it."""
+    headers = {
+        "X-Total-Count": str(connection.tableCount),
+        "Vary": "Accept-Encoding",
+        # Clients may keep the body but must revalidate it with If-None-Match
+        "Cache-Control": "private, no-cache",
+    }
+    # The stored hash answers revalidation without reading or encoding any table
+    if connection.schemaHash and if_none_match and etag_matches(if_none_match, connection.schemaHash):
+        headers["ETag"] = schema_etag(connection.schemaHash)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    encoded = await encoded_schemas.get(connection)
+    if connection.schemaHash is None:
+        # Schemas stored before hashes existed get theirs on first read. Only if the
+        # version is still the one the body was read at: a refresh that landed
+        # meanwhile stored the hash of the newer tables, which must not be overwritten
+        await Connection.find_one(
+            Connection.id == connection.id,
+            Connection.schemaVersion == connection.schemaVersion,
+            Connection.schemaHash == None
+        ).update(Set({Connection.schemaHash: encoded.digest}))
+    headers["ETag"] = schema_etag(encoded.digest)
+    if if_none_match and etag_matches(if_none_match, encoded.digest):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    available = [coding for coding in ("br", "gzip", "identity") if coding in encoded.bodies]
+    coding = negotiate_content_encoding(accept_encoding, available)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=encoded.bodies[coding], media_type="application/json", headers=headers)
+
+
+@router.get("/{connection_id}/schema/stream")
+async def stream_connection_schema(
+    connection_id: str,
+    cursor: Optional[str] = Query(None, description="Resume after the table with this cursor"),
+    accept: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Stream a connection's schema table by table, so the first tables render
+    before a large schema has been read.
+    
+    The format follows the `Accept` header:
+    - `application/x-ndjson` (default): one JSON object per line, with its event in `type`
+    - `text/event-stream`: server-sent events
+    
+    Events are `meta` (schema version and table count), one `table` per stored
+    table in key order (`key`, `table` and `cursor`), then `done`. While a new
+    connection is still being introspected, `progress` events report the job's
+    progress until its tables are stored. If the schema is refreshed while
+    streaming, a `reset` event tells the client to drop what it received; the
+    tables of the new version follow.
+    
+    To resume a dropped stream, pass the cursor of the last table received as
+    `cursor` (EventSource does this itself through `Last-Event-ID`). A cursor of
+    an older schema version starts over, with `meta.resumed` false.
+    
+    EventSource reconnects whenever a stream ends, so clients should `close()` it
+    on `done`. The `done` event carries the final cursor as its ID; a server-sent
+    events request resuming from a cursor with nothing left after it is answered
+    with `204 No Content`, which stops EventSource from reconnecting.
+    """
+    try:
+        result_format = negotiate_result_format(accept, SCHEMA_STREAM_MEDIA_TYPES)
+        if result_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Supported formats: {', '.join(SCHEMA_STREAM_MEDIA_TYPES.values())}"
+            )
+        
+        connection = await get_connection_for_user(connection_id, current_user)
+        
+        resume_cursor = cursor or last_event_id
+        try:
+            resume_after = decode_schema_cursor(resume_cursor) if resume_cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        if result_format == "sse" and resume_after and await schema_stream_finished(connection, resume_after):
+            return Response(status_code=status.HTTP_204_NO_CONTENT)
+        
+        return StreamingResponse(
+            encode_schema_stream(schema_stream_events(connection, resume_after), result_format),
+            media_type=SCHEMA_STREAM_MEDIA_TYPES[result_format],
+            # Proxies must pass events on as they come
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to stream schema: {str(e)}"
+        )
+
+
+@router.get("/{connection_id}/schema/search")
+async def search_connection_schema(
+    connection_id: str,
+    q: str = Query("", max_length=200, description="Table or column name, or a prefix of one"),
+    kind: Optional[str] = Query(None, pattern=f"^({TABLE}|{COLUMN})$", description="Only return tables or only columns"),
+    type: Optional[str] = Query(None, description="Only return columns of this type, e.g. \"datetime\""),
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Search table and column names of a connection, for autocomplete.
+    
+    - **q**: Case-insensitive name or prefix; names within a small edit distance also match
+    - **kind**: "table" or "column"
+    - **type**: Simplified column type (int, decimal, varchar, datetime, binary, boolean, json);
+      with an empty `q`, lists all columns of that type
+    - **limit**: Maximum number of results
+    
+    Prefix matches are returned first, then fuzzy matches by descending similarity.
+    Each result has `kind`, `table` (the "schema.table" key), `name` and `score`,
+    plus `type` and `isPrimary` for columns.
+    
+    Answered from an in-memory index that is built on the first search after each
+    schema refresh.
+    """
+    try:
+        connection = await get_connection_for_user(connection_id, current_user)
+        index = await schema_search_indexes.get(connection)
+        return {
+            "results": index.search(q, kind=kind, column_type=type, limit=limit),
+            "schemaVersion": connection.schemaVersion
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search schema: {str(e)}"
+        )
+
+
+@router.get("/{connection_id}/schema/joins")
+async def find_join_paths(
+    connection_id: str,
+    table: List[str] = Query(..., description="Two or more \"schema.table\" keys to connect"),
+    limit: int = Query(5, ge=1, le=50, description="Maximum number of alternative paths between two tables"),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Find the cheapest way to join tables along their foreign keys.
+    
+    - **table**: Repeat for each table, e.g. `?table=shop.orders&table=shop.products`
+    - **limit**: For two tables, how many equally short paths to return
+    
+    With two tables, every path with the fewest joins is a candidate (up to
+    `limit`), e.g. when two foreign keys lead to the same table. With three or
+    more, a single join tree connecting all of them is returned. Each path has
+    `cost` (number of joins), `joins` (`fromTable`, `fromColumn`, `toTable`,
+    `toColumn` in join order) and `sql`, a ready `FROM ... JOIN ... ON ...` clause.
+    `paths` is empty when the tables are not connected by foreign keys.
+    
+    The foreign key graph is built once per schema version and reused.
+    """
+    try:
+        connection = await get_connection_for_user(connection_id, current_user)
+        tables = list(dict.fromkeys(table))
+        if len(tables) < 2:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="At least two different tables are required"
+            )
+        
+        graph = await foreign_key_graphs.get(connection)
+        missing = [key for key in tables if key not in graph.node_ids]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tables not found in this connection's schema: {', '.join(missing)}"
+            )
+        
+        if len(tables) == 2:
+            paths = graph.shortest_paths(tables[0], tables[1], limit=limit)
+        else:
+            tree = graph.steiner_tree(tables)
+            paths = [tree] if tree is not None else []
+        
+        return {
+            "tables": tables,
+            "paths": [graph.describe_path(steps, tables[0]) for steps in paths]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to find join paths: {str(e)}"
+        )
+
+
+@router.get("/{connection_id}/stats")
+async def get_connection_stats(
+    connection_id: str,
+    table: Optional[List[str]] = Query(None, description="Only return these \"schema.table\" keys"),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Get approximate row counts, data/index sizes and index cardinalities per table.
+    
+    Statistics are collected from MySQL's metadata on their own schedule, so they
+    can be a few minutes old and row counts are estimates. Tables whose statistics
+    were not collected yet map to null.
+    
+    Response: `{"refreshedAt", "tables": {"schema.table": {"rowCount", "dataBytes",
+    "indexBytes", "indexes": [{"name", "columns", "unique", "cardinality"}], "collectedAt"}}}`
+    """
+    try:
+        connection = await get_connection_for_user(connection_id, current_user)
+        return {
+            "refreshedAt": connection.statsRefreshedAt,
+            "tables": await get_table_stats(connection.id, table)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch table statistics: {str(e)}"
+        )
+
+
+@router.post("/{connection_id}/refresh", response_model=SchemaJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def refresh_connection_schema(
+    connection_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Refresh the database schema for a specific connection in the background.
+    
+    Only tables that were added, dropped or changed since the last refresh are
+    re-introspected. If a schema job is already running for this connection,
+    that job is returned instead of starting a new one.
+    """
+    try:
+        connection = await get_connection_for_user(connection_id, current_user)
+        
+        job = schema_jobs.active_job_for(connection_id)
+        if not job:
+            workspace_id = str(connection.workspaceId.ref.id)
+            job = await start_schema_introspection(connection, workspace_id, kind="refresh")
+        
+        return SchemaJobResponse(**job.snapshot())
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to refresh schema: {str(e)}"
+        )
+
+
+@router.post("/{connection_id}/query")
+async def execute_query(
+    connection_id: str,
+    query: QueryRequest,
+    request: Request,
+    accept: Optional[str] = Header(None),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Execute SQL against a connection and stream the result.
+    
+    Rows are read through an unbuffered cursor and sent in chunks as the client
+    consumes them, so large results are never held in memory.
+    
+    The format is negotiated with the Accept header:
+    
+    - `application/x-ndjson` (default): first line `{"columns": [{"name": ..., "type": ...}, ...]}`,
+      then one JSON array per row, then `{"rowCount": ..., "elapsedMs": ...}`
+      or `{"error": ...}` if the stream failed
+    - `application/vnd.apache.arrow.stream`: an Arrow IPC stream with one record
+      batch per chunk; column types come from the MySQL cursor description
+    
+    Errors raised before the first row (invalid SQL, unreachable database) are
+    returned as regular HTTP errors.
+    
+    Read-only statements are served from the result cache when the same normalized
+    SQL ran recently against the same schema version (`X-Cache: HIT`). Set
+    `useCache` to false to always go to MySQL.
+    
+    Queries that reach MySQL are governed: concurrent queries are limited overall,
+    per connection and per workspace, waiting queries are scheduled fairly across
+    workspaces (429 if the workspace's wait queue is full, 503 if no slot frees up
+    in time), statements are killed after the statement timeout, and closing the
+    response kills the statement on the server. The `X-Query-Id` header can be
+    passed to `POST /connections/queries/{query_id}/cancel`.
+    
+    SELECTs without WHERE or LIMIT are checked against the collected table
+    statistics: reading a table above the warning threshold adds an
+    `X-Scan-Warning` header, and above the block threshold the statement is
+    refused with 422 unless `allowLargeScan` is set.
+    """
+    try:
+        result_format = negotiate_result_format(accept)
+        if result_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Supported result formats: {', '.join(RESULT_MEDIA_TYPES.values())}"
+            )
+        media_type = RESULT_MEDIA_TYPES[result_format]
+        
+        connection = await get_connection_for_user(connection_id, current_user)
+        connection_params = parse_mysql_connection_string(connection.config.connectionString)
+        
+        started_at = time.monotonic()
+        cache_key = None
+        if query.useCache:
+            cache_key = query_cache.make_key(connection_id, query.sql, connection.schemaVersion, result_format)
+        
+        cached = query_cache.get(cache_key) if cache_key else None
+        if cached:
+            body = arrow_cached_stream(cached) if result_format == "arrow" else ndjson_cached_stream(cached, started_at)
+            return StreamingResponse(body, media_type=media_type, headers={"X-Cache": "HIT"})
+        
+        scan_warning = await check_table_scans(connection, connection_params['database'], query.sql, query.allowLargeScan)
+        
+        ticket = await query_governor.admit(connection_id, str(connection.workspaceId.ref.id), str(current_user.id))
+        try:
+            use_async_driver = mysql_async.async_driver_enabled()
+            stream_class = mysql_async.AsyncMySQLQueryStream if use_async_driver else MySQLQueryStream
+            stream = stream_class(
+                connection_params,
+                connection_id,
+                query.sql,
+                chunk_size=get_settings().QUERY_STREAM_CHUNK_ROWS,
+                timeout_ms=query_governor.statement_timeout_ms
+            )
+            query_governor.attach(ticket, stream)
+            # Execute off the event loop so slow statements don't block other requests
+            async with query_governor.watch_disconnect(ticket, request):
+                if use_async_driver:
+                    await stream.open()
+                else:
+                    await run_in_threadpool(stream.open)
+        except Exception as e:
+            query_governor.release(ticket)
+            if ticket.cancel_reason is not None:
+                # A KILL QUERY surfaces as a MySQL "interrupted" error
+                raise query_governor.cancelled_error(ticket) from e
+            raise
+        except BaseException:
+            query_governor.release(ticket)
+            raise
+        
+        # The body is pulled one chunk at a time (from the threadpool, or awaited with
+        # the async driver), so a slow client naturally throttles reads from MySQL;
+        # the slot is held until it ends
+        if result_format == "arrow":
+            body = arrow_query_stream(stream, cache_key=cache_key)
+        else:
+            body = ndjson_query_stream(stream, started_at, cache_key=cache_key)
+        headers = {"X-Cache": "MISS" if cache_key else "BYPASS", "X-Query-Id": ticket.id}
+        if scan_warning:
+            headers["X-Scan-Warning"] = scan_warning
+        return StreamingResponse(
+            query_governor.govern(ticket, body, request),
+            media_type=media_type,
+            headers=headers
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to execute query: {str(e)}"
+        )
+
+
+@router.get("/{connection_id}/tables/{table_key}/rows")
+async def browse_table_rows(
+    connection_id: str,
+    table_key: str,
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Browse the rows of a table page by page.
+    
+    - **table_key**: Table key as stored in the schema, e.g. "classicmodels.customers"
+    - **cursor**: Opaque cursor returned as `nextCursor` by the previous page
+    - **limit**: Rows per page
+    
+    Tables with a primary key use keyset pagination on the primary key columns,
+    so page 10,000 costs the same as page 1. Tables without a primary key fall
+    back to OFFSET pagination in storage order, whose cost grows with page depth;
+    the `strategy` field of the response says which one was used.
+    
+    Response: `{"table", "columns", "rows", "nextCursor", "strategy"}`, where
+    `nextCursor` is null on the last page.
+    """
+    try:
+        connection = await get_connection_for_user(connection_id, current_user)
+        
+        table = await get_connection_table(connection.id, table_key)
+        if not table:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Table '{table_key}' not found in this connection's schema"
+            )
+        
+        # Identifiers come from the stored schema, never from the request
+        sql, params, strategy = build_page_query(table, cursor, limit)
+        connection_params = parse_mysql_connection_string(connection.config.connectionString)
+        if mysql_async.async_driver_enabled():
+            columns, rows = await mysql_async.fetch_mysql_rows(connection_params, connection_id, sql, params)
+        else:
+            columns, rows = await run_in_threadpool(fetch_mysql_rows, connection_params, connection_id, sql, params)
+        
+        page = {
+            "table": table_key,
+            "columns": columns,
+            "rows": [list(row) for row in rows[:limit]],
+            "nextCursor": next_page_cursor(table, strategy, rows, limit, cursor),
+            "strategy": strategy
+        }
+        # Encoded directly so DECIMAL and binary values keep their exact representation
+        return Response(content=encode_json_line(page), media_type="application/json")
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to browse table: {str(e)}"
+        )
+
+
+def _result_set_response(result: StoredResult) -> ResultSetResponse:
+    return ResultSetResponse(
+        resultId=result.id,
+        connectionId=result.connection_id,
+        columns=result.columns,
+        rowCount=result.row_count,
+        sizeBytes=result.size,
+        createdAt=result.created_at,
+        expiresAt=result.expires_at
+    )
+
+
+async def _get_result_for_user(connection_id: str, result_id: str, current_user: User) -> StoredResult:
+    """Load a stored result of a connection; results are private to the user who created them."""
+    await get_connection_for_user(connection_id, current_user)
+    result = result_store.get(result_id)
+    if not result or result.connection_id != connection_id or result.user_id != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Result not found or expired"
+        )
+    return result
+
+
+@router.post("/{connection_id}/results", response_model=ResultSetResponse, status_code=status.HTTP_201_CREATED)
+async def materialize_query_result(
+    connection_id: str,
+    query: ResultSetCreate,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Execute SQL and store the whole result on the server for paging.
+    
+    The result is written once to a local Arrow file and read back through a
+    memory map, so windows of a multi-million row result can be fetched with
+    `GET /connections/{connection_id}/results/{result_id}/rows` without running
+    the query again. Results expire after a period without reads and may be
+    deleted earlier when the server's disk budget is full.
+    
+    Returns 413 if the result alone exceeds the disk budget, and 507 if results
+    being written at the same time leave no room for it. A query stopped by its
+    cancel endpoint or a client disconnect ends with 499, one stopped by the
+    statement timeout with 504. The query is governed
+    like `POST /connections/{connection_id}/query`, in the lower-priority export class,
+    and checked for unbounded scans of large tables the same way.
+    """
+    try:
+        connection = await get_connection_for_user(connection_id, current_user)
+        connection_params = parse_mysql_connection_string(connection.config.connectionString)
+        scan_warning = await check_table_scans(connection, connection_params['database'], query.sql, query.allowLargeScan)
+        if scan_warning:
+            response.headers["X-Scan-Warning"] = scan_warning
+        
+        ticket = await query_governor.admit(
+            connection_id,
+            str(connection.workspaceId.ref.id),
+            str(current_user.id),
+            priority=QueryPriority.EXPORT
+        )
+        try:
+            use_async_driver = mysql_async.async_driver_enabled()
+            stream_class = mysql_async.AsyncMySQLQueryStream if use_async_driver else MySQLQueryStream
+            stream = stream_class(
+                connection_params,
+                connection_id,
+                query.sql,
+                chunk_size=get_settings().QUERY_STREAM_CHUNK_ROWS,
+                timeout_ms=query_governor.statement_timeout_ms
+            )
+            query_governor.attach(ticket, stream)
+            async with query_governor.watch_disconnect(ticket, request):
+                if use_async_driver:
+                    await stream.open()
+                    result = await result_store.materialize_async(stream, str(current_user.id))
+                else:
+                    await run_in_threadpool(stream.open)
+                    result = await run_in_threadpool(result_store.materialize, stream, str(current_user.id))
+        except Exception as e:
+            if ticket.cancel_reason is not None:
+                # A KILL QUERY surfaces as a MySQL "interrupted" error or a broken read
+                raise query_governor.cancelled_error(ticket) from e
+            raise
+        finally:
+            query_governor.release(ticket)
+        
+        return _result_set_response(result)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store query result: {str(e)}"
+        )
+
+
+@router.get("/{connection_id}/results/{result_id}", response_model=ResultSetResponse)
+async def get_query_result(
+    connection_id: str,
+    result_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Get the columns, row count and expiry of a stored result.
+    """
+    result = await _get_result_for_user(connection_id, result_id, current_user)
+    return _result_set_response(result)
+
+
+@router.get("/{connection_id}/results/{result_id}/rows")
+async def read_query_result_rows(
+    connection_id: str,
+    result_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=10000),
+    columns: Optional[str] = Query(None, description="Comma-separated column names; all columns if omitted"),
+    accept: Optional[str] = Header(None),
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Read a window of rows from a stored result.
+    
+    - **offset**: First row of the window
+    - **limit**: Number of rows
+    - **columns**: Only return these columns, in this order
+    
+    Response: `{"columns", "rows", "offset", "rowCount"}` as JSON, or the window as an
+    Arrow IPC stream when the Accept header asks for `application/vnd.apache.arrow.stream`.
+    """
+    try:
+        result = await _get_result_for_user(connection_id, result_id, current_user)
+        
+        result_format = negotiate_result_format(accept)
+        if result_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail=f"Supported result formats: {', '.join(RESULT_MEDIA_TYPES.values())}"
+            )
+        
+        column_indices = None
+        if columns:
+            names = [name.strip() for name in columns.split(",") if name.strip()]
+            column_indices = result_store.resolve_columns(result, names)
+        
+        window = await run_in_threadpool(result_store.read_window, result, offset, limit, column_indices)
+        if result_format == "arrow":
+            content = await run_in_threadpool(encode_arrow_table, window)
+            return Response(content=content, media_type=ARROW_STREAM_MEDIA_TYPE)
+        
+        page = {
+            "columns": [result.columns[i] for i in column_indices] if column_indices is not None else result.columns,
+            "rows": arrow_table_rows(window),
+            "offset": offset,
+            "rowCount": result.row_count
+        }
+        return Response(content=encode_json_line(page), media_type="application/json")
+        
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        # Evicted between lookup and read
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Result not found or expired"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read query result: {str(e)}"
+        )
+
+
+@router.delete("/{connection_id}/results/{result_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_query_result(
+    connection_id: str,
+    result_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    Delete a stored result before it expires.
+    """
+    result = await _get_result_for_user(connection_id, result_id, current_user)
+    result_store.delete(result.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get("/{connection_id}/queries")
+async def list_running_queries(
+    connection_id: str,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    List the queries currently running against a connection.
+    """
+    await get_connection_for_user(connection_id, current_user)
+    return [ticket.snapshot() for ticket in query_governor.running_for(connection_id)]
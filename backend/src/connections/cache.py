@@ -0,0 +1,183 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import get_settings
+
+
+# Statements whose results may be cached; anything else always goes to MySQL. Of
+# SHOW, only the forms that describe the schema: PROCESSLIST, STATUS, VARIABLES,
+# ENGINE ... STATUS and the like report live server state. EXPLAIN ANALYZE runs
+# the statement and reports its timings
+CACHEABLE_STATEMENT = re.compile(
+    r"^\s*(select|with|describe|desc|explain(?!\s+analyze)"
+    r"|show\s+(create|(full\s+)?(columns|fields|tables)|index|indexes|keys))\b",
+    re.IGNORECASE
+)
+
+# Quoted literals and identifiers are kept verbatim while normalizing whitespace
+QUOTED_TOKEN = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+
+COMMENT = re.compile(r"/\*.*?\*/|(?:--\s|#)[^\n]*", re.DOTALL)
+
+# Writes (WITH ... UPDATE/DELETE), locking reads and SELECT ... INTO are never cached
+WRITE_OR_LOCK_KEYWORD = re.compile(
+    r"\b(insert|update|delete|into|for\s+update|for\s+share|lock\s+in\s+share\s+mode)\b|:=",
+    re.IGNORECASE
+)
+
+# Functions whose result differs between executions of the same statement;
+# the second group may also be written without parentheses
+NON_DETERMINISTIC_FUNCTION = re.compile(
+    r"\b(now|sysdate|rand|uuid|uuid_short|curdate|curtime|unix_timestamp|connection_id|last_insert_id|"
+    r"found_rows|row_count|sleep|get_lock|release_lock|is_free_lock|is_used_lock|user|session_user|"
+    r"system_user|benchmark)\s*\("
+    r"|\b(current_date|current_time|current_timestamp|current_user|localtime|localtimestamp|"
+    r"utc_date|utc_time|utc_timestamp)\b",
+    re.IGNORECASE
+)
+
+CacheKey = Tuple[str, str, int, str]
+
+
+def is_cacheable_statement(sql: str) -> bool:
+    """
+    Whether a statement is a read-only, repeatable read whose result may be cached.
+    Keywords and function names are only looked for outside quoted strings,
+    identifiers and comments.
+    """
+    if not CACHEABLE_STATEMENT.match(sql):
+        return False
+    code = COMMENT.sub(" ", QUOTED_TOKEN.sub(" ? ", sql))
+    return not WRITE_OR_LOCK_KEYWORD.search(code) and not NON_DETERMINISTIC_FUNCTION.search(code)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize SQL text for use in a cache key.
+    Collapses whitespace outside quoted strings/identifiers and drops trailing semicolons.
+    """
+    parts = QUOTED_TOKEN.split(sql.strip().rstrip(";").strip())
+    # split() with a capture group alternates: unquoted, quoted, unquoted, ...
+    return "".join(
+        part if index % 2 else re.sub(r"\s+", " ", part)
+        for index, part in enumerate(parts)
+    ).strip()
+
+
+class CachedResult:
+    """An encoded query result body held in the cache."""
+
+    def __init__(self, chunks: List[bytes], row_count: int, ttl: float):
+        self.chunks = chunks
+        self.row_count = row_count
+        self.size = sum(len(chunk) for chunk in chunks)
+        self.expires_at = time.monotonic() + ttl
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+class QueryResultCache:
+    """
+    In-memory LRU cache of encoded query results.
+
+    Keys combine the connection ID, normalized SQL, the connection's schema version
+    and the result format, so a schema refresh naturally stops old entries from
+    matching. Entries also expire after a per-entry TTL, and the total size of all
+    entries is kept under ``max_bytes`` by evicting the least recently used ones.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[CacheKey, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, connection_id: str, sql: str, schema_version: int, result_format: str) -> Optional[CacheKey]:
+        """Build a cache key, or None if the statement must not be cached."""
+        if not is_cacheable_statement(sql):
+            return None
+        return (connection_id, normalize_sql(sql), schema_version, result_format)
+
+    def get(self, key: CacheKey) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expired:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: CacheKey, chunks: List[bytes], row_count: int, ttl: Optional[float] = None) -> bool:
+        """
+        Store an encoded result. Results larger than ``max_entry_bytes`` are not cached.
+
+        Returns:
+            bool: True if the result was stored
+        """
+        entry = CachedResult(chunks, row_count, ttl if ttl is not None else self.ttl)
+        if entry.size > self.max_entry_bytes or entry.size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate_connection(self, connection_id: str) -> int:
+        """Drop every entry of a connection (e.g. after its schema was refreshed)."""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == connection_id]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+_settings = get_settings()
+
+query_cache = QueryResultCache(
+    max_bytes=_settings.QUERY_CACHE_MAX_BYTES,
+    ttl=_settings.QUERY_CACHE_TTL,
+    max_entry_bytes=_settings.QUERY_CACHE_MAX_ENTRY_BYTES,
+)
@@ -0,0 +1,300 @@
+import heapq
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import get_settings
+
+from .joins import ForeignKeyGraph
+from .schema import ColumnSchema, ConnectionTable
+from .schema_cache import SchemaDerivedCache
+from .search import name_tokens, similarity, trigrams
+
+
+# Rough size of a prompt token in bytes of schema text (identifiers and punctuation)
+BYTES_PER_TOKEN = 4
+
+# Match weights: a question word naming a table says more than one naming a column
+TABLE_NAME_WEIGHT = 3.0
+COLUMN_NAME_WEIGHT = 1.0
+
+# Question words matched to schema words below this trigram similarity are ignored
+FUZZY_WORD_THRESHOLD = 0.5
+
+# Share of a matched table's score passed to the tables it is joined with by a foreign key
+NEIGHBOR_SHARE = 0.3
+
+# Best-scoring tables that are connected with a join tree (so the model can join them)
+MAX_CONNECTED_TABLES = 5
+
+# Tables considered for rendering; a prompt describing more is not compact anymore
+MAX_CONTEXT_TABLES = 200
+
+# Questions answered per connection and schema version that are kept for reuse
+MEMO_SIZE = 256
+
+# Words of a question that never name a table or column
+STOPWORDS = frozenset("""
+    a an and are as at be by can do does each for from get give how i in is it me my of on or per
+    please show tell that the their there these this those to was we were what when where which who
+    whose why with list all any find many much number our than then them they us you your
+""".split())
+
+QUESTION_WORD = re.compile(r"[a-z]+|[0-9]+")
+
+
+def normalize_word(word: str) -> str:
+    """Lowercase and crudely singularize a word, so "orders" matches "order" and "categories" "category"."""
+    word = word.lower()
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def question_words(question: str) -> Tuple[str, ...]:
+    """Distinct, normalized content words of a question, sorted (the memo key)."""
+    words = {normalize_word(word) for word in QUESTION_WORD.findall(question.lower())}
+    return tuple(sorted(word for word in words if word not in STOPWORDS and len(word) > 1))
+
+
+def format_rows(row_count: int) -> str:
+    for limit, suffix in ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K")):
+        if row_count >= limit:
+            return f"{row_count / limit:.1f}".rstrip("0").rstrip(".") + suffix
+    return str(row_count)
+
+
+class SchemaContextIndex:
+    """
+    Picks the tables and columns of a schema relevant to a question, as compact prompt text.
+
+    Built once per schema version: every table and column name is split into
+    normalized words, and each word maps to the tables whose name contains it
+    and to the matching columns. Words are weighted by inverse document
+    frequency, so ``id`` or ``created`` that appear in most tables count for
+    little. A question is answered by:
+
+    - matching its words exactly or, for typos, by trigram similarity against
+      the word vocabulary, and scoring tables by the matched words
+    - connecting the best tables with a foreign key join tree and giving their
+      direct neighbours a share of their score, so the join tables the SQL
+      needs are included
+    - using the approximate row count as a tie-breaker (bigger tables are more
+      likely to be the fact tables people ask about)
+    - rendering tables best first, with all their columns while the budget
+      allows and only key and matched columns after that
+
+    Results are memoized per normalized question words and budget.
+    """
+
+    def __init__(self, tables: List[Tuple[str, List[ColumnSchema], Optional[int]]]):
+        """
+        Args:
+            tables: ("schema.table" key, columns, approximate row count) of every table
+        """
+        self.keys: List[str] = [key for key, _, _ in tables]
+        self.table_ids: Dict[str, int] = {key: table_id for table_id, key in enumerate(self.keys)}
+        self.columns: List[List[ColumnSchema]] = [columns for _, columns, _ in tables]
+        self.row_counts: List[Optional[int]] = [row_count for _, _, row_count in tables]
+
+        # word -> table ID -> matched column IDs (an empty list when only the table name matches)
+        postings: Dict[str, Dict[int, List[int]]] = {}
+        # word -> tables whose *name* contains it
+        table_words: Dict[str, Set[int]] = {}
+        for table_id, (key, columns, _) in enumerate(tables):
+            for word in {normalize_word(token) for token in name_tokens(key.split(".", 1)[-1])}:
+                postings.setdefault(word, {}).setdefault(table_id, [])
+                table_words.setdefault(word, set()).add(table_id)
+            for column_id, column in enumerate(columns):
+                for word in {normalize_word(token) for token in name_tokens(column.name)}:
+                    postings.setdefault(word, {}).setdefault(table_id, []).append(column_id)
+        self.postings = postings
+        self.table_words = table_words
+
+        table_count = max(len(tables), 1)
+        self.idf = {word: math.log(1 + table_count / len(matches)) for word, matches in postings.items()}
+
+        self.vocabulary = list(postings)
+        self.vocabulary_trigrams = [trigrams(word) for word in self.vocabulary]
+        vocabulary_postings: Dict[str, List[int]] = {}
+        for word_id, grams in enumerate(self.vocabulary_trigrams):
+            for gram in grams:
+                vocabulary_postings.setdefault(gram, []).append(word_id)
+        self.vocabulary_postings = vocabulary_postings
+
+        self._memo: "OrderedDict[Tuple[Tuple[str, ...], int], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memo_hits = 0
+
+    def build_context(self, question: str, graph: ForeignKeyGraph, max_bytes: int) -> Dict[str, Any]:
+        """
+        Select and render the schema context for a question.
+
+        Args:
+            question: The user's question in natural language
+            graph: Foreign key graph of the same schema version
+            max_bytes: Budget of the rendered text
+
+        Returns:
+            Dict[str, Any]: ``text`` (the schema description), ``tables`` (selected
+            table keys with scores, best first), ``bytes`` and ``omittedTables``
+            (relevant tables that did not fit the budget)
+        """
+        words = question_words(question)
+        memo_key = (words, max_bytes)
+        with self._lock:
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                self._memo.move_to_end(memo_key)
+                self.memo_hits += 1
+                return cached
+
+        scores, matched_words = self._score(words)
+        ranked, relevant = self._rank(scores, graph)
+        context = self._render(ranked, relevant, matched_words, max_bytes)
+
+        with self._lock:
+            self._memo[memo_key] = context
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return context
+
+    def _score(self, words: Tuple[str, ...]) -> Tuple[Dict[int, float], List[str]]:
+        """Score tables by the question words their table and column names contain. Also returns the matched schema words."""
+        scores: Dict[int, float] = {}
+        matched_words = []
+        for word in words:
+            for schema_word, closeness in self._similar_words(word):
+                matched_words.append(schema_word)
+                weight = self.idf[schema_word] * closeness
+                table_weight = weight * TABLE_NAME_WEIGHT
+                in_table_name = self.table_words.get(schema_word, ())
+                # A schema word lists each table once, so a question word counts once per table
+                for table_id in self.postings[schema_word]:
+                    scores[table_id] = scores.get(table_id, 0.0) + (table_weight if table_id in in_table_name else weight)
+        return scores, matched_words
+
+    def _similar_words(self, word: str) -> List[Tuple[str, float]]:
+        """Schema words matching a question word: itself if known, otherwise close spellings."""
+        if word in self.postings:
+            return [(word, 1.0)]
+        if word.isdigit() or len(word) < 4:
+            return []
+        grams = trigrams(word)
+        candidates: Set[int] = set()
+        for gram in grams:
+            candidates.update(self.vocabulary_postings.get(gram, ()))
+        matches = []
+        for word_id in candidates:
+            closeness = similarity(grams, self.vocabulary_trigrams[word_id])
+            if closeness >= FUZZY_WORD_THRESHOLD:
+                matches.append((closeness, self.vocabulary[word_id]))
+        # Only the closest spelling: a typo stands for one word, not all its neighbours
+        return [(best, closeness) for closeness, best in sorted(matches, reverse=True)[:1]]
+
+    def _rank(self, scores: Dict[int, float], graph: ForeignKeyGraph) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Add join tables and foreign key neighbours to the matched tables and order them.
+        Returns the best MAX_CONTEXT_TABLES tables and the number of relevant tables.
+        """
+        if not scores:
+            return [], 0
+        ranked = dict(scores)
+        seeds = heapq.nlargest(MAX_CONNECTED_TABLES, scores, key=scores.__getitem__)
+
+        # Tables on the join tree of the best matches rank right after the weakest of them
+        if len(seeds) > 1:
+            connector_score = scores[seeds[-1]] * 0.9
+            for key in graph.path_tables(graph.steiner_tree([self.keys[table_id] for table_id in seeds]) or []):
+                table_id = self.table_ids.get(key)
+                if table_id is not None and table_id not in ranked:
+                    ranked[table_id] = connector_score
+
+        for table_id in seeds:
+            node = graph.node_ids.get(self.keys[table_id])
+            if node is None:
+                continue
+            for neighbor, _ in graph.adjacency[node]:
+                neighbor_id = self.table_ids.get(graph.keys[neighbor])
+                if neighbor_id is not None:
+                    ranked[neighbor_id] = max(ranked.get(neighbor_id, 0.0), scores[table_id] * NEIGHBOR_SHARE)
+
+        def priority(item: Tuple[int, float]) -> Tuple[float, int, str]:
+            table_id, score = item
+            # Tables matching the same words score exactly the same; the row count decides between them
+            return (-score, -(self.row_counts[table_id] or 0), self.keys[table_id])
+
+        return heapq.nsmallest(MAX_CONTEXT_TABLES, ranked.items(), key=priority), len(ranked)
+
+    def _render(
+        self,
+        ranked: List[Tuple[int, float]],
+        relevant: int,
+        matched_words: List[str],
+        max_bytes: int
+    ) -> Dict[str, Any]:
+        """Render tables best first, falling back to key and matched columns when the budget runs low."""
+        lines: List[str] = []
+        selected: List[Dict[str, Any]] = []
+        used = 0
+        for table_id, score in ranked:
+            line = self._render_table(table_id, None)
+            size = len(line.encode("utf-8")) + 1
+            if used + size > max_bytes:
+                matched = {column_id for word in matched_words for column_id in self.postings[word].get(table_id, ())}
+                line = self._render_table(table_id, matched)
+                size = len(line.encode("utf-8")) + 1
+                if used + size > max_bytes:
+                    # Less relevant tables may be shorter, but are not worth rendering thousands of
+                    break
+            lines.append(line)
+            used += size
+            selected.append({"table": self.keys[table_id], "score": round(score, 3)})
+        return {
+            "text": "\n".join(lines),
+            "tables": selected,
+            "bytes": max(used - 1, 0),
+            "omittedTables": relevant - len(selected)
+        }
+
+    def _render_table(self, table_id: int, keep: Optional[Set[int]]) -> str:
+        """
+        One line per table: ``shop.orders (~1.2M rows): id int PK, customer_id int -> customers.id``.
+        With ``keep``, only key columns and those in ``keep`` are listed, plus how many were left out.
+        """
+        parts = []
+        columns = self.columns[table_id]
+        for column_id, column in enumerate(columns):
+            is_key = column.isPrimary or column.referenceTable
+            if keep is not None and not is_key and column_id not in keep:
+                continue
+            part = f"{column.name} {column.type}"
+            if column.isPrimary:
+                part += " PK"
+            if column.referenceTable:
+                part += f" -> {column.referenceTable}.{column.referenceColumn}"
+            parts.append(part)
+        if len(parts) < len(columns):
+            parts.append(f"+{len(columns) - len(parts)} more")
+
+        row_count = self.row_counts[table_id]
+        size = f" (~{format_rows(row_count)} rows)" if row_count is not None else ""
+        return f"{self.keys[table_id]}{size}: {', '.join(parts)}"
+
+
+def build_schema_context_index(tables: List[ConnectionTable]) -> SchemaContextIndex:
+    # Row counts are those stored when the schema version was built; they only break ties
+    return SchemaContextIndex([
+        (table.key, table.columns, table.stats.rowCount if table.stats else None)
+        for table in tables
+    ])
+
+
+schema_context_indexes = SchemaDerivedCache(
+    build_schema_context_index,
+    max_connections=get_settings().SCHEMA_INDEX_MAX_CONNECTIONS
+)
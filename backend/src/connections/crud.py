@@ -1,6 +1,17 @@
-from typing import Optional
+import re
+from typing import Dict, List, Optional
 from beanie import PydanticObjectId
-from .schema import Connection
+from beanie.operators import GT, In, RegEx
+from pymongo import UpdateOne
+from .schema import (
+    Connection,
+    ConnectionTable,
+    SchemaStateView,
+    TableFingerprint,
+    TableSchema,
+    TableStats,
+    TableStatsView,
+)
 
 
 async def get_connection_by_id(connection_id: str) -> Optional[Connection]:
@@ -30,3 +41,143 @@ async def get_connection_by_id(connection_id: str) -> Optional[Connection]:
         if "Invalid ObjectId" in str(e):
             raise ValueError(f"Invalid connection ID format: {connection_id}")
         raise e
+
+
+async def get_connection_tables(
+    connection_id: PydanticObjectId,
+    tables: Optional[List[str]] = None,
+    prefix: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+) -> List[ConnectionTable]:
+    """
+    Read stored tables of a connection, sorted by "schema.table" key.
+    
+    Args:
+        connection_id: ID of the connection owning the tables
+        tables: Optional list of "schema.table" keys to return
+        prefix: Optional key prefix filter (e.g. "classicmodels.")
+        skip: Number of tables to skip (paging)
+        limit: Maximum number of tables to return; all when omitted
+        after: Only return tables whose key sorts after this one (keyset paging)
+        
+    Returns:
+        List[ConnectionTable]: The matching table documents
+    """
+    query = ConnectionTable.find(ConnectionTable.connectionId == connection_id)
+    if tables:
+        query = query.find(In(ConnectionTable.key, tables))
+    if prefix:
+        # Anchored, escaped regex so the (connectionId, key) index bounds the scan
+        query = query.find(RegEx(ConnectionTable.key, f"^{re.escape(prefix)}"))
+    if after is not None:
+        query = query.find(GT(ConnectionTable.key, after))
+    
+    query = query.sort(+ConnectionTable.key).skip(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return await query.to_list()
+
+
+async def get_connection_table(connection_id: PydanticObjectId, key: str) -> Optional[ConnectionTable]:
+    """Read one stored table of a connection by its "schema.table" key."""
+    return await ConnectionTable.find_one(
+        ConnectionTable.connectionId == connection_id,
+        ConnectionTable.key == key
+    )
+
+
+async def get_schema_state(connection_id: PydanticObjectId) -> Optional[SchemaStateView]:
+    """Read a connection's schema version, status and table count, without its other fields."""
+    return await Connection.find_one(Connection.id == connection_id).project(SchemaStateView)
+
+
+async def count_connection_tables(connection_id: PydanticObjectId) -> int:
+    """Count the stored tables of a connection."""
+    return await ConnectionTable.find(ConnectionTable.connectionId == connection_id).count()
+
+
+async def get_table_fingerprints(connection_id: PydanticObjectId) -> Dict[str, str]:
+    """Return the stored fingerprint of every table of a connection, keyed by "schema.table"."""
+    rows = await ConnectionTable.find(
+        ConnectionTable.connectionId == connection_id
+    ).project(TableFingerprint).to_list()
+    return {row.key: row.fingerprint for row in rows if row.fingerprint}
+
+
+async def apply_table_changes(
+    connection_id: PydanticObjectId,
+    changed: Dict[str, TableSchema],
+    removed: List[str],
+    fingerprints: Dict[str, str]
+) -> None:
+    """
+    Upsert changed tables and delete removed ones in the connection_tables collection.
+    
+    Args:
+        connection_id: ID of the connection owning the tables
+        changed: Added or modified tables keyed by "schema.table"
+        removed: Keys of tables that no longer exist
+        fingerprints: Current fingerprint per table key
+    """
+    collection = ConnectionTable.get_pymongo_collection()
+    
+    if changed:
+        # $set rather than a replacement, so statistics collected separately survive
+        operations = [
+            UpdateOne(
+                {"connectionId": connection_id, "key": key},
+                {"$set": ConnectionTable(
+                    connectionId=connection_id,
+                    key=key,
+                    name=table.name,
+                    database_schema=table.database_schema,
+                    columns=table.columns,
+                    fingerprint=fingerprints.get(key)
+                ).model_dump(exclude={"id", "revision_id", "stats"})},
+                upsert=True
+            )
+            for key, table in changed.items()
+        ]
+        await collection.bulk_write(operations, ordered=False)
+    
+    if removed:
+        await collection.delete_many({"connectionId": connection_id, "key": {"$in": removed}})
+
+
+async def get_table_stats(
+    connection_id: PydanticObjectId,
+    tables: Optional[List[str]] = None
+) -> Dict[str, Optional[TableStats]]:
+    """
+    Return the stored statistics of a connection's tables, keyed by "schema.table".
+    Tables whose statistics were not collected yet map to None.
+    """
+    query = ConnectionTable.find(ConnectionTable.connectionId == connection_id)
+    if tables is not None:
+        query = query.find(In(ConnectionTable.key, tables))
+    rows = await query.sort(+ConnectionTable.key).project(TableStatsView).to_list()
+    return {row.key: row.stats for row in rows}
+
+
+async def apply_table_stats(connection_id: PydanticObjectId, stats: Dict[str, TableStats]) -> None:
+    """
+    Store freshly collected statistics on the connection's existing tables.
+    Statistics of tables that are not stored (yet) are dropped.
+    """
+    if not stats:
+        return
+    operations = [
+        UpdateOne(
+            {"connectionId": connection_id, "key": key},
+            {"$set": {"stats": table_stats.model_dump()}}
+        )
+        for key, table_stats in stats.items()
+    ]
+    await ConnectionTable.get_pymongo_collection().bulk_write(operations, ordered=False)
+
+
+async def delete_connection_tables(connection_id: PydanticObjectId) -> None:
+    """Delete every stored table of a connection."""
+    await ConnectionTable.find(ConnectionTable.connectionId == connection_id).delete()
@@ -0,0 +1,393 @@
+import base64
+import json
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+import pyarrow as pa
+from fastapi import HTTPException
+from mysql.connector import FieldFlag, FieldType
+
+from .cache import CacheKey, CachedResult, query_cache
+from .handlers.mysql import BINARY_CHARSET_ID, MySQLQueryStream
+from .handlers.mysql_async import AsyncMySQLQueryStream
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+QueryStream = Union[MySQLQueryStream, AsyncMySQLQueryStream]
+
+# Result format name -> media type, in server preference order
+RESULT_MEDIA_TYPES = {
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "arrow": ARROW_STREAM_MEDIA_TYPE,
+}
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Schema stream format name -> media type, in server preference order
+SCHEMA_STREAM_MEDIA_TYPES = {
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "sse": SSE_MEDIA_TYPE,
+}
+
+
+def negotiate_result_format(accept: Optional[str], media_types: Dict[str, str] = RESULT_MEDIA_TYPES) -> Optional[str]:
+    """
+    Pick a query result format (or another format of ``media_types``) from an Accept header.
+    
+    Returns the supported format with the highest q-value (ties go to NDJSON),
+    "ndjson" when the header is missing or only has wildcards/application/json,
+    and None when nothing acceptable is supported.
+    """
+    if not accept:
+        return "ndjson"
+    
+    best_format, best_q = None, 0.0
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type in ("*/*", "application/*", "application/json"):
+            candidates = ["ndjson"]
+        else:
+            candidates = [name for name, value in media_types.items() if value == media_type]
+        for candidate in candidates:
+            if q > best_q:
+                best_format, best_q = candidate, q
+    return best_format
+
+
+def negotiate_content_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """
+    Pick a content coding from an Accept-Encoding header.
+    
+    Returns the available coding with the highest q-value (ties go to the
+    first in ``available``, so list the smallest first), or "identity" when
+    the header is missing or accepts none of them.
+    """
+    if not accept_encoding:
+        return "identity"
+    
+    accepted = {}
+    for coding in accept_encoding.split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[name.lower()] = q
+    
+    best_coding, best_q = "identity", 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best_coding, best_q = coding, q
+    return best_coding
+
+
+def json_default(value: Any) -> Any:
+    """Encode MySQL result values that json does not handle natively."""
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Strings keep the exact precision of DECIMAL columns
+        return str(value)
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json_line(value: Any) -> bytes:
+    return json.dumps(value, default=json_default, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class _CacheCollector:
+    """Collects encoded chunks for the result cache until they outgrow the per-entry limit."""
+    
+    def __init__(self, cache_key: Optional[CacheKey]):
+        self.cache_key = cache_key
+        self.chunks: Optional[List[bytes]] = [] if cache_key else None
+        self.size = 0
+    
+    def add(self, chunk: bytes) -> None:
+        if self.chunks is None:
+            return
+        self.size += len(chunk)
+        if self.size <= query_cache.max_entry_bytes:
+            self.chunks.append(chunk)
+        else:
+            # Too big to cache: stop collecting instead of buffering the whole result
+            self.chunks = None
+    
+    def store(self, row_count: int) -> None:
+        if self.chunks is not None:
+            query_cache.put(self.cache_key, self.chunks, row_count)
+
+
+class _NdjsonEncoder:
+    """
+    NDJSON encoding of a query stream: a columns line, one JSON array per row
+    and a summary line. Errors after the response has started are reported as
+    a final {"error": ...} line.
+    """
+
+    def __init__(self, stream: QueryStream, started_at: float, cache_key: Optional[CacheKey]):
+        self.stream = stream
+        self.started_at = started_at
+        self.collector = _CacheCollector(cache_key)
+
+    def header(self) -> bytes:
+        header = encode_json_line({"columns": self.stream.columns})
+        self.collector.add(header)
+        return header
+
+    def rows(self, rows: List[tuple]) -> bytes:
+        chunk = b"".join(encode_json_line(list(row)) for row in rows)
+        self.collector.add(chunk)
+        return chunk
+
+    def failure(self, error: Exception) -> bytes:
+        detail = error.detail if isinstance(error, HTTPException) else str(error)
+        return encode_json_line({"error": detail, "rowCount": self.stream.row_count})
+
+    def trailer(self) -> bytes:
+        # The summary line is not cached; replays append a fresh one
+        self.collector.store(self.stream.row_count)
+        return encode_json_line({
+            "rowCount": self.stream.row_count,
+            "elapsedMs": round((time.monotonic() - self.started_at) * 1000, 1)
+        })
+
+
+def _encode_stream(encoder, stream: QueryStream) -> Iterator[bytes]:
+    yield encoder.header()
+    try:
+        for rows in stream:
+            yield encoder.rows(rows)
+    except Exception as e:
+        chunk = encoder.failure(e)
+        if chunk:
+            yield chunk
+        return
+    yield encoder.trailer()
+
+
+async def _encode_async_stream(encoder, stream: QueryStream) -> AsyncIterator[bytes]:
+    yield encoder.header()
+    try:
+        async for rows in stream:
+            yield encoder.rows(rows)
+    except Exception as e:
+        chunk = encoder.failure(e)
+        if chunk:
+            yield chunk
+        return
+    yield encoder.trailer()
+
+
+def _encode(encoder, stream: QueryStream) -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+    """Drive an encoder over a sync stream (iterated on a worker thread) or an async one."""
+    if hasattr(stream, "__aiter__"):
+        return _encode_async_stream(encoder, stream)
+    return _encode_stream(encoder, stream)
+
+
+def ndjson_query_stream(
+    stream: QueryStream,
+    started_at: float,
+    cache_key: Optional[CacheKey] = None
+) -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+    """
+    Encode an opened query stream as NDJSON.
+
+    The first line describes the columns, each following line is one row as a
+    JSON array, and the last line reports the row count and elapsed time. Errors
+    after the response has started are reported as a final {"error": ...} line.
+
+    With a ``cache_key``, the encoded body is kept while it stays under the cache's
+    per-entry limit and stored once the stream completes successfully.
+    The body is an async iterator for streams of the async driver.
+    """
+    return _encode(_NdjsonEncoder(stream, started_at, cache_key), stream)
+
+
+def ndjson_cached_stream(entry: CachedResult, started_at: float) -> Iterator[bytes]:
+    """Replay a cached NDJSON body, followed by a fresh summary line."""
+    yield from entry.chunks
+    yield encode_json_line({
+        "rowCount": entry.row_count,
+        "elapsedMs": round((time.monotonic() - started_at) * 1000, 1),
+        "cached": True
+    })
+
+
+def arrow_type_for_field(type_code: int, flags: int = 0, charset: Optional[int] = None) -> pa.DataType:
+    """
+    Map a MySQL protocol field type from a cursor description to an Arrow type.
+    Follows the same groups as map_mysql_type, with the Arrow type each group needs.
+    DECIMAL stays a string so no precision is lost, matching the JSON encoding.
+    """
+    if type_code in (FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG,
+                     FieldType.YEAR, FieldType.BIT):
+        return pa.int64()
+    if type_code == FieldType.LONGLONG:
+        return pa.uint64() if flags & FieldFlag.UNSIGNED else pa.int64()
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return pa.float64()
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp("us")
+    if type_code == FieldType.TIME:
+        return pa.duration("us")
+    if type_code == FieldType.GEOMETRY:
+        return pa.binary()
+    if type_code in (FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB, FieldType.BLOB,
+                     FieldType.VARCHAR, FieldType.VAR_STRING, FieldType.STRING):
+        is_binary = charset == BINARY_CHARSET_ID if charset is not None else bool(flags & FieldFlag.BINARY)
+        return pa.binary() if is_binary else pa.string()
+    # DECIMAL, NEWDECIMAL, JSON, ENUM, SET and anything unknown
+    return pa.string()
+
+
+def arrow_schema_for_description(description: List[tuple]) -> pa.Schema:
+    """Build an Arrow schema from a cursor description."""
+    return pa.schema([
+        pa.field(
+            column[0],
+            arrow_type_for_field(column[1], column[7] if len(column) > 7 else 0,
+                                 column[8] if len(column) > 8 else None),
+            nullable=True
+        )
+        for column in description
+    ])
+
+
+def _to_arrow_value(value: Any, arrow_type: pa.DataType) -> Any:
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        if isinstance(value, (bytes, bytearray)):
+            return value.decode("utf-8", errors="replace")
+        if isinstance(value, set):
+            return ",".join(sorted(value))
+        return value if isinstance(value, str) else str(value)
+    return value
+
+
+def arrow_record_batch(schema: pa.Schema, rows: List[tuple]) -> pa.RecordBatch:
+    """Transpose a chunk of row tuples into an Arrow record batch."""
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_string(field.type):
+            values = [_to_arrow_value(value, field.type) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ByteSink:
+    """Minimal writable file object that hands written bytes back to the caller."""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self) -> None:
+        pass
+    
+    def close(self) -> None:
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class _ArrowEncoder:
+    """
+    Arrow IPC encoding of a query stream: one record batch per chunk of rows.
+    If the stream fails midway, the body ends without the end-of-stream marker,
+    so Arrow readers report it as incomplete.
+    """
+
+    def __init__(self, stream: QueryStream, cache_key: Optional[CacheKey]):
+        self.stream = stream
+        self.schema = arrow_schema_for_description(stream.description)
+        self.collector = _CacheCollector(cache_key)
+        self.sink = _ByteSink()
+        self.writer = pa.ipc.new_stream(self.sink, self.schema)
+
+    def _flush(self) -> bytes:
+        chunk = self.sink.drain()
+        self.collector.add(chunk)
+        return chunk
+
+    def header(self) -> bytes:
+        return self._flush()
+
+    def rows(self, rows: List[tuple]) -> bytes:
+        self.writer.write_batch(arrow_record_batch(self.schema, rows))
+        return self._flush()
+
+    def failure(self, error: Exception) -> bytes:
+        raise error
+
+    def trailer(self) -> bytes:
+        self.writer.close()
+        chunk = self._flush()
+        self.collector.store(self.stream.row_count)
+        return chunk
+
+
+def arrow_query_stream(
+    stream: QueryStream,
+    cache_key: Optional[CacheKey] = None
+) -> Union[Iterator[bytes], AsyncIterator[bytes]]:
+    """
+    Encode an opened query stream as an Arrow IPC stream.
+    
+    Every chunk of rows fetched from MySQL becomes one record batch. Column types
+    come from the cursor description. If the stream fails midway, the body ends
+    without the end-of-stream marker, so Arrow readers report it as incomplete.
+    The body is an async iterator for streams of the async driver.
+    """
+    return _encode(_ArrowEncoder(stream, cache_key), stream)
+
+
+def encode_arrow_table(table: pa.Table) -> bytes:
+    """Encode a table as a complete Arrow IPC stream."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_table_rows(table: pa.Table) -> List[list]:
+    """Convert a table to a list of row lists, e.g. for JSON encoding."""
+    columns = [column.to_pylist() for column in table.columns]
+    return [list(row) for row in zip(*columns)] if columns else []
+
+
+def arrow_cached_stream(entry: CachedResult) -> Iterator[bytes]:
+    """Replay a cached Arrow IPC stream."""
+    yield from entry.chunks
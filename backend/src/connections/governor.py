@@ -0,0 +1,541 @@
+import asyncio
+import itertools
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import iterate_in_threadpool
+
+from config import get_settings
+
+from .handlers.mysql import MySQLQueryStream
+from .handlers.mysql_async import AsyncMySQLQueryStream
+
+
+class QueryPriority(str, Enum):
+    INTERACTIVE = "interactive"  # chat and editor queries a user is waiting on
+    EXPORT = "export"            # result materialization
+    BACKGROUND = "background"    # scheduled schema refreshes
+
+
+# Share of a workspace's turns each class gets while several are waiting
+PRIORITY_WEIGHTS = {
+    QueryPriority.INTERACTIVE: 8,
+    QueryPriority.EXPORT: 2,
+    QueryPriority.BACKGROUND: 1,
+}
+
+# Recent queue waits kept per workspace for percentiles
+WAIT_SAMPLE_SIZE = 1024
+
+
+class QueryTicket:
+    """An admitted query: holds a concurrency slot until it is released."""
+
+    def __init__(
+        self,
+        connection_id: str,
+        workspace_id: str,
+        user_id: str,
+        priority: QueryPriority = QueryPriority.INTERACTIVE,
+        queued_seconds: float = 0.0
+    ):
+        self.id = uuid.uuid4().hex
+        self.connection_id = connection_id
+        self.workspace_id = workspace_id
+        self.user_id = user_id
+        self.priority = priority
+        self.queued_seconds = queued_seconds
+        self.stream: Optional[Union[MySQLQueryStream, AsyncMySQLQueryStream]] = None
+        self.cancel_reason: Optional[str] = None
+        self.started_at = datetime.now()
+        self.released = False
+        self._timeout_handle: Optional[asyncio.TimerHandle] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queryId": self.id,
+            "connectionId": self.connection_id,
+            "userId": self.user_id,
+            "priority": self.priority,
+            "queuedSeconds": round(self.queued_seconds, 3),
+            "startedAt": self.started_at,
+            "rowCount": self.stream.row_count if self.stream else 0,
+            "cancelReason": self.cancel_reason,
+        }
+
+
+class _Waiter:
+    def __init__(
+        self,
+        connection_id: str,
+        workspace_id: str,
+        start: float,
+        tag: float,
+        class_start: float,
+        class_tag: float,
+        sequence: int,
+        future: asyncio.Future,
+        bounded: bool = True
+    ):
+        self.connection_id = connection_id
+        self.workspace_id = workspace_id
+        # The workspace turn (virtual start and finish tag) this waiter currently holds;
+        # turns are handed to the workspace's waiters in class tag order (see _reorder)
+        self.start = start
+        self.tag = tag
+        self.turn_sequence = sequence
+        # Position within the workspace, among its priority class flows
+        self.class_start = class_start
+        self.class_tag = class_tag
+        self.sequence = sequence
+        self.future = future
+        self.bounded = bounded
+
+
+class WorkspaceQueueStats:
+    """Admission counters and recent queue waits of one workspace."""
+
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits.append(seconds)
+
+    def snapshot(self, queued: int, running: int) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(int(p * len(waits)), len(waits) - 1)], 4) if waits else 0.0
+
+        return {
+            "queued": queued,
+            "running": running,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queueTimeouts": self.queue_timeouts,
+            "waitP50Seconds": percentile(0.50),
+            "waitP95Seconds": percentile(0.95),
+            "waitP99Seconds": percentile(0.99),
+            "waitMaxSeconds": round(waits[-1], 4) if waits else 0.0,
+        }
+
+
+class QueryGovernor:
+    """
+    Admission control, fair scheduling and cancellation for user SQL.
+
+    At most ``max_running`` queries run at once overall, ``max_per_connection``
+    against one connection and ``max_per_workspace`` across all connections of a
+    workspace. Further queries wait, at most ``max_queued`` per workspace, for
+    up to ``queue_timeout`` seconds.
+
+    Waiting queries are ordered by two levels of weighted fair queuing. Each
+    workspace is a flow whose queries get turns with virtual finish tags
+    ``max(virtual time, workspace's last tag) + 1``, and free slots go to the
+    lowest tag that has room. A workspace that floods the queue only pushes its
+    own tags further out, so a light workspace's next query is served after at
+    most one query per competing workspace. Inside a workspace, each priority
+    class is a flow of its own, tagged ``max(workspace's class virtual time,
+    class's last tag) + 1 / weight``, and the workspace's turns go to its
+    waiters in class tag order: an interactive query overtakes queued exports
+    and refreshes of its workspace, and gets several turns for each of theirs.
+    A waiter blocked by its own connection/workspace limit does not hold back
+    waiters whose limits have room.
+
+    Statements that outlive ``statement_timeout`` seconds, whose client went away,
+    or that are cancelled explicitly are stopped on the server with KILL QUERY,
+    so an abandoned browser tab frees its MySQL session instead of holding it
+    until the statement finishes.
+
+    All bookkeeping happens on the event loop; only the kill itself runs on a thread.
+    """
+
+    def __init__(
+        self,
+        max_running: int,
+        max_per_connection: int,
+        max_per_workspace: int,
+        max_queued: int,
+        queue_timeout: float,
+        statement_timeout: float,
+        disconnect_poll_interval: float = 1.0
+    ):
+        self.max_running = max_running
+        self.max_per_connection = max_per_connection
+        self.max_per_workspace = max_per_workspace
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.statement_timeout = statement_timeout
+        self.disconnect_poll_interval = disconnect_poll_interval
+        self._running: Dict[str, QueryTicket] = {}
+        self._running_per_connection: Dict[str, int] = {}
+        self._running_per_workspace: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._queued_per_workspace: Dict[str, int] = {}
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._class_virtual_time: Dict[str, float] = {}
+        self._last_class_tag: Dict[Tuple[str, QueryPriority], float] = {}
+        self._sequence = itertools.count()
+        self._workspace_stats: Dict[str, WorkspaceQueueStats] = {}
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.cancellations: Dict[str, int] = {}
+
+    @property
+    def statement_timeout_ms(self) -> int:
+        return int(self.statement_timeout * 1000)
+
+    async def admit(
+        self,
+        connection_id: str,
+        workspace_id: str,
+        user_id: str,
+        priority: QueryPriority = QueryPriority.INTERACTIVE,
+        wait_indefinitely: bool = False
+    ) -> QueryTicket:
+        """
+        Wait for a free slot and return a ticket holding it. Call release() when done.
+
+        With ``wait_indefinitely`` the query neither counts against the queue limit
+        nor times out; background work uses this so it is delayed instead of failing.
+
+        Raises:
+            HTTPException:
+                - 429: The workspace's wait queue is full
+                - 503: No slot became free within the queue timeout
+        """
+        stats = self._stats_for(workspace_id)
+        start, tag = self._next_tag(workspace_id)
+        class_start, class_tag = self._next_class_tag(workspace_id, priority)
+
+        # Waiters are woken as soon as their limits have room, so a query with room
+        # now cannot be overtaking an earlier query that is waiting for the same slots
+        if self._has_room(connection_id, workspace_id):
+            self._take(connection_id, workspace_id, start, class_start)
+            stats.record_wait(0.0)
+            return self._grant(connection_id, workspace_id, user_id, priority, 0.0)
+
+        if not wait_indefinitely and self._bounded_queue_depth(workspace_id) >= self.max_queued:
+            self.rejected += 1
+            stats.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many queries of this workspace are waiting to run, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        enqueued_at = time.monotonic()
+        waiter = _Waiter(connection_id, workspace_id, start, tag, class_start, class_tag, next(self._sequence),
+                         asyncio.get_running_loop().create_future(), bounded=not wait_indefinitely)
+        self._enqueue(waiter)
+        try:
+            await asyncio.wait_for(waiter.future, timeout=None if wait_indefinitely else self.queue_timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted in the same tick the wait ended: hand it on
+                self._free(connection_id, workspace_id)
+            else:
+                self._dequeue(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.queue_timeouts += 1
+                stats.queue_timeouts += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Timed out waiting for a free query slot on this connection",
+                    headers={"Retry-After": "5"}
+                )
+            raise
+
+        queued_seconds = time.monotonic() - enqueued_at
+        stats.record_wait(queued_seconds)
+        return self._grant(connection_id, workspace_id, user_id, priority, queued_seconds)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        connection_id: str,
+        workspace_id: str,
+        user_id: str,
+        priority: QueryPriority,
+        wait_indefinitely: bool = False
+    ) -> AsyncIterator[QueryTicket]:
+        """Hold a slot for the duration of the block, for work that is not a single streamed statement."""
+        ticket = await self.admit(connection_id, workspace_id, user_id, priority, wait_indefinitely)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def attach(self, ticket: QueryTicket, stream: Union[MySQLQueryStream, AsyncMySQLQueryStream]) -> None:
+        """
+        Associate the MySQL stream a ticket runs, and arm the statement timeout.
+
+        Raises:
+            HTTPException: 499/504 if the query was cancelled before its stream was
+                attached (it had nothing to kill yet); the statement must not run
+        """
+        ticket.stream = stream
+        if ticket.cancel_reason is not None:
+            self._kill(ticket)
+            raise self.cancelled_error(ticket)
+        if self.statement_timeout > 0:
+            ticket._timeout_handle = asyncio.get_running_loop().call_later(
+                self.statement_timeout, self.cancel, ticket, "timeout"
+            )
+
+    def cancel(self, ticket: QueryTicket, reason: str = "cancelled") -> bool:
+        """
+        Kill a ticket's statement on the server. Returns immediately; the kill runs
+        on a thread, or as a task for async streams.
+
+        Returns:
+            bool: False if the ticket was already released or cancelled
+        """
+        if ticket.released or ticket.cancel_reason is not None:
+            return False
+        ticket.cancel_reason = reason
+        self.cancellations[reason] = self.cancellations.get(reason, 0) + 1
+        if ticket.stream is not None:
+            self._kill(ticket)
+        return True
+
+    @staticmethod
+    def cancelled_error(ticket: QueryTicket) -> HTTPException:
+        """The error a cancelled query ends with: 504 for the statement timeout, 499 otherwise."""
+        if ticket.cancel_reason == "timeout":
+            return HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Query exceeded the statement timeout and was stopped"
+            )
+        return HTTPException(
+            status_code=499,
+            detail=f"Query was stopped ({ticket.cancel_reason})"
+        )
+
+    def _kill(self, ticket: QueryTicket) -> None:
+        if asyncio.iscoroutinefunction(ticket.stream.cancel):
+            task = asyncio.ensure_future(ticket.stream.cancel())
+        else:
+            task = asyncio.get_running_loop().run_in_executor(None, ticket.stream.cancel)
+        task.add_done_callback(lambda future: self._log_kill_failure(ticket, future))
+
+    def release(self, ticket: QueryTicket) -> None:
+        """Free a ticket's slot and admit waiting queries. Idempotent."""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket._timeout_handle is not None:
+            ticket._timeout_handle.cancel()
+        self._running.pop(ticket.id, None)
+        self._free(ticket.connection_id, ticket.workspace_id)
+
+    def get(self, query_id: str) -> Optional[QueryTicket]:
+        return self._running.get(query_id)
+
+    def running_for(self, connection_id: str) -> List[QueryTicket]:
+        return [ticket for ticket in self._running.values() if ticket.connection_id == connection_id]
+
+    @asynccontextmanager
+    async def watch_disconnect(self, ticket: QueryTicket, request: Request):
+        """Cancel the ticket's statement if the client disconnects while the block runs."""
+        async def watch() -> None:
+            while not await request.is_disconnected():
+                await asyncio.sleep(self.disconnect_poll_interval)
+            self.cancel(ticket, "disconnect")
+
+        # A separate task: it must keep running while the caller is blocked
+        # on a worker thread that cannot be interrupted
+        watcher = asyncio.create_task(watch())
+        try:
+            yield
+        finally:
+            watcher.cancel()
+
+    async def govern(
+        self,
+        ticket: QueryTicket,
+        body: Union[Iterator[bytes], AsyncIterator[bytes]],
+        request: Request
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a response body while holding the ticket's slot.
+        Sync bodies are iterated on a worker thread, async bodies on the event loop.
+
+        The slot is released when the body ends, and the statement is killed if
+        the body does not run to completion (client disconnect, send failure).
+        """
+        completed = False
+        try:
+            async with self.watch_disconnect(ticket, request):
+                chunks = body if hasattr(body, "__aiter__") else iterate_in_threadpool(body)
+                async for chunk in chunks:
+                    yield chunk
+            completed = True
+        finally:
+            if not completed:
+                self.cancel(ticket, "disconnect")
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "queued": len(self._waiters),
+            "maxRunning": self.max_running,
+            "maxPerConnection": self.max_per_connection,
+            "maxPerWorkspace": self.max_per_workspace,
+            "maxQueued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queueTimeouts": self.queue_timeouts,
+            "cancellations": dict(self.cancellations),
+        }
+
+    def workspace_stats(self, workspace_id: str) -> Dict[str, Any]:
+        """Queue depth, running count and recent queue wait percentiles of one workspace."""
+        return self._stats_for(workspace_id).snapshot(
+            queued=self._queued_per_workspace.get(workspace_id, 0),
+            running=self._running_per_workspace.get(workspace_id, 0)
+        )
+
+    def _stats_for(self, workspace_id: str) -> WorkspaceQueueStats:
+        stats = self._workspace_stats.get(workspace_id)
+        if stats is None:
+            stats = self._workspace_stats[workspace_id] = WorkspaceQueueStats()
+        return stats
+
+    def _next_tag(self, workspace_id: str) -> Tuple[float, float]:
+        """Return the virtual start and finish tags of a workspace's next turn."""
+        start = max(self._virtual_time, self._last_tag.get(workspace_id, 0.0))
+        tag = start + 1.0
+        self._last_tag[workspace_id] = tag
+        return start, tag
+
+    def _next_class_tag(self, workspace_id: str, priority: QueryPriority) -> Tuple[float, float]:
+        """Return the virtual start and finish tags of a query within its workspace's class flows."""
+        start = max(self._class_virtual_time.get(workspace_id, 0.0), self._last_class_tag.get((workspace_id, priority), 0.0))
+        tag = start + 1.0 / PRIORITY_WEIGHTS[priority]
+        self._last_class_tag[(workspace_id, priority)] = tag
+        return start, tag
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        self._waiters.append(waiter)
+        self._queued_per_workspace[waiter.workspace_id] = self._queued_per_workspace.get(waiter.workspace_id, 0) + 1
+        self._reorder()
+
+    def _reorder(self) -> None:
+        """
+        Hand each workspace's turns (in tag order) to its waiters in class tag
+        order, then order all waiters by the turn they hold.
+        """
+        by_workspace: Dict[str, List[_Waiter]] = {}
+        for waiter in self._waiters:
+            by_workspace.setdefault(waiter.workspace_id, []).append(waiter)
+        for waiters in by_workspace.values():
+            turns = sorted(((w.tag, w.turn_sequence, w.start) for w in waiters))
+            for waiter, (tag, turn_sequence, start) in zip(sorted(waiters, key=lambda w: (w.class_tag, w.sequence)), turns):
+                waiter.tag, waiter.turn_sequence, waiter.start = tag, turn_sequence, start
+        self._waiters.sort(key=lambda w: (w.tag, w.turn_sequence))
+
+    def _bounded_queue_depth(self, workspace_id: str) -> int:
+        return sum(1 for waiter in self._waiters if waiter.workspace_id == workspace_id and waiter.bounded)
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        if waiter not in self._waiters:
+            return
+        self._waiters.remove(waiter)
+        self._queued_per_workspace[waiter.workspace_id] -= 1
+        if self._queued_per_workspace[waiter.workspace_id] <= 0:
+            del self._queued_per_workspace[waiter.workspace_id]
+
+    def _has_room(self, connection_id: str, workspace_id: str) -> bool:
+        return (
+            sum(self._running_per_workspace.values()) < self.max_running
+            and self._running_per_connection.get(connection_id, 0) < self.max_per_connection
+            and self._running_per_workspace.get(workspace_id, 0) < self.max_per_workspace
+        )
+
+    def _grant(
+        self,
+        connection_id: str,
+        workspace_id: str,
+        user_id: str,
+        priority: QueryPriority,
+        queued_seconds: float
+    ) -> QueryTicket:
+        ticket = QueryTicket(connection_id, workspace_id, user_id, priority, queued_seconds)
+        self._running[ticket.id] = ticket
+        self.admitted += 1
+        self._stats_for(workspace_id).admitted += 1
+        return ticket
+
+    def _take(self, connection_id: str, workspace_id: str, start: float, class_start: float) -> None:
+        self._running_per_connection[connection_id] = self._running_per_connection.get(connection_id, 0) + 1
+        self._running_per_workspace[workspace_id] = self._running_per_workspace.get(workspace_id, 0) + 1
+        # Virtual times follow the start tags of the most recently dispatched query
+        self._virtual_time = max(self._virtual_time, start)
+        self._class_virtual_time[workspace_id] = max(self._class_virtual_time.get(workspace_id, 0.0), class_start)
+
+    def _free(self, connection_id: str, workspace_id: str) -> None:
+        for counts, key in ((self._running_per_connection, connection_id), (self._running_per_workspace, workspace_id)):
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        # Waiters are kept in tag order; slots are counted when a waiter is woken,
+        # so they cannot be taken by someone else before it resumes
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                continue
+            if self._has_room(waiter.connection_id, waiter.workspace_id):
+                self._dequeue(waiter)
+                self._take(waiter.connection_id, waiter.workspace_id, waiter.start, waiter.class_start)
+                waiter.future.set_result(None)
+        self._forget_idle_workspaces()
+
+    def _forget_idle_workspaces(self) -> None:
+        # A tag at or behind virtual time has no effect on the next one
+        idle = [workspace_id for workspace_id, tag in self._last_tag.items() if tag <= self._virtual_time]
+        for workspace_id in idle:
+            del self._last_tag[workspace_id]
+        idle_classes = [
+            flow for flow, tag in self._last_class_tag.items()
+            if tag <= self._class_virtual_time.get(flow[0], 0.0)
+        ]
+        for flow in idle_classes:
+            del self._last_class_tag[flow]
+        active = {workspace_id for workspace_id, _ in self._last_class_tag}
+        for workspace_id in [w for w in self._class_virtual_time if w not in active]:
+            del self._class_virtual_time[workspace_id]
+
+    @staticmethod
+    def _log_kill_failure(ticket: QueryTicket, future: asyncio.Future) -> None:
+        error = future.exception()
+        if error is not None:
+            print(f"❌ KILL QUERY for query {ticket.id} on connection {ticket.connection_id} failed: {error}")
+        elif future.result():
+            print(f"🛑 Killed query {ticket.id} on connection {ticket.connection_id} ({ticket.cancel_reason})")
+
+
+_settings = get_settings()
+
+query_governor = QueryGovernor(
+    max_running=_settings.QUERY_MAX_CONCURRENT,
+    max_per_connection=_settings.QUERY_MAX_CONCURRENT_PER_CONNECTION,
+    max_per_workspace=_settings.QUERY_MAX_CONCURRENT_PER_WORKSPACE,
+    max_queued=_settings.QUERY_QUEUE_SIZE,
+    queue_timeout=_settings.QUERY_QUEUE_TIMEOUT,
+    statement_timeout=_settings.QUERY_STATEMENT_TIMEOUT,
+)
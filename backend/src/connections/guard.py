@@ -0,0 +1,102 @@
+import re
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from config import get_settings
+
+from .crud import get_table_stats
+from .schema import Connection
+
+
+# Comments and string literals are blanked before looking for keywords, so a
+# "where" inside a string or comment does not count as a filter
+SQL_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.DOTALL)
+SQL_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+
+IDENTIFIER = r"(?:`(?:[^`]|``)+`|[\w$]+)"
+# Tables named after FROM or JOIN, optionally qualified with their schema; derived tables start with "("
+TABLE_REFERENCE = re.compile(rf"\b(?:from|join)\s+({IDENTIFIER})(?:\s*\.\s*({IDENTIFIER}))?", re.IGNORECASE)
+BOUNDING_CLAUSE = re.compile(r"\b(?:where|limit)\b", re.IGNORECASE)
+READ_STATEMENT = re.compile(r"^\s*\(?\s*(?:select|with)\b", re.IGNORECASE)
+
+
+def _unquote(identifier: str) -> str:
+    if identifier.startswith("`"):
+        return identifier[1:-1].replace("``", "`")
+    return identifier
+
+
+def unbounded_scan_tables(sql: str, default_schema: Optional[str]) -> List[str]:
+    """
+    Return the "schema.table" keys a SELECT reads without any WHERE or LIMIT.
+
+    This is a cheap textual check, not a query plan: a statement with neither
+    clause has to read every row of the tables it names, while a statement with
+    either is assumed bounded (a WHERE on an unindexed column can still scan,
+    which only EXPLAIN would tell, at the cost of a round trip). Statements
+    other than SELECT/WITH are never flagged. Without a default schema (a
+    server-level connection), unqualified names are skipped.
+    """
+    text = SQL_STRING.sub("''", SQL_COMMENT.sub(" ", sql))
+    if not READ_STATEMENT.match(text) or BOUNDING_CLAUSE.search(text):
+        return []
+
+    keys = []
+    for first, second in TABLE_REFERENCE.findall(text):
+        schema, table = (first, second) if second else (default_schema, first)
+        if schema is None:
+            continue
+        key = f"{_unquote(schema)}.{_unquote(table)}"
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+async def check_table_scans(connection: Connection, database: Optional[str], sql: str, allow_large_scan: bool) -> Optional[str]:
+    """
+    Guard a statement against unbounded scans of large tables, using the stored table statistics.
+
+    Args:
+        connection: The connection the statement runs on
+        database: Default database of the connection, for unqualified table names (None if it has none)
+        sql: The statement
+        allow_large_scan: Run the statement even above the block threshold
+
+    Returns:
+        Optional[str]: A warning naming the large tables scanned, to pass on to the client
+
+    Raises:
+        HTTPException: 422 if a scanned table has more estimated rows than
+            QUERY_SCAN_BLOCK_ROWS and ``allow_large_scan`` is not set
+    """
+    settings = get_settings()
+    if settings.QUERY_SCAN_WARN_ROWS <= 0 and settings.QUERY_SCAN_BLOCK_ROWS <= 0:
+        return None
+    keys = unbounded_scan_tables(sql, database)
+    if not keys:
+        return None
+
+    # Tables without statistics (not collected yet, or views) are not judged
+    row_counts: Dict[str, int] = {
+        key: stats.rowCount
+        for key, stats in (await get_table_stats(connection.id, keys)).items()
+        if stats is not None and stats.rowCount is not None
+    }
+    block_rows = settings.QUERY_SCAN_BLOCK_ROWS
+    blocked = {key: rows for key, rows in row_counts.items() if block_rows > 0 and rows >= block_rows}
+    if blocked and not allow_large_scan:
+        tables = ", ".join(f"{key} (~{rows:,} rows)" for key, rows in blocked.items())
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Statement reads every row of {tables}. Add a WHERE or LIMIT clause, "
+                   f"or set allowLargeScan to run it anyway."
+        )
+
+    warn_rows = settings.QUERY_SCAN_WARN_ROWS
+    large = {key: rows for key, rows in row_counts.items() if warn_rows > 0 and rows >= warn_rows}
+    if not large:
+        return None
+    warning = "Unbounded scan of " + ", ".join(f"{key} (~{rows} rows)" for key, rows in large.items())
+    # Sent as a header, which must stay ASCII whatever the table names are
+    return warning.encode("ascii", "backslashreplace").decode("ascii")
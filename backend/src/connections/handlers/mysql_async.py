@@ -0,0 +1,542 @@
+import asyncio
+import ssl
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import aiomysql
+import pymysql
+from fastapi import HTTPException, status
+
+from config import get_settings
+from ..schema import TableSchema, SchemaDiff, TableStats
+from .mysql import (
+    INDEX_STATISTICS_QUERY,
+    KILL_CONNECT_TIMEOUT,
+    SCHEMATA_QUERY,
+    TABLE_FINGERPRINTS_QUERY,
+    TABLE_SIZES_QUERY,
+    DatabaseProgress,
+    assemble_mysql_schema,
+    assemble_table_fingerprints,
+    assemble_table_stats,
+    database_fingerprints,
+    describe_mysql_columns,
+    introspection_parallelism,
+    introspection_queries,
+    merge_database_diffs,
+    mysql_errno_to_http,
+    parse_mysql_connection_string,
+    plan_schema_refresh,
+    select_databases,
+    with_max_execution_time,
+)
+from .pool import fingerprint_connection_config
+
+
+# Values of the MYSQL_DRIVER setting
+CONNECTOR_DRIVER = "mysql-connector"
+ASYNC_DRIVER = "aiomysql"
+
+__all__ = [
+    "AsyncMySQLQueryStream",
+    "async_driver_enabled",
+    "async_pool_registry",
+    "fetch_mysql_rows",
+    "get_mysql_schema",
+    "get_mysql_table_stats",
+    "parse_mysql_connection_string",
+    "refresh_mysql_schema",
+]
+
+
+def async_driver_enabled() -> bool:
+    """True when this deployment talks to MySQL through aiomysql (MYSQL_DRIVER=aiomysql)."""
+    return get_settings().MYSQL_DRIVER == ASYNC_DRIVER
+
+
+def build_aiomysql_connection_config(connection_params: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Build keyword arguments for aiomysql.connect from parsed connection parameters.
+
+    ssl-mode follows the MySQL client semantics: REQUIRED encrypts without
+    verifying the certificate, VERIFY_CA checks it against the system CAs and
+    VERIFY_IDENTITY also checks the host name. PyMySQL cannot fall back from
+    TLS to plain text, so PREFERRED connects without TLS.
+    """
+    connection_config: Dict[str, Any] = {
+        'host': connection_params['host'],
+        'port': connection_params['port'],
+        'user': connection_params['user'],
+        'password': connection_params['password'] or '',
+        'db': connection_params['database'],
+        'autocommit': True
+    }
+
+    ssl_mode = connection_params.get('ssl_mode', 'PREFERRED').upper()
+    if ssl_mode in ('REQUIRED', 'VERIFY_CA', 'VERIFY_IDENTITY'):
+        context = ssl.create_default_context()
+        context.check_hostname = ssl_mode == 'VERIFY_IDENTITY'
+        if ssl_mode == 'REQUIRED':
+            context.verify_mode = ssl.CERT_NONE
+        connection_config['ssl'] = context
+
+    return connection_config
+
+
+def pymysql_error_to_http(e: pymysql.err.MySQLError) -> HTTPException:
+    """Translate a PyMySQL/aiomysql error into the same HTTP errors as the connector driver."""
+    errno = e.args[0] if e.args and isinstance(e.args[0], int) else None
+    message = e.args[1] if len(e.args) > 1 else str(e)
+    return mysql_errno_to_http(errno, message)
+
+
+class AsyncMySQLPool:
+    """aiomysql pool of one Connection document, with the bookkeeping of MySQLPool."""
+
+    def __init__(self, pool: aiomysql.Pool, fingerprint: str, acquire_timeout: float):
+        self.pool = pool
+        self.fingerprint = fingerprint
+        self.acquire_timeout = acquire_timeout
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+    async def acquire(self):
+        """
+        Borrow a connection, opening a new one if none is idle.
+
+        Raises:
+            HTTPException: 503 if every connection stays busy for ``acquire_timeout`` seconds
+        """
+        try:
+            connection = await asyncio.wait_for(self.pool.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="All database connections are busy. Please try again shortly."
+            )
+        self.in_use += 1
+        self.last_used = time.monotonic()
+        return connection
+
+    def release(self, connection, discard: bool = False) -> None:
+        """Return a borrowed connection, closing it if its session state is unknown."""
+        self.in_use -= 1
+        self.last_used = time.monotonic()
+        if discard:
+            # A closed connection is dropped by the pool instead of being reused
+            connection.close()
+        self.pool.release(connection)
+
+    async def close(self) -> None:
+        self.pool.close()
+        await self.pool.wait_closed()
+
+
+class AsyncMySQLPoolRegistry:
+    """
+    Registry of aiomysql pools keyed by Connection document ID, the async
+    counterpart of MySQLPoolRegistry.
+
+    Pools are created on first use, rebuilt when the connection configuration
+    changes, and closed after sitting unused for ``idle_timeout`` seconds. Idle
+    connections are recycled after ``health_check_interval`` seconds rather than
+    pinged. Everything runs on the event loop, so no locks are needed.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        idle_timeout: float,
+        acquire_timeout: float,
+        health_check_interval: float,
+    ):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._pools: Dict[str, AsyncMySQLPool] = {}
+        self._creating: Dict[str, asyncio.Lock] = {}
+
+    async def get_pool(self, connection_id: str, connection_config: Dict[str, Any]) -> AsyncMySQLPool:
+        """Return the pool for a connection, creating or rebuilding it as needed."""
+        await self.evict_idle()
+        # SSL contexts are new objects on every parse; leave them out of the fingerprint
+        fingerprint = fingerprint_connection_config(
+            {key: value for key, value in connection_config.items() if key != 'ssl'}
+            | {'ssl': 'ssl' in connection_config}
+        )
+
+        lock = self._creating.setdefault(connection_id, asyncio.Lock())
+        async with lock:
+            pool = self._pools.get(connection_id)
+            if pool is not None and pool.fingerprint == fingerprint:
+                return pool
+            if pool is not None:
+                del self._pools[connection_id]
+                await pool.close()
+            pool = AsyncMySQLPool(
+                await aiomysql.create_pool(
+                    minsize=0,
+                    maxsize=self.pool_size,
+                    pool_recycle=self.health_check_interval,
+                    **connection_config
+                ),
+                fingerprint,
+                self.acquire_timeout
+            )
+            self._pools[connection_id] = pool
+            return pool
+
+    @asynccontextmanager
+    async def borrow(self, connection_id: str, connection_config: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Borrow a pooled connection for the duration of an ``async with`` block.
+        If the block raises, the connection is closed since its session state is unknown.
+        """
+        pool = await self.get_pool(connection_id, connection_config)
+        connection = await pool.acquire()
+        try:
+            yield connection
+        except BaseException:
+            pool.release(connection, discard=True)
+            raise
+        else:
+            pool.release(connection)
+
+    async def discard(self, connection_id: str) -> None:
+        """Drop and close the pool for a connection (e.g. when the connection is deleted)."""
+        pool = self._pools.pop(connection_id, None)
+        if pool is not None:
+            await pool.close()
+
+    async def evict_idle(self) -> int:
+        """Close pools that have no borrowed connections and were unused for ``idle_timeout`` seconds."""
+        now = time.monotonic()
+        expired = [
+            connection_id for connection_id, pool in self._pools.items()
+            if pool.in_use == 0 and now - pool.last_used >= self.idle_timeout
+        ]
+        for connection_id in expired:
+            await self._pools.pop(connection_id).close()
+        return len(expired)
+
+    async def close_all(self) -> None:
+        """Close every pool. Called on application shutdown."""
+        pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            await pool.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            connection_id: {"in_use": pool.in_use, "idle": pool.pool.freesize}
+            for connection_id, pool in self._pools.items()
+        }
+
+
+_settings = get_settings()
+async_pool_registry = AsyncMySQLPoolRegistry(
+    pool_size=_settings.MYSQL_POOL_SIZE,
+    idle_timeout=_settings.MYSQL_POOL_IDLE_TIMEOUT,
+    acquire_timeout=_settings.MYSQL_POOL_ACQUIRE_TIMEOUT,
+    health_check_interval=_settings.MYSQL_POOL_HEALTH_CHECK_INTERVAL,
+)
+
+
+@asynccontextmanager
+async def mysql_cursor(connection_params: Dict[str, str], connection_id: str) -> AsyncIterator[Any]:
+    """
+    Borrow a pooled connection for ``connection_id`` and yield a cursor on it.
+    MySQL driver errors are translated into HTTP errors with user-friendly messages.
+    """
+    try:
+        connection_config = build_aiomysql_connection_config(connection_params)
+        async with async_pool_registry.borrow(connection_id, connection_config) as connection:
+            async with connection.cursor() as cursor:
+                yield cursor
+    except HTTPException:
+        raise
+    except pymysql.err.MySQLError as e:
+        raise pymysql_error_to_http(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error: {str(e)}"
+        )
+
+
+async def _fetch(cursor, sql: str, params: tuple) -> List[tuple]:
+    await cursor.execute(sql, params)
+    return list(await cursor.fetchall())
+
+
+async def introspect_mysql_schema(
+    cursor,
+    database_name: str,
+    table_names: Optional[List[str]] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, TableSchema]:
+    """Async introspect_mysql_schema: the same two set-based metadata queries."""
+    foreign_keys_query, columns_query = introspection_queries(database_name, table_names)
+    foreign_key_rows = await _fetch(cursor, *foreign_keys_query)
+    column_rows = await _fetch(cursor, *columns_query)
+    return assemble_mysql_schema(database_name, foreign_key_rows, column_rows, progress)
+
+
+async def get_mysql_schema(
+    connection_params: Dict[str, str],
+    connection_id: str,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, TableSchema]:
+    """
+    Fetch the schema of every database of a connection without blocking the event loop.
+    Same contract as handlers.mysql.get_mysql_schema.
+    """
+    return (await refresh_mysql_schema(connection_params, connection_id, {}, progress=progress)).changed
+
+
+async def refresh_mysql_schema(
+    connection_params: Dict[str, str],
+    connection_id: str,
+    known_fingerprints: Dict[str, str],
+    progress: Optional[Callable[[int, int], None]] = None,
+    database_progress: Optional[Callable[[str, int, int, Optional[str]], None]] = None
+) -> SchemaDiff:
+    """
+    Incrementally re-introspect the databases of a connection against stored fingerprints.
+    Same contract as handlers.mysql.refresh_mysql_schema; databases are refreshed
+    as concurrent tasks instead of worker threads.
+    """
+    databases = connection_params['databases']
+    if databases is not None and len(databases) == 1:
+        return await refresh_mysql_database(connection_params, connection_id, databases[0], known_fingerprints, progress)
+
+    async with mysql_cursor(connection_params, connection_id) as cursor:
+        databases, failures = select_databases(connection_params, await _fetch(cursor, SCHEMATA_QUERY, ()))
+
+    tracker = DatabaseProgress(progress, database_progress)
+    for database_name, error in failures.items():
+        tracker.failed(database_name, error)
+    limit = asyncio.Semaphore(introspection_parallelism(len(databases)))
+
+    async def refresh(database_name: str) -> Tuple[str, Optional[SchemaDiff], Optional[str]]:
+        try:
+            async with limit:
+                diff = await refresh_mysql_database(
+                    connection_params,
+                    connection_id,
+                    database_name,
+                    database_fingerprints(known_fingerprints, database_name),
+                    tracker.callback(database_name)
+                )
+            return database_name, diff, None
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            tracker.failed(database_name, error)
+            return database_name, None, error
+
+    results = await asyncio.gather(*(refresh(database_name) for database_name in databases))
+    return merge_database_diffs(known_fingerprints, list(results), failures)
+
+
+async def refresh_mysql_database(
+    connection_params: Dict[str, str],
+    connection_id: str,
+    database_name: str,
+    known_fingerprints: Dict[str, str],
+    progress: Optional[Callable[[int, int], None]] = None
+) -> SchemaDiff:
+    """Incrementally re-introspect one database. Same contract as handlers.mysql.refresh_mysql_database."""
+    async with mysql_cursor(connection_params, connection_id) as cursor:
+        fingerprints = assemble_table_fingerprints(
+            database_name, await _fetch(cursor, TABLE_FINGERPRINTS_QUERY, (database_name, database_name))
+        )
+        changed_keys, removed_keys, table_names = plan_schema_refresh(fingerprints, known_fingerprints)
+
+        changed: Dict[str, TableSchema] = {}
+        if changed_keys:
+            changed = await introspect_mysql_schema(cursor, database_name, table_names=table_names, progress=progress)
+            changed = {key: changed[key] for key in changed_keys if key in changed}
+        elif progress:
+            progress(0, 0)
+
+    return SchemaDiff(changed=changed, removed=removed_keys, fingerprints=fingerprints)
+
+
+async def get_mysql_table_stats(connection_params: Dict[str, str], connection_id: str) -> Dict[str, TableStats]:
+    """Read approximate table sizes and index cardinalities. Same contract as handlers.mysql.get_mysql_table_stats."""
+    stats: Dict[str, TableStats] = {}
+    async with mysql_cursor(connection_params, connection_id) as cursor:
+        databases = connection_params['databases']
+        if databases is None:
+            databases, _ = select_databases(connection_params, await _fetch(cursor, SCHEMATA_QUERY, ()))
+        for database_name in databases:
+            size_rows = await _fetch(cursor, TABLE_SIZES_QUERY, (database_name,))
+            index_rows = await _fetch(cursor, INDEX_STATISTICS_QUERY, (database_name,))
+            stats.update(assemble_table_stats(database_name, size_rows, index_rows))
+    return stats
+
+
+async def fetch_mysql_rows(
+    connection_params: Dict[str, str],
+    connection_id: str,
+    sql: str,
+    params: Tuple[Any, ...] = ()
+) -> Tuple[List[Dict[str, str]], List[tuple]]:
+    """Run a bounded query and return its columns and rows. Same contract as handlers.mysql.fetch_mysql_rows."""
+    async with mysql_cursor(connection_params, connection_id) as cursor:
+        await cursor.execute(sql, params)
+        rows = list(await cursor.fetchall()) if cursor.description else []
+        return describe_mysql_columns(_full_description(cursor)), rows
+
+
+def _full_description(cursor) -> List[tuple]:
+    """
+    The cursor description extended with field flags and charset, like mysql.connector's.
+
+    PyMySQL's 7-item description cannot tell BLOB from TEXT columns; the result's
+    field packets can, and the type mapping relies on them.
+    """
+    result = getattr(cursor, "_result", None)
+    fields = getattr(result, "fields", None)
+    if not fields:
+        return list(cursor.description or [])
+    return [(*field.description(), field.flags, field.charsetnr) for field in fields]
+
+
+class AsyncMySQLQueryStream:
+    """
+    Executes a statement on a pooled aiomysql connection and iterates its result set in chunks.
+
+    The asyncio counterpart of handlers.mysql.MySQLQueryStream: same unbuffered
+    reads, chunk sizes, timeout hint and KILL QUERY cancellation, but every
+    step awaits the socket instead of blocking a worker thread.
+
+    Usage:
+        stream = AsyncMySQLQueryStream(connection_params, connection_id, sql)
+        await stream.open()         # executes; driver errors raise HTTPException
+        async for rows in stream:   # lists of row tuples
+            ...
+    """
+
+    FIRST_CHUNK_ROWS = 100
+
+    def __init__(
+        self,
+        connection_params: Dict[str, str],
+        connection_id: str,
+        sql: str,
+        chunk_size: int = 1000,
+        timeout_ms: int = 0
+    ):
+        self.connection_params = connection_params
+        self.connection_id = connection_id
+        self.sql = sql
+        self.chunk_size = chunk_size
+        self.timeout_ms = timeout_ms
+        self.columns: List[Dict[str, str]] = []
+        self.description: List[tuple] = []
+        self.row_count = 0
+        self.cancelled = False
+        self._pool: Optional[AsyncMySQLPool] = None
+        self._connection = None
+        self._cursor = None
+        self._failed = False
+        self._finished = False
+        # Serializes cancel() and close(), so KILL QUERY never reaches a reused session
+        self._lock = asyncio.Lock()
+
+    async def open(self) -> "AsyncMySQLQueryStream":
+        """Borrow a connection and execute the statement."""
+        try:
+            connection_config = build_aiomysql_connection_config(self.connection_params)
+            self._pool = await async_pool_registry.get_pool(self.connection_id, connection_config)
+            self._connection = await self._pool.acquire()
+            self._cursor = await self._connection.cursor(aiomysql.SSCursor)
+            await self._cursor.execute(with_max_execution_time(self.sql, self.timeout_ms))
+            self.description = _full_description(self._cursor)
+            self.columns = describe_mysql_columns(self.description)
+            return self
+        except HTTPException:
+            await self.close(failed=True)
+            raise
+        except pymysql.err.MySQLError as e:
+            # Statement errors (bad SQL, missing table) leave the session usable
+            await self.close(failed=isinstance(e, (pymysql.err.InterfaceError, pymysql.err.OperationalError)))
+            raise pymysql_error_to_http(e)
+        except Exception as e:
+            await self.close(failed=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Unexpected error: {str(e)}"
+            )
+
+    @property
+    def server_thread_id(self) -> Optional[int]:
+        return self._connection.thread_id() if self._connection is not None else None
+
+    async def __aiter__(self) -> AsyncIterator[List[tuple]]:
+        if self._cursor is None:
+            raise RuntimeError("Query stream must be opened before iterating")
+
+        try:
+            if self._cursor.description is None:
+                # Statement without a result set (INSERT, UPDATE, ...)
+                self.row_count = max(self._cursor.rowcount, 0)
+                self._finished = True
+                return
+
+            size = min(self.FIRST_CHUNK_ROWS, self.chunk_size)
+            while True:
+                rows = await self._cursor.fetchmany(size)
+                if not rows:
+                    break
+                self.row_count += len(rows)
+                yield list(rows)
+                size = self.chunk_size
+            self._finished = True
+        except BaseException:
+            self._failed = True
+            raise
+        finally:
+            await self.close()
+
+    async def cancel(self) -> bool:
+        """
+        Stop the running statement with KILL QUERY, sent from a separate, unpooled session.
+
+        Returns:
+            bool: True if a kill was sent, False if the stream no longer holds a session
+        """
+        async with self._lock:
+            if self._connection is None:
+                return False
+            thread_id = int(self._connection.thread_id())
+            self.cancelled = True
+
+            connection_config = build_aiomysql_connection_config(self.connection_params)
+            killer = await aiomysql.connect(**connection_config, connect_timeout=KILL_CONNECT_TIMEOUT)
+            try:
+                async with killer.cursor() as cursor:
+                    await cursor.execute(f"KILL QUERY {thread_id}")
+            finally:
+                killer.close()
+            return True
+
+    async def close(self, failed: bool = False) -> None:
+        """Release the connection. Idempotent; broken, cancelled or half-read sessions are discarded."""
+        # Closing an unbuffered cursor reads the rest of the result; drop the session instead
+        failed = failed or self._failed or self.cancelled or (self._cursor is not None and not self._finished)
+        async with self._lock:
+            if self._connection is None:
+                return
+            if failed:
+                self._connection.close()
+            elif self._cursor is not None:
+                try:
+                    await self._cursor.close()
+                except Exception:
+                    self._connection.close()
+            self._cursor = None
+            self._pool.release(self._connection)
+            self._connection = None
@@ -0,0 +1,254 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import mysql.connector
+from fastapi import HTTPException, status
+
+from config import get_settings
+
+
+def fingerprint_connection_config(connection_config: Dict[str, Any]) -> str:
+    """
+    Build a stable fingerprint for a MySQL connection configuration.
+    Used to detect that a connection string changed and the pool must be rebuilt.
+    """
+    canonical = repr(sorted((key, str(value)) for key, value in connection_config.items()))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MySQLPool:
+    """
+    Bounded pool of MySQL connections for a single Connection document.
+
+    Connections are created lazily up to ``size`` and handed out LIFO so the
+    warmest session is reused first. A connection that sat idle longer than
+    ``health_check_interval`` seconds is pinged before being handed out.
+    """
+
+    def __init__(
+        self,
+        connection_config: Dict[str, Any],
+        fingerprint: str,
+        size: int,
+        acquire_timeout: float,
+        health_check_interval: float,
+    ):
+        self.connection_config = connection_config
+        self.fingerprint = fingerprint
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.last_used = time.monotonic()
+        self.closed = False
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def acquire(self):
+        """
+        Borrow a healthy connection, opening a new one if no idle connection is available.
+
+        Raises:
+            HTTPException: 503 if every connection stays busy for ``acquire_timeout`` seconds
+            mysql.connector.Error: If a new connection cannot be opened
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="All database connections are busy. Please try again shortly."
+            )
+
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = mysql.connector.connect(**self.connection_config)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self.last_used = time.monotonic()
+        return connection
+
+    def release(self, connection, discard: bool = False) -> None:
+        """Return a borrowed connection, closing it if it is broken or the pool was retired."""
+        with self._lock:
+            self._in_use -= 1
+            self.last_used = time.monotonic()
+            keep = not discard and not self.closed
+            if keep:
+                self._idle.append((connection, self.last_used))
+
+        if not keep:
+            self._close_connection(connection)
+        self._slots.release()
+
+    def close(self) -> None:
+        """Retire the pool. Idle connections are closed now, borrowed ones when released."""
+        with self._lock:
+            self.closed = True
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close_connection(connection)
+
+    def _take_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, idle_since = self._idle.pop()
+
+            if time.monotonic() - idle_since < self.health_check_interval:
+                return connection
+
+            # is_connected() sends a COM_PING, so only pay for it on stale sessions
+            try:
+                if connection.is_connected():
+                    return connection
+            except mysql.connector.Error:
+                pass
+            self._close_connection(connection)
+
+    @staticmethod
+    def _close_connection(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class MySQLPoolRegistry:
+    """
+    Process-wide registry of MySQL pools keyed by Connection document ID.
+
+    Pools are created on first use, rebuilt when the connection configuration
+    changes, and evicted after sitting unused for ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        idle_timeout: float,
+        acquire_timeout: float,
+        health_check_interval: float,
+    ):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._pools: Dict[str, MySQLPool] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def get_pool(self, connection_id: str, connection_config: Dict[str, Any]) -> MySQLPool:
+        """Return the pool for a connection, creating or rebuilding it as needed."""
+        fingerprint = fingerprint_connection_config(connection_config)
+        retired: Optional[MySQLPool] = None
+
+        with self._lock:
+            pool = self._pools.get(connection_id)
+            if pool is not None and pool.fingerprint != fingerprint:
+                retired = pool
+                pool = None
+            if pool is None:
+                pool = MySQLPool(
+                    connection_config=connection_config,
+                    fingerprint=fingerprint,
+                    size=self.pool_size,
+                    acquire_timeout=self.acquire_timeout,
+                    health_check_interval=self.health_check_interval,
+                )
+                self._pools[connection_id] = pool
+
+        if retired is not None:
+            retired.close()
+        self._maybe_evict_idle()
+        return pool
+
+    @contextmanager
+    def borrow(self, connection_id: str, connection_config: Dict[str, Any]) -> Iterator[Any]:
+        """
+        Borrow a pooled connection for the duration of a ``with`` block.
+
+        The connection is returned to the pool on exit. If the block raises,
+        the connection is closed instead since its session state is unknown.
+        """
+        pool = self.get_pool(connection_id, connection_config)
+        connection = pool.acquire()
+        try:
+            yield connection
+        except BaseException:
+            pool.release(connection, discard=True)
+            raise
+        else:
+            pool.release(connection)
+
+    def discard(self, connection_id: str) -> None:
+        """Drop and close the pool for a connection (e.g. when the connection is deleted)."""
+        with self._lock:
+            pool = self._pools.pop(connection_id, None)
+        if pool is not None:
+            pool.close()
+
+    def evict_idle(self) -> int:
+        """
+        Close pools that have no borrowed connections and were unused for ``idle_timeout`` seconds.
+
+        Returns:
+            int: Number of pools evicted
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_sweep = now
+            expired = [
+                connection_id for connection_id, pool in self._pools.items()
+                if pool.in_use == 0 and now - pool.last_used >= self.idle_timeout
+            ]
+            evicted = [self._pools.pop(connection_id) for connection_id in expired]
+
+        for pool in evicted:
+            pool.close()
+        return len(evicted)
+
+    def close_all(self) -> None:
+        """Close every pool. Called on application shutdown."""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return in-use and idle connection counts per pool."""
+        with self._lock:
+            return {
+                connection_id: {"in_use": pool.in_use, "idle": pool.idle_count}
+                for connection_id, pool in self._pools.items()
+            }
+
+    def _maybe_evict_idle(self) -> None:
+        # Sweep opportunistically instead of running a dedicated reaper thread
+        if time.monotonic() - self._last_sweep >= min(self.idle_timeout, 60):
+            self.evict_idle()
+
+
+_settings = get_settings()
+
+pool_registry = MySQLPoolRegistry(
+    pool_size=_settings.MYSQL_POOL_SIZE,
+    idle_timeout=_settings.MYSQL_POOL_IDLE_TIMEOUT,
+    acquire_timeout=_settings.MYSQL_POOL_ACQUIRE_TIMEOUT,
+    health_check_interval=_settings.MYSQL_POOL_HEALTH_CHECK_INTERVAL,
+)
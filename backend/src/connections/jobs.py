@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi import HTTPException
+
+from config import get_settings
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class SchemaJob:
+    """
+    In-process record of a background schema job.
+
+    Progress is written from the worker thread and read by the status
+    endpoint, so updates go through a lock.
+    """
+
+    def __init__(self, kind: str, connection_id: str, workspace_id: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.connection_id = connection_id
+        self.workspace_id = workspace_id
+        self.status = JobStatus.PENDING
+        self.tables_done = 0
+        self.tables_total: Optional[int] = None
+        self.error: Optional[str] = None
+        # Per-database progress of connections covering several databases
+        self.databases: Dict[str, Dict[str, Any]] = {}
+        self.created_at = datetime.now()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update_progress(self, tables_done: int, tables_total: int) -> None:
+        """Progress callback handed to the introspection engine."""
+        with self._lock:
+            self.tables_done = tables_done
+            self.tables_total = tables_total
+
+    def update_database_progress(self, database: str, tables_done: int, tables_total: int, error: Optional[str] = None) -> None:
+        """Per-database progress callback of multi-database introspection; ``error`` marks the database failed."""
+        with self._lock:
+            self.databases[database] = {
+                "database": database,
+                "status": JobStatus.FAILED if error else (
+                    JobStatus.COMPLETED if tables_done == tables_total else JobStatus.RUNNING
+                ),
+                "tablesDone": tables_done,
+                "tablesTotal": tables_total,
+                "error": error,
+            }
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return round(end - self.started_at, 3)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "jobId": self.id,
+                "kind": self.kind,
+                "connectionId": self.connection_id,
+                "status": self.status,
+                "tablesDone": self.tables_done,
+                "tablesTotal": self.tables_total,
+                "databases": list(self.databases.values()),
+                "elapsedSeconds": self.elapsed_seconds,
+                "createdAt": self.created_at,
+                "error": self.error,
+            }
+
+
+class SchemaJobManager:
+    """
+    Runs blocking schema work on a bounded thread pool so it never blocks the event loop.
+
+    ``work`` runs on a worker thread and receives the job for progress reporting;
+    a coroutine function (an async driver) is awaited on the event loop instead.
+    ``on_success``/``on_failure`` run back on the event loop, where they can use Beanie.
+    ``admission``, if given, is entered before the work starts (e.g. a query governor
+    slot); the job stays pending until it is admitted.
+    Finished jobs are kept for ``retention`` seconds so clients can read the outcome.
+    """
+
+    def __init__(self, max_workers: int, retention: float = 3600):
+        self.max_workers = max_workers
+        self.retention = retention
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, SchemaJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(
+        self,
+        job: SchemaJob,
+        work: Callable[[SchemaJob], Any],
+        on_success: Callable[[Any], Awaitable[None]],
+        on_failure: Optional[Callable[[str], Awaitable[None]]] = None,
+        admission: Optional[Callable[[], AsyncContextManager[Any]]] = None,
+    ) -> SchemaJob:
+        """Register a job and schedule it. Must be called from the event loop."""
+        self._prune()
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, work, on_success, on_failure, admission))
+        # Keep a strong reference until the task finishes
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[SchemaJob]:
+        return self._jobs.get(job_id)
+
+    def active_job_for(self, connection_id: str) -> Optional[SchemaJob]:
+        """Return the unfinished job for a connection, if any."""
+        for job in self._jobs.values():
+            if job.connection_id == connection_id and not job.is_finished:
+                return job
+        return None
+
+    def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(
+        self,
+        job: SchemaJob,
+        work: Callable[[SchemaJob], Any],
+        on_success: Callable[[Any], Awaitable[None]],
+        on_failure: Optional[Callable[[str], Awaitable[None]]],
+        admission: Optional[Callable[[], AsyncContextManager[Any]]],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            async with admission() if admission is not None else nullcontext():
+                job.status = JobStatus.RUNNING
+                job.started_at = time.monotonic()
+                if asyncio.iscoroutinefunction(work):
+                    result = await work(job)
+                else:
+                    result = await loop.run_in_executor(self._get_executor(), work, job)
+            await on_success(result)
+            job.status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = JobStatus.FAILED
+            job.error = "Job cancelled during shutdown"
+            raise
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"❌ Schema job {job.id} for connection {job.connection_id} failed: {job.error}")
+            if on_failure is not None:
+                try:
+                    await on_failure(job.error)
+                except Exception as cleanup_error:
+                    print(f"❌ Cleanup for schema job {job.id} failed: {cleanup_error}")
+        finally:
+            job.finished_at = time.monotonic()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="schema-job"
+            )
+        return self._executor
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and job.finished_at is not None and now - job.finished_at > self.retention
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+schema_jobs = SchemaJobManager(max_workers=get_settings().SCHEMA_JOB_WORKERS)
@@ -0,0 +1,215 @@
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config import get_settings
+
+from .pagination import quote_identifier
+from .schema import ConnectionTable
+from .schema_cache import SchemaDerivedCache
+
+
+# A join step: (edge ID, True if the edge is walked from the referencing table to the referenced one)
+Step = Tuple[int, bool]
+
+
+class ForeignKeyGraph:
+    """
+    Foreign key adjacency graph of one schema, for join path queries.
+
+    Tables are nodes and every foreign key column is an edge to the table it
+    references (``referenceTable``/``referenceColumn`` of the stored columns).
+    Joins work in both directions, so paths ignore edge direction. Every join
+    costs the same, so the cheapest path is the one with the fewest joins and
+    is found with breadth-first search, which handles cycles and never looks
+    past the depth where the path is found.
+
+    References to tables that are not stored (e.g. in another database) and
+    self-references are left out; neither can appear on a path between two
+    different stored tables.
+    """
+
+    def __init__(self, tables: List[Tuple[str, str, str, list]]):
+        """
+        Args:
+            tables: ("schema.table" key, database schema, table name, columns) of every table
+        """
+        self.keys: List[str] = [key for key, _, _, _ in tables]
+        self.table_names: List[Tuple[str, str]] = [(database, name) for _, database, name, _ in tables]
+        self.node_ids: Dict[str, int] = {key: node_id for node_id, key in enumerate(self.keys)}
+        # edges[i] = (referencing node, column, referenced node, referenced column)
+        self.edges: List[Tuple[int, str, int, str]] = []
+        self.adjacency: List[List[Tuple[int, int]]] = [[] for _ in self.keys]
+
+        for node_id, (key, database, _, columns) in enumerate(tables):
+            for column in columns:
+                if not column.referenceTable:
+                    continue
+                target = self.node_ids.get(f"{database}.{column.referenceTable}")
+                if target is None or target == node_id:
+                    continue
+                edge_id = len(self.edges)
+                self.edges.append((node_id, column.name, target, column.referenceColumn))
+                self.adjacency[node_id].append((target, edge_id))
+                self.adjacency[target].append((node_id, edge_id))
+
+    def shortest_paths(self, source_key: str, target_key: str, limit: int = 5) -> List[List[Step]]:
+        """
+        Return up to ``limit`` join paths of minimal length between two tables.
+
+        Several paths of the same length are common (e.g. ``orders.billing_address_id``
+        and ``orders.shipping_address_id`` both reaching ``addresses``); they are
+        all candidates, so they are returned for the caller to pick from.
+        """
+        paths = []
+        for path in self._shortest_paths({self.node_ids[source_key]}, {self.node_ids[target_key]}):
+            paths.append(path)
+            if len(paths) >= limit:
+                break
+        return paths
+
+    def steiner_tree(self, keys: List[str]) -> Optional[List[Step]]:
+        """
+        Return a small set of joins connecting all given tables, or None if some are unreachable.
+
+        Finding the minimal tree is NP-hard, so the tree is grown greedily: start
+        from the first table and repeatedly attach the closest remaining table
+        through its shortest path to any table already in the tree. Steps are
+        ordered so every join adds one new table.
+        """
+        nodes = [self.node_ids[key] for key in keys]
+        in_tree = {nodes[0]}
+        remaining = set(nodes[1:]) - in_tree
+        steps: List[Step] = []
+
+        while remaining:
+            branch = next(self._shortest_paths(in_tree, remaining), None)
+            if branch is None:
+                return None
+            for step in branch:
+                in_tree.add(self._step_end(step))
+            steps.extend(branch)
+            remaining -= in_tree
+        return steps
+
+    def path_tables(self, steps: List[Step]) -> List[str]:
+        """Keys of the tables a path or tree joins, in join order."""
+        keys: List[str] = []
+        for step in steps:
+            for node in (self._step_start(step), self._step_end(step)):
+                if self.keys[node] not in keys:
+                    keys.append(self.keys[node])
+        return keys
+
+    def describe_path(self, steps: List[Step], start_key: str) -> Dict[str, Any]:
+        """Describe a path or tree as join steps plus a FROM ... JOIN clause."""
+        joins = []
+        for edge_id, forward in steps:
+            child, child_column, parent, parent_column = self.edges[edge_id]
+            from_node, from_column, to_node, to_column = (
+                (child, child_column, parent, parent_column) if forward
+                else (parent, parent_column, child, child_column)
+            )
+            joins.append({
+                "fromTable": self.keys[from_node],
+                "fromColumn": from_column,
+                "toTable": self.keys[to_node],
+                "toColumn": to_column,
+            })
+
+        clause = [f"FROM {self._qualified(self.node_ids[start_key])}"]
+        for join in joins:
+            to_node = self.node_ids[join["toTable"]]
+            from_node = self.node_ids[join["fromTable"]]
+            clause.append(
+                f"JOIN {self._qualified(to_node)} ON "
+                f"{self._qualified(from_node)}.{quote_identifier(join['fromColumn'])} = "
+                f"{self._qualified(to_node)}.{quote_identifier(join['toColumn'])}"
+            )
+        return {"cost": len(joins), "joins": joins, "sql": "\n".join(clause)}
+
+    def _shortest_paths(self, sources: Set[int], targets: Set[int]) -> Iterator[List[Step]]:
+        """
+        Yield every minimal-length path from any source to any target, lazily.
+
+        Bidirectional layered BFS: the smaller frontier is expanded one full layer
+        at a time, keeping every parent that reaches a node at its shortest
+        depth, until the two searches meet. On a schema where most tables are a
+        few joins apart, this visits about the square root of the tables a
+        one-sided search would.
+        """
+        if sources & targets:
+            yield []
+            return
+
+        forward: Dict[int, List[Step]] = {node: [] for node in sources}
+        backward: Dict[int, List[Step]] = {node: [] for node in targets}
+        forward_depth = dict.fromkeys(sources, 0)
+        backward_depth = dict.fromkeys(targets, 0)
+        forward_frontier, backward_frontier = list(sources), list(targets)
+        meeting: List[int] = []
+
+        while forward_frontier and backward_frontier and not meeting:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier = self._expand(forward_frontier, forward, forward_depth)
+                layer = forward_frontier
+            else:
+                backward_frontier = self._expand(backward_frontier, backward, backward_depth)
+                layer = backward_frontier
+            meeting = [node for node in layer if node in forward_depth and node in backward_depth]
+
+        if not meeting:
+            return
+        best = min(forward_depth[node] + backward_depth[node] for node in meeting)
+        for node in meeting:
+            if forward_depth[node] + backward_depth[node] != best:
+                continue
+            for head in self._walk_back(node, forward):
+                for tail in self._walk_back(node, backward):
+                    # The backward half was walked from the target; flip it to run towards it
+                    yield head + [(edge_id, not walked_forward) for edge_id, walked_forward in reversed(tail)]
+
+    def _expand(self, frontier: List[int], parents: Dict[int, List[Step]], depth: Dict[int, int]) -> List[int]:
+        """Visit the next BFS layer, recording every shortest-depth parent step. Returns the layer."""
+        layer: Dict[int, List[Step]] = {}
+        for node in frontier:
+            for neighbor, edge_id in self.adjacency[node]:
+                if neighbor in parents:
+                    continue
+                layer.setdefault(neighbor, []).append((edge_id, self.edges[edge_id][0] == node))
+        next_depth = depth[frontier[0]] + 1
+        for node in layer:
+            depth[node] = next_depth
+        parents.update(layer)
+        return list(layer)
+
+    def _walk_back(self, node: int, parents: Dict[int, List[Step]]) -> Iterator[List[Step]]:
+        """Yield search-root -> node paths along the BFS parents, lazily so only what is needed is built."""
+        if not parents[node]:
+            yield []
+            return
+        for step in parents[node]:
+            for prefix in self._walk_back(self._step_start(step), parents):
+                yield prefix + [step]
+
+    def _step_start(self, step: Step) -> int:
+        edge_id, forward = step
+        child, _, parent, _ = self.edges[edge_id]
+        return child if forward else parent
+
+    def _step_end(self, step: Step) -> int:
+        edge_id, forward = step
+        child, _, parent, _ = self.edges[edge_id]
+        return parent if forward else child
+
+    def _qualified(self, node_id: int) -> str:
+        database, name = self.table_names[node_id]
+        return f"{quote_identifier(database)}.{quote_identifier(name)}"
+
+
+def build_foreign_key_graph(tables: List[ConnectionTable]) -> ForeignKeyGraph:
+    return ForeignKeyGraph([(table.key, table.database_schema, table.name, table.columns) for table in tables])
+
+
+foreign_key_graphs = SchemaDerivedCache(
+    build_foreign_key_graph,
+    max_connections=get_settings().SCHEMA_INDEX_MAX_CONNECTIONS
+)
@@ -0,0 +1,131 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+
+from .formats import json_default
+from .schema import ConnectionTable
+
+
+KEYSET = "keyset"
+OFFSET = "offset"
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a MySQL identifier with backticks."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def encode_cursor(strategy: str, values: List[Any]) -> str:
+    """
+    Encode a page cursor as URL-safe base64 JSON.
+    Binary key values are tagged so they round-trip as bytes.
+    """
+    encoded = [
+        {"$b64": base64.b64encode(value).decode("ascii")} if isinstance(value, (bytes, bytearray)) else value
+        for value in values
+    ]
+    payload = json.dumps({"s": strategy, "v": encoded}, default=json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    """
+    Decode a page cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        values = [
+            base64.b64decode(value["$b64"]) if isinstance(value, dict) and "$b64" in value else value
+            for value in payload["v"]
+        ]
+        return payload["s"], values
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid page cursor")
+
+
+def primary_key_columns(table: ConnectionTable) -> List[str]:
+    return [column.name for column in table.columns if column.isPrimary]
+
+
+def build_page_query(
+    table: ConnectionTable,
+    cursor: Optional[str],
+    limit: int
+) -> Tuple[str, Tuple[Any, ...], str]:
+    """
+    Build the SQL for one page of a table browse.
+
+    Tables with a primary key use keyset (seek) pagination: the cursor holds the
+    primary key of the last row returned, and the next page starts with
+    ``WHERE pk > last ORDER BY pk LIMIT n``. The primary key index makes every
+    page cost the same, however deep. Composite keys are compared
+    lexicographically, expanded to ``a > x OR (a = x AND b > y)`` so MySQL's
+    range optimizer can use the index.
+
+    Tables without a primary key fall back to ``LIMIT n OFFSET k`` with no
+    ORDER BY, and the cursor holds the offset. There is no key to seek on, and
+    ordering by every column would sort the whole table on each page. InnoDB
+    scans such tables in its hidden row-ID order, so pages are stable while the
+    table is not modified, but deep pages get slower because the server has to
+    skip ``k`` rows. Responses report this with ``strategy: "offset"``.
+
+    One extra row is fetched to tell whether another page exists.
+
+    Returns:
+        Tuple[str, Tuple[Any, ...], str]: SQL, its parameters and the strategy used
+    """
+    columns = ", ".join(quote_identifier(column.name) for column in table.columns)
+    source = f"{quote_identifier(table.database_schema)}.{quote_identifier(table.name)}"
+    key_columns = primary_key_columns(table)
+    cursor_strategy, cursor_values = decode_cursor(cursor) if cursor else (None, [])
+
+    if not key_columns:
+        if cursor_strategy not in (None, OFFSET) or len(cursor_values) > 1:
+            raise ValueError("Page cursor does not belong to this table")
+        offset = int(cursor_values[0]) if cursor_values else 0
+        sql = f"SELECT {columns} FROM {source} LIMIT %s OFFSET %s"
+        return sql, (limit + 1, offset), OFFSET
+
+    if cursor_values and (cursor_strategy != KEYSET or len(cursor_values) != len(key_columns)):
+        raise ValueError("Page cursor does not belong to this table")
+
+    order_by = ", ".join(quote_identifier(name) for name in key_columns)
+    where = ""
+    params: List[Any] = []
+    if cursor_values:
+        # (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+        disjuncts = []
+        for i, name in enumerate(key_columns):
+            terms = [f"{quote_identifier(prev)} = %s" for prev in key_columns[:i]]
+            terms.append(f"{quote_identifier(name)} > %s")
+            disjuncts.append("(" + " AND ".join(terms) + ")")
+            params.extend(cursor_values[:i + 1])
+        where = " WHERE " + " OR ".join(disjuncts)
+
+    sql = f"SELECT {columns} FROM {source}{where} ORDER BY {order_by} LIMIT %s"
+    return sql, (*params, limit + 1), KEYSET
+
+
+def next_page_cursor(
+    table: ConnectionTable,
+    strategy: str,
+    rows: List[tuple],
+    limit: int,
+    cursor: Optional[str]
+) -> Optional[str]:
+    """Return the cursor for the page after ``rows``, or None on the last page."""
+    if len(rows) <= limit:
+        return None
+
+    if strategy == OFFSET:
+        _, values = decode_cursor(cursor) if cursor else (None, [])
+        offset = int(values[0]) if values else 0
+        return encode_cursor(OFFSET, [offset + limit])
+
+    column_positions = {column.name: i for i, column in enumerate(table.columns)}
+    last_row = rows[limit - 1]
+    return encode_cursor(KEYSET, [last_row[column_positions[name]] for name in primary_key_columns(table)])
@@ -0,0 +1,391 @@
+import asyncio
+import bisect
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+from fastapi import HTTPException, status
+
+from config import get_settings
+
+from .formats import arrow_record_batch, arrow_schema_for_description
+from .handlers.mysql import MySQLQueryStream
+from .handlers.mysql_async import AsyncMySQLQueryStream
+
+
+class StoredResult:
+    """Metadata of a query result materialized to an Arrow IPC file on disk."""
+
+    def __init__(
+        self,
+        result_id: str,
+        connection_id: str,
+        user_id: str,
+        path: str,
+        columns: List[Dict[str, str]],
+        batch_offsets: List[int],
+        size: int,
+        ttl: float
+    ):
+        self.id = result_id
+        self.connection_id = connection_id
+        self.user_id = user_id
+        self.path = path
+        self.columns = columns
+        # batch_offsets[i] is the first row of record batch i; the last entry is the row count
+        self.batch_offsets = batch_offsets
+        self.size = size
+        self.ttl = ttl
+        self.created_at = datetime.now()
+        self.last_access = time.monotonic()
+
+    @property
+    def row_count(self) -> int:
+        return self.batch_offsets[-1]
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.last_access >= self.ttl
+
+    @property
+    def expires_at(self) -> datetime:
+        return datetime.now() + timedelta(seconds=max(self.ttl - (time.monotonic() - self.last_access), 0))
+
+    def touch(self) -> None:
+        self.last_access = time.monotonic()
+
+
+class ResultFile:
+    """An Arrow IPC file being written, one record batch per chunk of rows."""
+
+    def __init__(self, result_id: str, path: str, description: List[tuple]):
+        self.result_id = result_id
+        self.path = path
+        self.schema = arrow_schema_for_description(description)
+        # batch_offsets[i] is the first row of record batch i; the last entry is the row count
+        self.batch_offsets = [0]
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, rows: List[tuple]) -> int:
+        """Append a batch of rows; returns the bytes written so far."""
+        self._writer.write_batch(arrow_record_batch(self.schema, rows))
+        self.batch_offsets.append(self.batch_offsets[-1] + len(rows))
+        return self._sink.tell()
+
+    def close(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+    def discard(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+        ResultStore._unlink(self.path)
+
+
+class ResultStore:
+    """
+    Materializes large query results once into local Arrow IPC files and serves
+    row windows from them.
+
+    Files are written batch by batch from the MySQL stream, so a result is never
+    held in Python objects as a whole. Reads memory-map the file and only touch
+    the record batches that overlap the requested window, so scrolling a
+    million-row result costs the same at any depth and never re-queries MySQL.
+
+    Results expire ``ttl`` seconds after they were last read. The total size of
+    all files, including the ones still being written, is kept under
+    ``max_bytes``: every written batch is counted against the budget right away,
+    and the least recently read results are deleted to make room. A result that
+    alone exceeds the budget, or that cannot fit next to the results being
+    written concurrently, is rejected while it is being written.
+    """
+
+    FILE_SUFFIX = ".arrow"
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._results: Dict[str, StoredResult] = {}
+        self._bytes = 0
+        # Bytes written so far by each result file still being written
+        self._in_flight: Dict[str, int] = {}
+        self._in_flight_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def materialize(self, stream: MySQLQueryStream, user_id: str) -> StoredResult:
+        """
+        Write an opened query stream to a new result file. Blocking; run it off the event loop.
+
+        Raises:
+            HTTPException:
+                - 413: The result is larger than the whole disk budget
+                - 507: Results being written concurrently leave no room for it
+        """
+        result_file = self._create_file(stream.description)
+        try:
+            for rows in stream:
+                error = self._reserve(result_file, result_file.write(rows))
+                if error is not None:
+                    # Unbuffered: closing would first read every remaining row
+                    self._cancel(stream)
+                    raise error
+            result_file.close()
+        except BaseException:
+            stream.close(failed=True)
+            self._discard(result_file)
+            raise
+        return self._register(result_file, stream.connection_id, stream.columns, user_id)
+
+    async def materialize_async(self, stream: AsyncMySQLQueryStream, user_id: str) -> StoredResult:
+        """
+        Write an opened aiomysql query stream to a new result file. Rows are read
+        on the event loop; only encoding and writing each batch runs in a thread.
+
+        Raises:
+            HTTPException:
+                - 413: The result is larger than the whole disk budget
+                - 507: Results being written concurrently leave no room for it
+        """
+        result_file = await asyncio.to_thread(self._create_file, stream.description)
+        try:
+            async for rows in stream:
+                error = self._reserve(result_file, await asyncio.to_thread(result_file.write, rows))
+                if error is not None:
+                    await self._cancel_async(stream)
+                    raise error
+            await asyncio.to_thread(result_file.close)
+        except BaseException:
+            await stream.close(failed=True)
+            self._discard(result_file)
+            raise
+        return self._register(result_file, stream.connection_id, stream.columns, user_id)
+
+    def _create_file(self, description: List[tuple]) -> "ResultFile":
+        self.collect_garbage()
+        os.makedirs(self.directory, exist_ok=True)
+        result_id = uuid.uuid4().hex
+        return ResultFile(result_id, os.path.join(self.directory, result_id + self.FILE_SUFFIX), description)
+
+    def _reserve(self, result_file: "ResultFile", written: int) -> Optional[HTTPException]:
+        """
+        Count a file's bytes written so far against the budget, deleting the least
+        recently read results to make room. Returns the error to stop the write
+        with if the file does not fit.
+        """
+        with self._lock:
+            self._in_flight_bytes += written - self._in_flight.get(result_file.result_id, 0)
+            self._in_flight[result_file.result_id] = written
+            if written > self.max_bytes:
+                return HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Result exceeds the result store budget of {self.max_bytes} bytes"
+                )
+            if self._bytes + self._in_flight_bytes <= self.max_bytes:
+                return None
+            self._evict_over_budget()
+            if self._bytes + self._in_flight_bytes > self.max_bytes:
+                return HTTPException(
+                    status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+                    detail="The result store is full with results being written; try again later"
+                )
+            return None
+
+    def _discard(self, result_file: "ResultFile") -> None:
+        with self._lock:
+            self._in_flight_bytes -= self._in_flight.pop(result_file.result_id, 0)
+        result_file.discard()
+
+    def _register(
+        self,
+        result_file: "ResultFile",
+        connection_id: str,
+        columns: List[Dict[str, str]],
+        user_id: str
+    ) -> StoredResult:
+        result = StoredResult(
+            result_file.result_id,
+            connection_id,
+            user_id,
+            result_file.path,
+            columns,
+            result_file.batch_offsets,
+            os.path.getsize(result_file.path),
+            self.ttl
+        )
+        with self._lock:
+            self._in_flight_bytes -= self._in_flight.pop(result.id, 0)
+            self._results[result.id] = result
+            self._bytes += result.size
+            self._evict_over_budget(keep=result.id)
+        return result
+
+    @staticmethod
+    def _cancel(stream: MySQLQueryStream) -> None:
+        """Stop the statement behind an abandoned stream (KILL QUERY); best effort."""
+        try:
+            stream.cancel()
+        except Exception as e:
+            print(f"⚠️ Failed to cancel a rejected result query: {e}")
+
+    @staticmethod
+    async def _cancel_async(stream: AsyncMySQLQueryStream) -> None:
+        try:
+            await stream.cancel()
+        except Exception as e:
+            print(f"⚠️ Failed to cancel a rejected result query: {e}")
+
+    def get(self, result_id: str) -> Optional[StoredResult]:
+        with self._lock:
+            result = self._results.get(result_id)
+            if result is None:
+                return None
+            if result.expired:
+                self._remove(result_id)
+                self.expirations += 1
+                return None
+            result.touch()
+            return result
+
+    def resolve_columns(self, result: StoredResult, names: List[str]) -> List[int]:
+        """
+        Map column names to their positions in a stored result.
+
+        Raises:
+            ValueError: If a name is unknown or ambiguous (several result columns share it)
+        """
+        positions: Dict[str, List[int]] = {}
+        for index, column in enumerate(result.columns):
+            positions.setdefault(column["name"], []).append(index)
+
+        indices = []
+        for name in names:
+            matches = positions.get(name)
+            if not matches:
+                raise ValueError(f"Unknown column: {name}")
+            if len(matches) > 1:
+                raise ValueError(f"Ambiguous column: {name}")
+            indices.append(matches[0])
+        return indices
+
+    def read_window(
+        self,
+        result: StoredResult,
+        offset: int,
+        limit: int,
+        column_indices: Optional[List[int]] = None
+    ) -> pa.Table:
+        """
+        Read rows ``[offset, offset + limit)`` of a stored result, optionally only some columns.
+
+        The returned table references the memory-mapped file; callers should
+        encode it before the result can be deleted.
+        """
+        end = min(offset + limit, result.row_count)
+        if offset >= end:
+            source = pa.memory_map(result.path, "r")
+            schema = pa.ipc.open_file(source).schema
+            empty = schema.empty_table()
+            return empty.select(column_indices) if column_indices is not None else empty
+
+        # Only the record batches overlapping the window are mapped in
+        first = bisect.bisect_right(result.batch_offsets, offset) - 1
+        last = bisect.bisect_left(result.batch_offsets, end) - 1
+        source = pa.memory_map(result.path, "r")
+        reader = pa.ipc.open_file(source)
+        batches = [reader.get_batch(i) for i in range(first, last + 1)]
+        window = pa.Table.from_batches(batches, schema=reader.schema)
+        window = window.slice(offset - result.batch_offsets[first], end - offset)
+        return window.select(column_indices) if column_indices is not None else window
+
+    def delete(self, result_id: str) -> bool:
+        with self._lock:
+            if result_id not in self._results:
+                return False
+            self._remove(result_id)
+            return True
+
+    def collect_garbage(self) -> int:
+        """Delete expired results and enforce the disk budget. Returns the number of results removed."""
+        with self._lock:
+            expired = [result_id for result_id, result in self._results.items() if result.expired]
+            for result_id in expired:
+                self._remove(result_id)
+            self.expirations += len(expired)
+            evicted = self._evict_over_budget()
+            return len(expired) + evicted
+
+    def clear(self) -> None:
+        """Delete every result file, including ones left behind by a previous process."""
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+            self._in_flight.clear()
+            self._in_flight_bytes = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "results": len(self._results),
+                "bytes": self._bytes,
+                "inFlightBytes": self._in_flight_bytes,
+                "maxBytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _evict_over_budget(self, keep: Optional[str] = None) -> int:
+        evicted = 0
+        for result in sorted(self._results.values(), key=lambda result: result.last_access):
+            if self._bytes + self._in_flight_bytes <= self.max_bytes:
+                break
+            if result.id == keep:
+                continue
+            self._remove(result.id)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def _remove(self, result_id: str) -> None:
+        # Open memory maps stay valid after unlink, so in-flight reads finish
+        result = self._results.pop(result_id)
+        self._bytes -= result.size
+        self._unlink(result.path)
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def run_result_store_gc(interval_seconds: int) -> None:
+    """Background loop that deletes expired result files every ``interval_seconds``."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result_store.collect_garbage()
+        except Exception as e:
+            print(f"❌ Result store cleanup failed: {str(e)}")
+
+
+_settings = get_settings()
+
+result_store = ResultStore(
+    directory=_settings.RESULT_STORE_DIR or os.path.join(tempfile.gettempdir(), "meruem-results"),
+    max_bytes=_settings.RESULT_STORE_MAX_BYTES,
+    ttl=_settings.RESULT_STORE_TTL,
+)
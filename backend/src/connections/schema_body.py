@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, List
+
+from config import get_settings
+
+from .schema import ConnectionTable
+from .schema_cache import SchemaDerivedCache
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+# Bodies are compressed once per schema version, so the slower, smaller settings pay off
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Below this size compression saves less than its headers and decoding cost
+COMPRESSION_MIN_BYTES = 1024
+
+
+class EncodedSchema:
+    """
+    The full schema of a connection as a ready JSON response body.
+
+    ``bodies`` maps a content coding ("identity", "gzip", "br") to its bytes.
+    ``digest`` is the SHA-256 of the identity body; it is stored as
+    ``Connection.schemaHash`` and used as the ETag, so unchanged schemas
+    are answered with 304 without touching the tables.
+    """
+
+    def __init__(self, body: bytes):
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+
+def schema_etag(digest: str) -> str:
+    # Weak: the gzip/br bodies are the same JSON, not the same bytes
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str, digest: str) -> bool:
+    """Weak comparison of an If-None-Match header against a schema digest."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') == digest:
+            return True
+    return False
+
+
+def encode_schema(tables: List[ConnectionTable]) -> EncodedSchema:
+    """Encode stored tables exactly like the schema endpoint's JSON response, keyed by "schema.table"."""
+    schema = {table.key: table.to_table_schema().model_dump(mode="json") for table in tables}
+    return EncodedSchema(json.dumps(schema, separators=(",", ":")).encode("utf-8"))
+
+
+encoded_schemas = SchemaDerivedCache(
+    encode_schema,
+    max_connections=get_settings().SCHEMA_INDEX_MAX_CONNECTIONS
+)
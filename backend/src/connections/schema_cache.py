@@ -0,0 +1,66 @@
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from .crud import get_connection_tables
+from .schema import Connection, ConnectionTable
+
+
+T = TypeVar("T")
+
+
+class SchemaDerivedCache(Generic[T]):
+    """
+    Per-connection structures derived from the stored schema (search index, join graph, ...).
+
+    A structure is built on first use after a connection's schema version
+    changes, so a refresh never pays for it up front. ``build`` receives all
+    stored tables of the connection and runs on a worker thread. At most
+    ``max_connections`` connections are kept, least recently used first out.
+    """
+
+    def __init__(self, build: Callable[[List[ConnectionTable]], T], max_connections: int):
+        self.build = build
+        self.max_connections = max_connections
+        self._entries: "OrderedDict[str, Tuple[int, T]]" = OrderedDict()
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+        self.builds = 0
+
+    async def get(self, connection: Connection) -> T:
+        connection_id = str(connection.id)
+        value = self._current(connection_id, connection.schemaVersion)
+        if value is not None:
+            return value
+
+        # One build per connection at a time; concurrent callers wait for it
+        lock = self._build_locks.setdefault(connection_id, asyncio.Lock())
+        async with lock:
+            value = self._current(connection_id, connection.schemaVersion)
+            if value is not None:
+                return value
+            tables = await get_connection_tables(connection.id)
+            value = await run_in_threadpool(self.build, tables)
+            self.builds += 1
+            self.put(connection_id, connection.schemaVersion, value)
+        self._build_locks.pop(connection_id, None)
+        return value
+
+    def put(self, connection_id: str, schema_version: int, value: T) -> None:
+        """Store a structure built elsewhere (e.g. while the schema was being written)."""
+        self._entries[connection_id] = (schema_version, value)
+        self._entries.move_to_end(connection_id)
+        while len(self._entries) > self.max_connections:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, connection_id: str) -> None:
+        """Drop a connection's structure (e.g. after its schema was refreshed)."""
+        self._entries.pop(connection_id, None)
+
+    def _current(self, connection_id: str, schema_version: int) -> Optional[T]:
+        cached = self._entries.get(connection_id)
+        if cached is None or cached[0] != schema_version:
+            return None
+        self._entries.move_to_end(connection_id)
+        return cached[1]
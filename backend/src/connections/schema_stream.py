@@ -0,0 +1,177 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from .crud import get_connection_tables, get_schema_state
+from .formats import encode_json_line, json_default
+from .jobs import schema_jobs
+from .pagination import decode_cursor, encode_cursor
+from .schema import Connection, SchemaStatus
+
+
+# The first batch is small so the first tables render right away
+FIRST_BATCH_TABLES = 50
+BATCH_TABLES = 500
+
+# Seconds between checks of a running introspection
+PROGRESS_POLL_INTERVAL = 1.0
+
+# A stream restarts when the schema changes under it; a schema that keeps changing ends it
+MAX_RESETS = 3
+
+CURSOR_STRATEGY = "schema"
+
+# (event, cursor or None, payload)
+SchemaEvent = Tuple[str, Optional[str], Dict[str, Any]]
+
+
+def encode_schema_cursor(schema_version: int, key: str) -> str:
+    return encode_cursor(CURSOR_STRATEGY, [schema_version, key])
+
+
+def decode_schema_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    Decode a schema stream cursor into (schema version, last table key sent).
+
+    Raises:
+        ValueError: If the cursor is malformed or not a schema stream cursor
+    """
+    strategy, values = decode_cursor(cursor)
+    if strategy != CURSOR_STRATEGY or len(values) != 2:
+        raise ValueError("Invalid schema stream cursor")
+    schema_version, key = values
+    if not isinstance(schema_version, int) or not isinstance(key, str):
+        raise ValueError("Invalid schema stream cursor")
+    return schema_version, key
+
+
+async def schema_stream_events(
+    connection: Connection,
+    resume_after: Optional[Tuple[int, str]] = None
+) -> AsyncIterator[SchemaEvent]:
+    """
+    Produce the events of a progressive schema stream.
+
+    - ``progress``: while the connection's first introspection runs (tables are
+      stored when it completes), with the job's table and per-database counts
+    - ``meta``: schema version, status and table count, and whether the stream
+      resumes after ``cursor``
+    - ``table``: one stored table, in key order, with the cursor to resume after it
+    - ``reset``: the schema changed while streaming; the client drops what it
+      received and the stream starts over with the new version
+    - ``done``: all tables were sent, with the cursor after the last table
+      (also its event ID, so a reconnect after it resumes at the end)
+    - ``error``: the schema could not be read
+
+    A cursor of an older schema version cannot be resumed from: the stream
+    starts from the first table and ``meta.resumed`` is false.
+
+    Args:
+        connection: The connection whose stored tables are streamed
+        resume_after: Decoded cursor (schema version, table key) of the last
+            table the client received, to resume after it
+    """
+    resume_version, after = resume_after if resume_after else (None, None)
+
+    state = await get_schema_state(connection.id)
+    last_progress = None
+    while state is not None and state.schemaStatus == SchemaStatus.PENDING:
+        job = schema_jobs.active_job_for(str(connection.id))
+        if job is not None:
+            snapshot = job.snapshot()
+            progress = {key: snapshot[key] for key in ("jobId", "status", "tablesDone", "tablesTotal", "databases")}
+            if progress != last_progress:
+                yield "progress", None, progress
+                last_progress = progress
+        await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+        state = await get_schema_state(connection.id)
+
+    if state is None:
+        # New connections whose introspection fails are deleted
+        yield "error", None, {"error": "Schema introspection failed and the connection was removed"}
+        return
+    if state.schemaStatus == SchemaStatus.FAILED and state.tableCount == 0:
+        yield "error", None, {"error": "Schema introspection failed"}
+        return
+
+    version = state.schemaVersion
+    if resume_version != version:
+        after = None
+    yield "meta", None, {
+        "schemaVersion": version,
+        "schemaStatus": state.schemaStatus,
+        "tableCount": state.tableCount,
+        "resumed": after is not None,
+    }
+
+    sent, resets = 0, 0
+    batch_size = FIRST_BATCH_TABLES
+    while True:
+        tables = await get_connection_tables(connection.id, after=after, limit=batch_size)
+        # A refresh writes tables before bumping the version, so a batch read
+        # during one is caught by the check after the next batch at the latest
+        state = await get_schema_state(connection.id)
+        if state is None:
+            yield "error", None, {"error": "Connection was deleted"}
+            return
+        if state.schemaVersion != version:
+            resets += 1
+            if resets > MAX_RESETS:
+                yield "error", None, {"error": "Schema keeps changing; try again later"}
+                return
+            version, after, sent, batch_size = state.schemaVersion, None, 0, FIRST_BATCH_TABLES
+            yield "reset", None, {"schemaVersion": version, "tableCount": state.tableCount}
+            continue
+
+        for stored in tables:
+            after = stored.key
+            sent += 1
+            table_cursor = encode_schema_cursor(version, stored.key)
+            yield "table", table_cursor, {
+                "key": stored.key,
+                "table": stored.to_table_schema().model_dump(mode="json"),
+                "cursor": table_cursor,
+            }
+        if len(tables) < batch_size:
+            break
+        batch_size = BATCH_TABLES
+
+    done_cursor = encode_schema_cursor(version, after) if after is not None else None
+    yield "done", done_cursor, {"tables": sent, "cursor": done_cursor}
+
+
+async def schema_stream_finished(connection: Connection, resume_after: Tuple[int, str]) -> bool:
+    """Whether a stream resumed after ``resume_after`` would send no table: the cursor is current and last."""
+    resume_version, after = resume_after
+    state = await get_schema_state(connection.id)
+    if state is None or state.schemaStatus == SchemaStatus.PENDING or state.schemaVersion != resume_version:
+        return False
+    return not await get_connection_tables(connection.id, after=after, limit=1)
+
+
+def ndjson_schema_event(event: str, event_id: Optional[str], payload: Dict[str, Any]) -> bytes:
+    """One NDJSON line: the payload with its event name under "type"."""
+    return encode_json_line({"type": event, **payload})
+
+
+def sse_schema_event(event: str, event_id: Optional[str], payload: Dict[str, Any]) -> bytes:
+    """
+    One server-sent event. Table events carry their cursor as the event ID,
+    so EventSource sends it back as Last-Event-ID when it reconnects.
+    """
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(payload, default=json_default, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+async def encode_schema_stream(events: AsyncIterator[SchemaEvent], result_format: str) -> AsyncIterator[bytes]:
+    """Encode schema events as NDJSON lines or server-sent events."""
+    encode = sse_schema_event if result_format == "sse" else ndjson_schema_event
+    try:
+        async for event in events:
+            yield encode(*event)
+    except Exception as e:
+        # The response has started; report the failure in the stream itself
+        yield encode("error", None, {"error": str(e)})
@@ -0,0 +1,235 @@
+import bisect
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import get_settings
+
+from .schema import ColumnSchema, ConnectionTable
+from .schema_cache import SchemaDerivedCache
+
+
+TABLE = "table"
+COLUMN = "column"
+
+# Minimum trigram similarity (Jaccard) for a fuzzy match
+FUZZY_THRESHOLD = 0.3
+
+# Shorter queries only match by prefix; a trigram of one or two letters matches almost anything
+FUZZY_MIN_QUERY_LENGTH = 3
+
+# Fuzzy candidates scored per query; the rest are cut in name order
+FUZZY_MAX_CANDIDATES = 200
+
+# Name tokens: runs of letters or of digits ("order_items2" -> order, items, 2)
+NAME_TOKEN = re.compile(r"[a-z]+|[0-9]+")
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of a lowercased name, padded so short names and word starts still match."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_tokens(name: str) -> List[str]:
+    """Split a lowercased name into its words and numbers."""
+    return NAME_TOKEN.findall(name.lower()) or [name.lower()]
+
+
+def similarity(grams: Set[str], other: Set[str]) -> float:
+    """Jaccard similarity of two trigram sets."""
+    shared = len(grams & other)
+    return shared / (len(grams) + len(other) - shared) if shared else 0.0
+
+
+class SchemaSearchIndex:
+    """
+    In-memory search index over the table and column names of one schema.
+
+    Names are indexed once per distinct lowercase name, since column names like
+    ``id`` or ``created_at`` repeat across thousands of tables:
+
+    - a sorted name list answers prefix queries with a binary search
+    - fuzzy queries are matched word by word: each word of the query is compared
+      by trigram similarity against the (small) vocabulary of words used in
+      names, and the names containing a close match for every query word are
+      found with set intersections. Schemas reuse a few hundred words across
+      thousands of names, so this never walks per-name posting lists
+    - per-type column lists answer type filters like "all datetime columns"
+
+    Types are the simplified types stored with the schema (see map_mysql_type).
+    The index is immutable; a schema change builds a new one.
+    """
+
+    def __init__(self, tables: Iterable[Tuple[str, str, List[ColumnSchema]]]):
+        """
+        Args:
+            tables: ("schema.table" key, table name, columns) of every table
+        """
+        # entries[i] = (kind, table key, name, type, is primary)
+        self.entries: List[Tuple[str, str, str, Optional[str], bool]] = []
+        entries_by_name: Dict[str, Dict[str, List[int]]] = {}
+        self.columns_by_type: Dict[str, List[int]] = {}
+
+        for key, table_name, columns in tables:
+            entries_by_name.setdefault(table_name.lower(), {}).setdefault(TABLE, []).append(len(self.entries))
+            self.entries.append((TABLE, key, table_name, None, False))
+            for column in columns:
+                entry_id = len(self.entries)
+                entries_by_name.setdefault(column.name.lower(), {}).setdefault(COLUMN, []).append(entry_id)
+                self.columns_by_type.setdefault(column.type, []).append(entry_id)
+                self.entries.append((COLUMN, key, column.name, column.type, column.isPrimary))
+
+        self.names = sorted(entries_by_name)
+        # Per name: entry IDs by kind, so a kind filter never walks the other kind
+        self.entries_by_name = [entries_by_name[name] for name in self.names]
+        self.name_trigrams = [trigrams(name) for name in self.names]
+
+        names_by_token: Dict[str, Set[int]] = {}
+        for name_id, name in enumerate(self.names):
+            for token in name_tokens(name):
+                names_by_token.setdefault(token, set()).add(name_id)
+        self.tokens = sorted(names_by_token)
+        self.names_by_token = [names_by_token[token] for token in self.tokens]
+        self.token_trigrams = [trigrams(token) for token in self.tokens]
+        token_postings: Dict[str, List[int]] = {}
+        for token_id, grams in enumerate(self.token_trigrams):
+            for gram in grams:
+                token_postings.setdefault(gram, []).append(token_id)
+        self.token_postings = token_postings
+
+    def search(
+        self,
+        query: str = "",
+        kind: Optional[str] = None,
+        column_type: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Find tables and columns by name.
+
+        Prefix matches come first in name order (an exact match leads), then, for
+        queries of three or more characters, fuzzy matches by descending trigram
+        similarity. Without a query, every column of
+        ``column_type`` is listed.
+
+        Args:
+            query: Name or name prefix to look for (case-insensitive)
+            kind: Only return "table" or "column" matches
+            column_type: Only return columns of this simplified type (implies kind="column")
+            limit: Maximum number of results
+        """
+        if column_type is not None:
+            kind = COLUMN
+        query = query.strip().lower()
+        results: List[Dict[str, Any]] = []
+        seen: Set[int] = set()
+
+        if not query:
+            if column_type is None:
+                return results
+            for entry_id in self.columns_by_type.get(column_type, [])[:limit]:
+                results.append(self._result(entry_id, 1.0))
+            return results
+
+        for name_id in self._prefix_matches(query):
+            score = 1.0 if self.names[name_id] == query else len(query) / len(self.names[name_id])
+            if self._collect(name_id, score, kind, column_type, limit, results, seen):
+                return results
+
+        if len(query) < FUZZY_MIN_QUERY_LENGTH:
+            return results
+        for name_id, score in self._fuzzy_matches(query):
+            if name_id in seen:
+                continue
+            if self._collect(name_id, score, kind, column_type, limit, results, seen):
+                return results
+        return results
+
+    def _prefix_matches(self, query: str) -> Iterable[int]:
+        # Names starting with the query are contiguous in sorted order, the query itself first
+        start = bisect.bisect_left(self.names, query)
+        end = bisect.bisect_left(self.names, query + "\uffff", lo=start)
+        return range(start, end)
+
+    def _fuzzy_matches(self, query: str) -> List[Tuple[int, float]]:
+        """Names containing a close match for every word of the query, most similar first."""
+        candidate_sets = []
+        for token in name_tokens(query):
+            token_ids = self._similar_tokens(token)
+            if not token_ids:
+                return []
+            sets = [self.names_by_token[token_id] for token_id in token_ids]
+            # Usually one word matches; its set is used as is rather than copied
+            candidate_sets.append(sets[0] if len(sets) == 1 else set().union(*sets))
+        candidate_sets.sort(key=len)
+        candidates = candidate_sets[0].intersection(*candidate_sets[1:])
+        if len(candidates) > FUZZY_MAX_CANDIDATES:
+            candidates = sorted(candidates)[:FUZZY_MAX_CANDIDATES]
+
+        query_grams = trigrams(query)
+        matches = [(name_id, similarity(query_grams, self.name_trigrams[name_id])) for name_id in candidates]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def _similar_tokens(self, token: str) -> List[int]:
+        """Vocabulary words that start with ``token`` or are similar to it."""
+        start = bisect.bisect_left(self.tokens, token)
+        end = bisect.bisect_left(self.tokens, token + "\uffff", lo=start)
+        matches = set(range(start, end))
+        if token.isdigit():
+            # Numbers only match by prefix; "12" is not a typo of "21"
+            return list(matches)
+
+        grams = trigrams(token)
+        # A word sharing fewer than `needed` trigrams cannot reach the threshold, so it
+        # must contain at least one of the (len - needed + 1) rarest query trigrams
+        needed = max(1, math.ceil(FUZZY_THRESHOLD * len(grams)))
+        rarest = sorted(grams, key=lambda gram: len(self.token_postings.get(gram, ())))
+        for gram in rarest[:len(grams) - needed + 1]:
+            for token_id in self.token_postings.get(gram, ()):
+                if token_id not in matches and similarity(grams, self.token_trigrams[token_id]) >= FUZZY_THRESHOLD:
+                    matches.add(token_id)
+        return list(matches)
+
+    def _collect(
+        self,
+        name_id: int,
+        score: float,
+        kind: Optional[str],
+        column_type: Optional[str],
+        limit: int,
+        results: List[Dict[str, Any]],
+        seen: Set[int]
+    ) -> bool:
+        """Append the entries of a matched name that pass the filters. Returns True once ``limit`` is reached."""
+        seen.add(name_id)
+        by_kind = self.entries_by_name[name_id]
+        for entry_kind in (TABLE, COLUMN):
+            if kind is not None and entry_kind != kind:
+                continue
+            for entry_id in by_kind.get(entry_kind, ()):
+                if column_type is not None and self.entries[entry_id][3] != column_type:
+                    continue
+                results.append(self._result(entry_id, score))
+                if len(results) >= limit:
+                    return True
+        return False
+
+    def _result(self, entry_id: int, score: float) -> Dict[str, Any]:
+        kind, table_key, name, column_type, is_primary = self.entries[entry_id]
+        result: Dict[str, Any] = {"kind": kind, "table": table_key, "name": name, "score": round(score, 3)}
+        if kind == COLUMN:
+            result["type"] = column_type
+            result["isPrimary"] = is_primary
+        return result
+
+
+def build_search_index(tables: List[ConnectionTable]) -> SchemaSearchIndex:
+    return SchemaSearchIndex((table.key, table.name, table.columns) for table in tables)
+
+
+schema_search_indexes = SchemaDerivedCache(
+    build_search_index,
+    max_connections=get_settings().SCHEMA_INDEX_MAX_CONNECTIONS
+)
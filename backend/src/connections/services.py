@@ -0,0 +1,314 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from beanie import PydanticObjectId
+from beanie.operators import Inc, Or, Set
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from src.user.schema import User
+from src.workspace.services import get_user_role_in_workspace
+
+from .cache import query_cache
+from .context import schema_context_indexes
+from .crud import (
+    apply_table_changes,
+    apply_table_stats,
+    delete_connection_tables,
+    get_connection_tables,
+    get_table_fingerprints,
+)
+from .governor import QueryPriority, query_governor
+from .handlers.mysql import get_mysql_table_stats, parse_mysql_connection_string, refresh_mysql_schema
+from .handlers.pool import pool_registry
+from .handlers import mysql_async
+from .jobs import SchemaJob, schema_jobs
+from .joins import foreign_key_graphs
+from .schema import Connection, SchemaDiff, SchemaStatus, TableSchema
+from .schema_body import encode_schema, encoded_schemas
+from .search import schema_search_indexes
+
+
+# Statistics collections started outside the refresher loop
+_stats_tasks: "set[asyncio.Task]" = set()
+
+
+async def get_connection_for_user(connection_id: str, current_user: User) -> Connection:
+    """
+    Load a connection and check that the user is a member of its workspace.
+    
+    Raises:
+        HTTPException:
+            - 400: Invalid connection ID format
+            - 404: Connection not found or user not in its workspace
+    """
+    try:
+        connection_object_id = PydanticObjectId(connection_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid connection ID format: {connection_id}"
+        )
+    
+    connection = await Connection.get(connection_object_id)
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+    
+    # Raises 404 if the user is not a member of the connection's workspace
+    await get_user_role_in_workspace(str(connection.workspaceId.ref.id), str(current_user.id))
+    return connection
+
+
+async def start_schema_introspection(
+    connection: Connection,
+    workspace_id: str,
+    remove_on_failure: bool = False,
+    kind: str = "introspection",
+    priority: QueryPriority = QueryPriority.BACKGROUND
+) -> SchemaJob:
+    """
+    Introspect a connection's database in the background and patch the stored tables.
+
+    Tables are compared against the stored fingerprints, so only added, dropped or
+    changed tables are re-introspected. A connection without fingerprints (new or
+    created before fingerprinting existed) is introspected in full.
+
+    Args:
+        connection: The (already inserted) connection document to fill
+        workspace_id: ID of the workspace owning the connection, used for job access checks
+        remove_on_failure: Delete the connection document if introspection fails
+            (used on creation, so a bad connection string leaves nothing behind)
+        kind: Job kind reported to clients ("introspection" or "refresh")
+        priority: Scheduling class of the job in the query governor; the job waits
+            for a slot on the connection like user queries do, but never times out
+
+    Returns:
+        SchemaJob: The scheduled job, whose ID clients can poll for progress
+    """
+    connection_id = str(connection.id)
+    connection_params = parse_mysql_connection_string(connection.config.connectionString)
+    known_fingerprints = await get_table_fingerprints(connection.id)
+    job = SchemaJob(kind=kind, connection_id=connection_id, workspace_id=workspace_id)
+
+    def work(job: SchemaJob) -> SchemaDiff:
+        return refresh_mysql_schema(
+            connection_params,
+            connection_id,
+            known_fingerprints,
+            progress=job.update_progress,
+            database_progress=job.update_database_progress
+        )
+
+    async def async_work(job: SchemaJob) -> SchemaDiff:
+        return await mysql_async.refresh_mysql_schema(
+            connection_params,
+            connection_id,
+            known_fingerprints,
+            progress=job.update_progress,
+            database_progress=job.update_database_progress
+        )
+
+    async def on_success(diff: SchemaDiff) -> None:
+        await apply_schema_diff(connection, diff)
+        if connection.statsRefreshedAt is None:
+            # New connections get statistics right away rather than at the next stats cycle
+            collect_table_stats_soon(connection, workspace_id)
+
+    async def on_failure(error: str) -> None:
+        if remove_on_failure:
+            await delete_connection_tables(connection.id)
+            await connection.delete()
+            pool_registry.discard(connection_id)
+            await mysql_async.async_pool_registry.discard(connection_id)
+        else:
+            await connection.set({"schemaStatus": SchemaStatus.FAILED})
+
+    def admission():
+        return query_governor.slot(connection_id, workspace_id, "", priority, wait_indefinitely=True)
+
+    if mysql_async.async_driver_enabled():
+        work = async_work
+    return schema_jobs.submit(job, work, on_success, on_failure, admission)
+
+
+async def apply_schema_diff(connection: Connection, diff: SchemaDiff) -> None:
+    """
+    Patch a connection's stored tables with the result of a refresh.
+    A diff without changes only records the refresh time and failed databases.
+    """
+    refreshed_at = datetime.now()
+    for database, error in diff.failedDatabases.items():
+        print(f"⚠️ Database {database} of connection {connection.id} could not be introspected: {error}")
+
+    if not diff.changed and not diff.removed:
+        await connection.set({
+            "schemaStatus": SchemaStatus.READY,
+            "schemaRefreshedAt": refreshed_at,
+            "failedDatabases": diff.failedDatabases
+        })
+        return
+
+    await apply_table_changes(connection.id, diff.changed, diff.removed, diff.fingerprints)
+    # Encode the response body of the schema endpoint now, so the hash is stored
+    # together with the new version and the first sidebar load after a refresh is cached
+    tables = await get_connection_tables(connection.id)
+    encoded = await run_in_threadpool(encode_schema, tables)
+
+    await connection.update(
+        Set({
+            "tableCount": len(tables),
+            "schemaStatus": SchemaStatus.READY,
+            "schemaRefreshedAt": refreshed_at,
+            "schemaHash": encoded.digest,
+            "failedDatabases": diff.failedDatabases
+        }),
+        Inc({"schemaVersion": 1})
+    )
+    encoded_schemas.put(str(connection.id), connection.schemaVersion, encoded)
+    # Cache keys, search indexes, join graphs and context indexes are tied to the
+    # schema version; this just frees the memory early
+    query_cache.invalidate_connection(str(connection.id))
+    schema_search_indexes.invalidate(str(connection.id))
+    foreign_key_graphs.invalidate(str(connection.id))
+    schema_context_indexes.invalidate(str(connection.id))
+    print(f"🔄 Schema of connection {connection.id} refreshed: "
+          f"{len(diff.changed)} changed, {len(diff.removed)} removed")
+
+
+async def migrate_embedded_schemas() -> int:
+    """
+    Move schemas still embedded as Connection.dbSchema into the connection_tables collection.
+    Connections created before the per-table collection existed are migrated once at startup.
+
+    Returns:
+        int: Number of connections migrated
+    """
+    collection = Connection.get_pymongo_collection()
+    migrated = 0
+    async for raw in collection.find({"dbSchema": {"$exists": True}}, {"dbSchema": 1}):
+        tables = {
+            key: TableSchema.model_validate(table)
+            for key, table in (raw.get("dbSchema") or {}).items()
+        }
+        # No fingerprints: the next refresh re-introspects these tables once
+        await apply_table_changes(raw["_id"], tables, [], {})
+        encoded = await run_in_threadpool(encode_schema, await get_connection_tables(raw["_id"]))
+        await collection.update_one(
+            {"_id": raw["_id"]},
+            {
+                "$set": {"tableCount": len(tables), "schemaHash": encoded.digest},
+                "$unset": {"dbSchema": "", "schemaFingerprints": ""}
+            }
+        )
+        migrated += 1
+    return migrated
+
+
+async def refresh_stale_schemas(max_age_seconds: int) -> int:
+    """
+    Start refresh jobs for ready connections not refreshed within ``max_age_seconds``.
+
+    Returns:
+        int: Number of refresh jobs started
+    """
+    cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+    connections = await Connection.find(
+        Connection.schemaStatus == SchemaStatus.READY,
+        Or(Connection.schemaRefreshedAt == None, Connection.schemaRefreshedAt < cutoff)
+    ).to_list()
+
+    started = 0
+    for connection in connections:
+        if schema_jobs.active_job_for(str(connection.id)):
+            continue
+        await start_schema_introspection(connection, str(connection.workspaceId.ref.id), kind="refresh")
+        started += 1
+    return started
+
+
+async def run_schema_refresher(interval_seconds: int) -> None:
+    """Background loop that refreshes stale connection schemas every ``interval_seconds``."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            started = await refresh_stale_schemas(interval_seconds)
+            if started:
+                print(f"🔄 Scheduled schema refresh started for {started} connections")
+        except Exception as e:
+            print(f"❌ Scheduled schema refresh failed: {str(e)}")
+
+
+async def refresh_table_stats(connection: Connection, workspace_id: str) -> int:
+    """
+    Collect row counts, sizes and index cardinalities of a connection's tables and store them.
+
+    Statistics are refreshed on their own cadence (TABLE_STATS_REFRESH_INTERVAL),
+    independently of the structure: they change with every write, while the
+    schema rarely does, and they never bump schemaVersion. Collection waits
+    for a background slot on the connection like schema jobs do.
+
+    Returns:
+        int: Number of tables whose statistics were collected
+    """
+    connection_id = str(connection.id)
+    connection_params = parse_mysql_connection_string(connection.config.connectionString)
+    async with query_governor.slot(connection_id, workspace_id, "", QueryPriority.BACKGROUND, wait_indefinitely=True):
+        if mysql_async.async_driver_enabled():
+            stats = await mysql_async.get_mysql_table_stats(connection_params, connection_id)
+        else:
+            stats = await run_in_threadpool(get_mysql_table_stats, connection_params, connection_id)
+    await apply_table_stats(connection.id, stats)
+    await connection.set({"statsRefreshedAt": datetime.now()})
+    return len(stats)
+
+
+def collect_table_stats_soon(connection: Connection, workspace_id: str) -> None:
+    """Refresh a connection's table statistics in a background task, logging failures."""
+    async def collect() -> None:
+        try:
+            await refresh_table_stats(connection, workspace_id)
+        except Exception as e:
+            print(f"❌ Table statistics refresh failed for connection {connection.id}: {str(e)}")
+
+    task = asyncio.create_task(collect())
+    # The event loop only keeps weak references to tasks
+    _stats_tasks.add(task)
+    task.add_done_callback(_stats_tasks.discard)
+
+
+async def refresh_stale_stats(max_age_seconds: int) -> int:
+    """
+    Refresh table statistics of ready connections not refreshed within ``max_age_seconds``.
+
+    Returns:
+        int: Number of connections refreshed
+    """
+    cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+    connections = await Connection.find(
+        Connection.schemaStatus == SchemaStatus.READY,
+        Or(Connection.statsRefreshedAt == None, Connection.statsRefreshedAt < cutoff)
+    ).to_list()
+
+    results = await asyncio.gather(
+        *(refresh_table_stats(connection, str(connection.workspaceId.ref.id)) for connection in connections),
+        return_exceptions=True
+    )
+    for connection, result in zip(connections, results):
+        if isinstance(result, Exception):
+            print(f"❌ Table statistics refresh failed for connection {connection.id}: {str(result)}")
+    return sum(1 for result in results if not isinstance(result, Exception))
+
+
+async def run_stats_refresher(interval_seconds: int) -> None:
+    """Background loop that refreshes stale table statistics every ``interval_seconds``."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            refreshed = await refresh_stale_stats(interval_seconds)
+            if refreshed:
+                print(f"📊 Table statistics refreshed for {refreshed} connections")
+        except Exception as e:
+            print(f"❌ Scheduled table statistics refresh failed: {str(e)}")
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from beanie import init_beanie
@@ -6,13 +7,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Response
 from .database import  db
 from .user.schema import User
+from .user.services import backfill_normalized_emails
 from .workspace.schema import Workspace
-from .connections.schema import Connection
+from .connections.schema import Connection, ConnectionTable
 from .chats.schema import Chat
 from .auth.api import router as auth_router
+from .auth.http import http_client
 from .workspace.api import router as workspace_router
 from .connections.api import router as connections_router
 from .chats.api import router as chats_router
+from .connections.handlers.pool import pool_registry
+from .connections.handlers.mysql_async import async_pool_registry
+from .connections.jobs import schema_jobs
+from .connections.results import result_store, run_result_store_gc
+from .connections.services import migrate_embedded_schemas, run_schema_refresher, run_stats_refresher
+from config import get_settings
 
 
 
@@ -25,11 +34,48 @@ async def lifespan(app: FastAPI):
             User,
             Workspace,
             Connection,
+            ConnectionTable,
             Chat
         ],
     )
+    
+    # Users stored before normalized_email existed can't be found by email until it is filled in
+    backfilled = await backfill_normalized_emails()
+    if backfilled:
+        print(f"Backfilled normalized emails of {backfilled} users")
+    
+    # Schemas used to be embedded in the connection document; move any leftovers out
+    migrated = await migrate_embedded_schemas()
+    if migrated:
+        print(f"Moved embedded schemas of {migrated} connections to connection_tables")
+    
+    # Periodically re-fingerprint connection schemas and patch what changed
+    refresh_interval = get_settings().SCHEMA_REFRESH_INTERVAL
+    schema_refresher = asyncio.create_task(run_schema_refresher(refresh_interval)) if refresh_interval > 0 else None
+    
+    # Row counts and index statistics change with every write; they refresh on their own cadence
+    stats_interval = get_settings().TABLE_STATS_REFRESH_INTERVAL
+    stats_refresher = asyncio.create_task(run_stats_refresher(stats_interval)) if stats_interval > 0 else None
+    
+    # Result files from a previous run are not tracked anymore; start from an empty store
+    result_store.clear()
+    result_gc = asyncio.create_task(run_result_store_gc(get_settings().RESULT_STORE_GC_INTERVAL))
+    
+    # Outbound calls (Google OAuth) share one pooled client
+    http_client.open()
+    
     yield
     print("Shutting down...")
+    if schema_refresher:
+        schema_refresher.cancel()
+    if stats_refresher:
+        stats_refresher.cancel()
+    result_gc.cancel()
+    schema_jobs.shutdown()
+    pool_registry.close_all()
+    await async_pool_registry.close_all()
+    result_store.clear()
+    await http_client.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -47,6 +93,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Response headers the frontend reads; browsers hide any others from cross-origin scripts
+    expose_headers=["X-Query-Id", "X-Cache", "X-Scan-Warning", "X-Total-Count", "ETag"],
 )
 
 
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    from .schema import User
+
+
+class UserCache:
+    """
+    In-process LRU cache of User documents by user ID, for request authentication.
+
+    Entries expire ``ttl`` seconds after they were loaded, which bounds how long
+    another process's write can go unnoticed; writes through Beanie in this
+    process invalidate the entry right away (see the event hooks on User).
+    At most ``max_entries`` users are kept, least recently used first out.
+
+    Concurrent misses for the same user share one load, so a burst of parallel
+    requests from one client costs a single database read. Callers get a copy
+    of the cached document and may modify it freely.
+
+    Used from the event loop only, so no lock is needed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self._loading: Dict[str, "asyncio.Future[Optional[User]]"] = {}
+        # Bumped by every invalidation; a load that overlapped one is not cached
+        self._invalidation_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, user_id: str) -> Optional["User"]:
+        """Return a copy of the cached user, or None if it is not cached or expired."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(user_id)
+        return user.model_copy()
+
+    def put(self, user_id: str, user: "User") -> None:
+        if not self.enabled:
+            return
+        self._entries[user_id] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(
+        self,
+        user_id: str,
+        load: Callable[[str], Awaitable[Optional["User"]]]
+    ) -> Optional["User"]:
+        """
+        Return the user from the cache, or load, cache and return it.
+
+        Args:
+            user_id: The user's ID
+            load: Reads the user from the database; returns None if it does not exist
+
+        Returns:
+            Optional[User]: A copy of the user, or None if it does not exist
+            (missing users are not cached)
+        """
+        user = self.get(user_id)
+        if user is not None:
+            self.hits += 1
+            return user
+        if not self.enabled:
+            self.misses += 1
+            return await load(user_id)
+
+        pending = self._loading.get(user_id)
+        if pending is None:
+            self.misses += 1
+            pending = asyncio.ensure_future(self._load(user_id, load))
+            self._loading[user_id] = pending
+        else:
+            self.coalesced += 1
+        # Shielded: a waiter whose request is cancelled must not cancel the shared load
+        user = await asyncio.shield(pending)
+        return user.model_copy() if user is not None else None
+
+    async def _load(self, user_id: str, load: Callable[[str], Awaitable[Optional["User"]]]) -> Optional["User"]:
+        invalidation_count = self._invalidation_count
+        try:
+            user = await load(user_id)
+            if user is not None and invalidation_count == self._invalidation_count:
+                self.put(user_id, user)
+            return user
+        finally:
+            del self._loading[user_id]
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user, e.g. after it was modified or deleted."""
+        self._invalidation_count += 1
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._invalidation_count += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hitRate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+_settings = get_settings()
+user_cache = UserCache(max_entries=_settings.USER_CACHE_MAX_ENTRIES, ttl=_settings.USER_CACHE_TTL)
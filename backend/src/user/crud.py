@@ -1,6 +1,8 @@
 from typing import Optional
 from beanie import PydanticObjectId
-from .schema import User
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from .schema import User, UserCreate, normalize_email
 
 
 async def get_user_by_id(user_id: str) -> Optional[User]:
@@ -48,7 +50,44 @@ async def get_user_by_email(email: str) -> Optional[User]:
     if not email or not email.strip():
         raise ValueError("Email cannot be empty or None")
     
-    # Find the user by email (case-insensitive search)
-    user = await User.find_one(User.email == email.strip().lower())
+    # Find the user by email (case-insensitive, on the unique normalized_email index)
+    user = await User.find_one(User.normalized_email == normalize_email(email))
     
     return user
+
+
+async def get_or_create_user(user_data: UserCreate) -> User:
+    """
+    Return the user with the given email, creating it if there is none, in a
+    single atomic round trip (find_one_and_update with upsert on the unique
+    normalized_email index).
+    
+    Concurrent first logins with the same email end up with the same user:
+    MongoDB retries an upsert that loses the race on a unique index, and a
+    DuplicateKeyError that still gets through is answered by reading the winner.
+    
+    Args:
+        user_data (UserCreate): Profile of the user, stored only if it is created
+        
+    Returns:
+        User: The existing or newly created user
+    """
+    normalized_email = normalize_email(user_data.email)
+    new_user = User(
+        first_name=user_data.first_name,
+        last_name=user_data.last_name,
+        email=user_data.email,
+        profile_url=user_data.profile_url,
+        normalized_email=normalized_email
+    )
+    collection = User.get_pymongo_collection()
+    try:
+        raw = await collection.find_one_and_update(
+            {"normalized_email": normalized_email},
+            {"$setOnInsert": new_user.model_dump(exclude={"id", "revision_id"})},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raw = await collection.find_one({"normalized_email": normalized_email})
+    return User.model_validate(raw)
@@ -1,7 +1,14 @@
-from beanie import Document
+from beanie import Delete, Document, Insert, Replace, Save, SaveChanges, Update, after_event, before_event
 from pydantic import BaseModel, Field
+from pymongo import IndexModel
 from typing import Optional
 from datetime import datetime
+from .cache import user_cache
+
+
+def normalize_email(email: str) -> str:
+    """The form emails are matched in: surrounding whitespace removed, lowercased."""
+    return email.strip().lower()
 
 
 class User(Document):
@@ -12,9 +19,36 @@ class User(Document):
     email: str = Field(..., description="User's email address")
     profile_url: Optional[str] = Field(None, description="URL to user's profile picture")
     created_at: datetime = Field(default_factory=datetime.now, description="Timestamp when user was created")
+    membership_version: int = Field(0, description="Bumped whenever the user's workspace memberships change")
+    normalized_email: Optional[str] = Field(None, description="normalize_email(email), unique; what lookups by email match")
     
     class Settings:
         name = "users"  # MongoDB collection name
+        indexes = [
+            # Partial, so users stored before the field existed don't collide on null
+            # until backfill_normalized_emails has filled it in
+            IndexModel(
+                [("normalized_email", 1)],
+                unique=True,
+                partialFilterExpression={"normalized_email": {"$type": "string"}},
+                name="unique_normalized_email"
+            )
+        ]
+    
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def set_normalized_email(self):
+        """Keep normalized_email in step with email on writes through the document."""
+        self.normalized_email = normalize_email(self.email)
+    
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_cached_user(self):
+        """
+        Drop this user from the authentication cache after any write through the document.
+        Writes that bypass the document (User.find(...).update(...), raw pymongo)
+        must call user_cache.invalidate themselves.
+        """
+        if self.id is not None:
+            user_cache.invalidate(str(self.id))
         
     class Config:
         json_schema_extra = {
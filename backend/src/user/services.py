@@ -1,5 +1,11 @@
 from fastapi import HTTPException, status
-from .schema import User
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from .schema import User, normalize_email
+
+
+# Users updated per bulk write when backfilling normalized emails
+BACKFILL_BATCH_SIZE = 1000
 
 
 async def check_user_exists(email: str) -> User:
@@ -18,7 +24,7 @@ async def check_user_exists(email: str) -> User:
             - 500: Internal server error
     """
     try:
-        user = await User.find_one(User.email == email)
+        user = await User.find_one(User.normalized_email == normalize_email(email))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -34,3 +40,48 @@ async def check_user_exists(email: str) -> User:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to check user existence: {str(e)}"
         )
+
+
+async def backfill_normalized_emails() -> int:
+    """
+    Fill in normalized_email for users stored before the field existed, so
+    lookups by email find them. Runs once at startup; later writes keep the
+    field up to date.
+    
+    A user whose normalized email is already taken (the same address stored
+    with different case) is left without one and reported: it can no longer
+    be found by email, and the duplicate must be merged by hand.
+    
+    Returns:
+        int: Number of users backfilled
+    """
+    collection = User.get_pymongo_collection()
+    backfilled = 0
+    duplicates = []
+    
+    async def flush(user_ids, operations):
+        nonlocal backfilled
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            backfilled += result.modified_count
+        except BulkWriteError as e:
+            backfilled += e.details.get("nModified", 0)
+            duplicates.extend(user_ids[error["index"]] for error in e.details.get("writeErrors", []))
+    
+    user_ids, operations = [], []
+    async for raw in collection.find({"normalized_email": {"$not": {"$type": "string"}}}, {"email": 1}):
+        user_ids.append(raw["_id"])
+        operations.append(UpdateOne(
+            {"_id": raw["_id"]},
+            {"$set": {"normalized_email": normalize_email(raw.get("email") or "")}}
+        ))
+        if len(operations) >= BACKFILL_BATCH_SIZE:
+            await flush(user_ids, operations)
+            user_ids, operations = [], []
+    if operations:
+        await flush(user_ids, operations)
+    
+    if duplicates:
+        print(f"⚠️ {len(duplicates)} users share an email with another user and were not backfilled: "
+              f"{', '.join(str(user_id) for user_id in duplicates[:20])}")
+    return backfilled
@@ -9,7 +9,7 @@ from src.user.services import check_user_exists
 from ..auth.services import get_current_user, current_active_user
 from .schema import Workspace, WorkspaceMember
 from .models import CreateWorkspaceRequest, AddMemberRequest, UpdateWorkspaceRequest, WorkspaceResponse
-from .services import get_user_role_in_workspace, check_user_already_member, UserRole
+from .services import bump_membership_versions, get_user_role_in_workspace, check_user_already_member, UserRole
 
 
 router = APIRouter(prefix="/workspace", tags=["workspace"])
@@ -256,6 +256,7 @@ async def delete_workspace(
         
         # Delete the workspace
         await workspace.delete()
+        await bump_membership_versions([member.user_id.ref.id for member in workspace.members])
         
         # Return 204 No Content status (successful deletion)
         return
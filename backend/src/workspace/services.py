@@ -1,9 +1,12 @@
 from fastapi import HTTPException, status
 from beanie import PydanticObjectId
-from typing import Optional, Literal
+from beanie.operators import In, Inc
+from typing import Any, Dict, List, Optional, Literal
 from enum import Enum
 
 from .schema import Workspace
+from src.auth.tokens import current_workspace_claims
+from src.user.cache import user_cache
 from src.user.schema import User
 
 
@@ -12,6 +15,63 @@ class UserRole(str, Enum):
     MEMBER = "member"
 
 
+# Role codes in token claims, kept short since the token travels with every request
+ROLE_CLAIM_CODES = {UserRole.ADMIN: "a", UserRole.MEMBER: "m"}
+CLAIM_CODE_ROLES = {code: role for role, code in ROLE_CLAIM_CODES.items()}
+
+# Workspaces embedded in a token; membership in others is checked in the database
+MAX_CLAIMED_WORKSPACES = 100
+
+
+async def workspace_role_claims(user: User) -> Dict[str, Any]:
+    """
+    Build the workspace claims of a token: ``ws`` maps workspace IDs to role
+    codes, ``mv`` is the user's membership version they were read at.
+    
+    The version is read (with the user) before the memberships, so a change
+    racing with the login leaves the token with an outdated version and its
+    roles unused.
+    """
+    workspaces = await Workspace.find({"members.user_id.$id": user.id}).limit(MAX_CLAIMED_WORKSPACES).to_list()
+    roles = {}
+    for workspace in workspaces:
+        for member in workspace.members:
+            if member.user_id.ref.id == user.id:
+                roles[str(workspace.id)] = ROLE_CLAIM_CODES[UserRole.ADMIN if member.is_admin else UserRole.MEMBER]
+    return {"ws": roles, "mv": user.membership_version}
+
+
+def claimed_workspace_role(workspace_id: str, user_id: str) -> Optional[UserRole]:
+    """
+    The user's role in a workspace according to the current request's token,
+    or None if the token cannot tell (no current claims, or a workspace the
+    user may have joined since the token was issued).
+    """
+    claims = current_workspace_claims.get()
+    if claims is None or claims.user_id != user_id:
+        return None
+    return CLAIM_CODE_ROLES.get(claims.roles.get(workspace_id))
+
+
+async def bump_membership_versions(user_ids: List[PydanticObjectId]) -> None:
+    """
+    Invalidate the workspace claims in the tokens of users who lost access.
+    
+    Must be called after a member is removed, an admin is demoted or a
+    workspace is deleted. Additions and promotions need no bump: a workspace
+    missing from the claims falls back to the database, and an outdated
+    "member" claim never grants more than the user now has. Other processes
+    see the new version once their cached copy of the user expires
+    (USER_CACHE_TTL).
+    """
+    if not user_ids:
+        return
+    await User.find(In(User.id, user_ids)).update(Inc({User.membership_version: 1}))
+    # A bulk update bypasses the document event hooks
+    for user_id in user_ids:
+        user_cache.invalidate(str(user_id))
+
+
 async def get_user_role_in_workspace(workspace_id: str, user_id: str) -> UserRole:
     """
     Get the role of a user in a workspace.
@@ -28,7 +88,50 @@ async def get_user_role_in_workspace(workspace_id: str, user_id: str) -> UserRol
             - 400: Invalid workspace ID format
             - 404: Workspace not found or user not found in workspace
             - 500: Internal server error
+    
+    With WORKSPACE_ROLE_CLAIMS, the role is answered from the request's token
+    when its claims are current, without loading the workspace.
+    """
+    role = await _find_user_role(workspace_id, user_id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User is not a member of this workspace"
+        )
+    return role
+
+
+async def check_workspace_access(
+    workspace_id: str,
+    user_id: str,
+    detail: str = "You don't have access to this workspace"
+) -> UserRole:
+    """
+    Like get_user_role_in_workspace, but a user who is not a member gets 403
+    with ``detail`` (the connections API's semantics) instead of 404.
+    
+    Raises:
+        HTTPException: 
+            - 400: Invalid workspace ID format
+            - 403: User is not a member of the workspace
+            - 404: Workspace not found
+            - 500: Internal server error
     """
+    role = await _find_user_role(workspace_id, user_id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+    return role
+
+
+async def _find_user_role(workspace_id: str, user_id: str) -> Optional[UserRole]:
+    """The user's role in the workspace (from the token's claims if current), None if not a member."""
+    role = claimed_workspace_role(workspace_id, user_id)
+    if role is not None:
+        return role
+    
     try:
         # Convert workspace_id to ObjectId
         workspace_object_id = PydanticObjectId(workspace_id)
@@ -55,11 +158,7 @@ async def get_user_role_in_workspace(workspace_id: str, user_id: str) -> UserRol
             if member.user_id.ref.id == user_object_id:
                 return UserRole.ADMIN if member.is_admin else UserRole.MEMBER
         
-        # User not found in workspace
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User is not a member of this workspace"
-        )
+        return None
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+# Settings are read from the environment (or .env) on first import; the tests
+# need no real credentials
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("GOOGLE_OAUTH_CLIENT_ID", "test-client-id")
+os.environ.setdefault("GOOGLE_OAUTH_CLIENT_SECRET", "test-client-secret")
+os.environ.setdefault("GOOGLE_OAUTH_REDIRECT_URI", "http://localhost:3000/callback")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
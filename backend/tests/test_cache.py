@@ -0,0 +1,69 @@
+import pytest
+
+from src.connections.cache import QueryResultCache, is_cacheable_statement
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id, name FROM users WHERE id = 1",
+    "  with recent as (select * from orders) select count(*) from recent",
+    "DESCRIBE users",
+    "desc users",
+    "EXPLAIN SELECT * FROM users",
+    "SHOW CREATE TABLE users",
+    "show full columns from users",
+    "SHOW INDEX FROM users",
+    "show tables",
+    "SELECT 'now()' AS label, `update` FROM t",
+])
+def test_repeatable_reads_are_cacheable(sql):
+    assert is_cacheable_statement(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SHOW PROCESSLIST",
+    "show full processlist",
+    "SHOW GLOBAL STATUS",
+    "SHOW ENGINE INNODB STATUS",
+    "SHOW VARIABLES LIKE 'max%'",
+    "SHOW SLAVE STATUS",
+    "EXPLAIN ANALYZE SELECT * FROM users",
+    "SELECT NOW()",
+    "SELECT * FROM users FOR UPDATE",
+    "WITH d AS (SELECT 1) DELETE FROM users",
+    "UPDATE users SET name = 'x'",
+])
+def test_volatile_or_writing_statements_are_not_cacheable(sql):
+    assert not is_cacheable_statement(sql)
+
+
+def make_cache() -> QueryResultCache:
+    return QueryResultCache(max_bytes=1 << 20, ttl=60, max_entry_bytes=1 << 16)
+
+
+def test_schema_version_is_part_of_the_key():
+    cache = make_cache()
+    key = cache.make_key("connection", "SELECT * FROM users", 1, "ndjson")
+    cache.put(key, [b'{"id":1}\n'], row_count=1)
+
+    # Same statement, modulo whitespace and the trailing semicolon, at the same version
+    assert cache.get(cache.make_key("connection", "SELECT *\n  FROM users;", 1, "ndjson")) is not None
+    # After a refresh bumped the schema version the old entry no longer matches
+    assert cache.get(cache.make_key("connection", "SELECT * FROM users", 2, "ndjson")) is None
+    # Nor does another format or connection
+    assert cache.get(cache.make_key("connection", "SELECT * FROM users", 1, "arrow")) is None
+    assert cache.get(cache.make_key("other", "SELECT * FROM users", 1, "ndjson")) is None
+
+
+def test_schema_refresh_invalidation_frees_only_that_connection():
+    cache = make_cache()
+    for connection_id in ("connection", "other"):
+        for version in (1, 2):
+            cache.put(cache.make_key(connection_id, "SELECT 1", version, "ndjson"), [b"1\n"], row_count=1)
+
+    assert cache.invalidate_connection("connection") == 2
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 4
+    assert stats["invalidations"] == 2
+    assert cache.get(cache.make_key("other", "SELECT 1", 2, "ndjson")) is not None
@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from src.connections.governor import QueryGovernor, QueryPriority
+
+pytestmark = pytest.mark.anyio
+
+
+def make_governor(slots: int = 1, **overrides) -> QueryGovernor:
+    settings = dict(
+        max_running=slots,
+        max_per_connection=slots,
+        max_per_workspace=slots,
+        max_queued=100,
+        queue_timeout=5,
+        statement_timeout=0,
+    )
+    settings.update(overrides)
+    return QueryGovernor(**settings)
+
+
+async def admit_in_order(governor: QueryGovernor, requests, granted: list) -> list:
+    """Queue (label, workspace, priority) requests one after another; each records its label when admitted."""
+    async def run(label, workspace_id, priority):
+        ticket = await governor.admit(f"{workspace_id}-connection", workspace_id, "user", priority)
+        granted.append(label)
+        governor.release(ticket)
+
+    tasks = []
+    for request in requests:
+        tasks.append(asyncio.create_task(run(*request)))
+        await asyncio.sleep(0)  # enqueue in this order
+    return tasks
+
+
+async def test_interactive_query_overtakes_queued_exports():
+    governor = make_governor()
+    running = await governor.admit("c", "w", "user", QueryPriority.EXPORT)
+    granted = []
+    tasks = await admit_in_order(governor, [
+        ("export-1", "w", QueryPriority.EXPORT),
+        ("export-2", "w", QueryPriority.EXPORT),
+        ("export-3", "w", QueryPriority.EXPORT),
+        ("interactive", "w", QueryPriority.INTERACTIVE),
+    ], granted)
+
+    governor.release(running)
+    await asyncio.gather(*tasks)
+    assert granted[0] == "interactive"
+    assert granted[1:] == ["export-1", "export-2", "export-3"]
+
+
+async def test_interactive_queries_get_several_turns_per_background_refresh():
+    governor = make_governor()
+    # The slot is held by another workspace, so w's class flows start even
+    running = await governor.admit("c", "other", "user")
+    granted = []
+    requests = [(f"background-{i}", "w", QueryPriority.BACKGROUND) for i in range(2)]
+    requests += [(f"interactive-{i}", "w", QueryPriority.INTERACTIVE) for i in range(10)]
+    tasks = await admit_in_order(governor, requests, granted)
+
+    governor.release(running)
+    await asyncio.gather(*tasks)
+    # Weights 8:1: the first refresh finishes its turn with the eighth interactive
+    # query (queued earlier, it wins the tie), the second only after all ten
+    assert granted.index("background-0") == 7
+    assert granted[-1] == "background-1"
+
+
+async def test_light_workspace_is_not_stuck_behind_a_flooding_one():
+    governor = make_governor()
+    running = await governor.admit("c", "heavy", "user")
+    granted = []
+    requests = [(f"heavy-{i}", "heavy", QueryPriority.INTERACTIVE) for i in range(10)]
+    requests.append(("light", "light", QueryPriority.INTERACTIVE))
+    tasks = await admit_in_order(governor, requests, granted)
+
+    governor.release(running)
+    await asyncio.gather(*tasks)
+    # Served after at most one query of the competing workspace
+    assert granted.index("light") <= 1
+
+
+async def test_priority_does_not_buy_a_larger_share_across_workspaces():
+    governor = make_governor()
+    running = await governor.admit("c", "a", "user")
+    granted = []
+    requests = []
+    for i in range(4):
+        requests.append((f"a-interactive-{i}", "a", QueryPriority.INTERACTIVE))
+        requests.append((f"b-export-{i}", "b", QueryPriority.EXPORT))
+    tasks = await admit_in_order(governor, requests, granted)
+
+    governor.release(running)
+    await asyncio.gather(*tasks)
+    # Workspaces alternate turns regardless of their queries' classes
+    workspaces = [label[0] for label in granted]
+    assert all(workspaces[i] != workspaces[i + 1] for i in range(len(workspaces) - 1))
+
+
+async def test_full_queue_is_rejected_with_429():
+    governor = make_governor(max_queued=1)
+    running = await governor.admit("c", "w", "user")
+    waiting = asyncio.create_task(governor.admit("c", "w", "user"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as error:
+        await governor.admit("c", "w", "user")
+    assert error.value.status_code == 429
+
+    governor.release(running)
+    governor.release(await waiting)
+
+
+async def test_queue_timeout_is_503_and_frees_the_queue():
+    governor = make_governor(queue_timeout=0.05)
+    running = await governor.admit("c", "w", "user")
+
+    with pytest.raises(HTTPException) as error:
+        await governor.admit("c", "w", "user")
+    assert error.value.status_code == 503
+    assert governor.stats()["queued"] == 0
+
+    governor.release(running)
+    assert governor.stats()["running"] == 0
+
+
+class FakeStream:
+    row_count = 0
+
+    def __init__(self):
+        self.cancel_calls = 0
+
+    def cancel(self) -> bool:
+        self.cancel_calls += 1
+        return False
+
+
+async def test_cancel_before_attach_stops_the_query_at_attach():
+    governor = make_governor(statement_timeout=30)
+    ticket = await governor.admit("c", "w", "user")
+    assert governor.cancel(ticket, "cancelled") is True
+
+    stream = FakeStream()
+    with pytest.raises(HTTPException) as error:
+        governor.attach(ticket, stream)
+    assert error.value.status_code == 499
+    assert ticket._timeout_handle is None
+
+    await asyncio.sleep(0.01)  # the kill runs on a worker thread
+    assert stream.cancel_calls == 1
+    governor.release(ticket)
+
+
+async def test_statement_timeout_cancels_with_504():
+    governor = make_governor(statement_timeout=0.01)
+    ticket = await governor.admit("c", "w", "user")
+    stream = FakeStream()
+    governor.attach(ticket, stream)
+
+    await asyncio.sleep(0.05)
+    assert ticket.cancel_reason == "timeout"
+    assert stream.cancel_calls == 1
+    assert governor.cancelled_error(ticket).status_code == 504
+    governor.release(ticket)
@@ -0,0 +1,123 @@
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import get_settings
+from src.auth.http import http_client
+from src.auth.services import exchange_code_for_token, fetch_google_user_profile
+
+pytestmark = pytest.mark.anyio
+
+# Client (host, port) of every request the stub served; one port per connection
+client_addresses = []
+
+
+async def token_endpoint(request: Request) -> JSONResponse:
+    client_addresses.append(request.client)
+    form = await request.form()
+    if form["code"] == "bad-code":
+        return JSONResponse({"error": "invalid_grant"}, status_code=400)
+    return JSONResponse({"access_token": f"stub-{form['code']}", "expires_in": 3599, "token_type": "Bearer"})
+
+
+async def userinfo_endpoint(request: Request) -> JSONResponse:
+    client_addresses.append(request.client)
+    if request.headers.get("Authorization") != "Bearer stub-good-code":
+        return JSONResponse({"error": "invalid_token"}, status_code=401)
+    return JSONResponse({
+        "given_name": "Ada",
+        "family_name": "Lovelace",
+        "email": "ada@example.com",
+        "picture": "https://example.com/ada.png",
+    })
+
+
+stub_app = Starlette(routes=[
+    Route("/token", token_endpoint, methods=["POST"]),
+    Route("/userinfo", userinfo_endpoint),
+])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=free_port(), log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{server.config.port}"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+async def google_urls(stub_url, monkeypatch):
+    """Point the OAuth endpoints at ``base_url`` (the stub by default) through settings."""
+    def point_at(base_url: str = stub_url) -> None:
+        monkeypatch.setenv("GOOGLE_OAUTH_TOKEN_URL", f"{base_url}/token")
+        monkeypatch.setenv("GOOGLE_OAUTH_USERINFO_URL", f"{base_url}/userinfo")
+        get_settings.cache_clear()
+
+    point_at()
+    client_addresses.clear()
+    await http_client.close()
+    yield point_at
+    await http_client.close()
+    monkeypatch.undo()
+    get_settings.cache_clear()
+
+
+async def login(code: str) -> dict:
+    access_token = await exchange_code_for_token(code, "client-id", "client-secret", "http://localhost/callback")
+    return await fetch_google_user_profile(access_token)
+
+
+async def test_login_calls_share_one_pooled_connection(google_urls):
+    requests_before = http_client.stats()["requests"]
+
+    for _ in range(3):
+        profile = await login("good-code")
+        assert profile["email"] == "ada@example.com"
+
+    assert http_client.stats()["requests"] == requests_before + 6
+    assert len(client_addresses) == 6
+    assert len(set(client_addresses)) == 1
+
+
+async def test_rejected_code_is_400(google_urls):
+    with pytest.raises(HTTPException) as error:
+        await exchange_code_for_token("bad-code", "client-id", "client-secret", "http://localhost/callback")
+    assert error.value.status_code == 400
+    assert "invalid_grant" in error.value.detail
+
+
+async def test_rejected_access_token_is_400(google_urls):
+    with pytest.raises(HTTPException) as error:
+        await fetch_google_user_profile("expired-token")
+    assert error.value.status_code == 400
+
+
+async def test_unreachable_google_is_502(google_urls):
+    google_urls(f"http://127.0.0.1:{free_port()}")
+
+    with pytest.raises(HTTPException) as error:
+        await exchange_code_for_token("good-code", "client-id", "client-secret", "http://localhost/callback")
+    assert error.value.status_code == 502
+
+    with pytest.raises(HTTPException) as error:
+        await fetch_google_user_profile("stub-good-code")
+    assert error.value.status_code == 502
@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+from src.connections.pagination import (
+    KEYSET,
+    OFFSET,
+    build_page_query,
+    decode_cursor,
+    encode_cursor,
+    next_page_cursor,
+)
+from src.connections.schema import ColumnSchema, ConnectionTable
+
+
+def make_table(name: str, columns: list, primary: tuple = ()) -> ConnectionTable:
+    return ConnectionTable.model_construct(
+        key=f"app.{name}",
+        name=name,
+        database_schema="app",
+        columns=[ColumnSchema(name=column, type="int", isPrimary=column in primary) for column in columns],
+    )
+
+
+@pytest.fixture
+def database():
+    """SQLite stand-in for MySQL: the generated SQL (backticks, LIMIT/OFFSET, row comparisons) runs as is."""
+    connection = sqlite3.connect(":memory:")
+    connection.execute("ATTACH DATABASE ':memory:' AS app")
+    yield connection
+    connection.close()
+
+
+def fill(database, name: str, columns: list, rows: list) -> None:
+    database.execute(f"CREATE TABLE app.{name} ({', '.join(columns)})")
+    database.executemany(f"INSERT INTO app.{name} VALUES ({', '.join('?' for _ in columns)})", rows)
+
+
+def browse(database, table: ConnectionTable, limit: int) -> list:
+    """Follow cursors from the first page to the last; returns the pages of rows."""
+    pages, cursor = [], None
+    while True:
+        sql, params, strategy = build_page_query(table, cursor, limit)
+        rows = database.execute(sql.replace("%s", "?"), params).fetchall()
+        pages.append(rows[:limit])
+        cursor = next_page_cursor(table, strategy, rows, limit, cursor)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("row_count, limit, expected_pages", [
+    (0, 3, 1),   # empty table: one empty page, no cursor
+    (1, 1, 1),
+    (6, 3, 2),   # exact multiple: the last page is full and has no cursor
+    (7, 3, 3),   # one row spills over
+    (5, 10, 1),
+])
+def test_keyset_pages_cover_every_row_once(database, row_count, limit, expected_pages):
+    fill(database, "users", ["id", "name"], [(i * 10, f"user{i}") for i in range(row_count)])
+    table = make_table("users", ["id", "name"], primary=("id",))
+
+    pages = browse(database, table, limit)
+
+    assert len(pages) == expected_pages
+    assert [row for page in pages for row in page] == [(i * 10, f"user{i}") for i in range(row_count)]
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_composite_key_pages_across_duplicate_leading_values(database):
+    # Pages end in the middle of a run of equal leading key values
+    rows = [(tenant, item, f"{tenant}-{item}") for tenant in (1, 2, 3) for item in range(5)]
+    fill(database, "items", ["tenant", "item", "label"], list(reversed(rows)))
+    table = make_table("items", ["tenant", "item", "label"], primary=("tenant", "item"))
+
+    pages = browse(database, table, limit=4)
+
+    assert [row for page in pages for row in page] == rows
+    assert [len(page) for page in pages] == [4, 4, 4, 3]
+
+
+def test_keyset_cursor_holds_the_last_key_of_the_page(database):
+    fill(database, "users", ["id"], [(i,) for i in range(5)])
+    table = make_table("users", ["id"], primary=("id",))
+
+    sql, params, strategy = build_page_query(table, None, 2)
+    rows = database.execute(sql.replace("%s", "?"), params).fetchall()
+
+    assert strategy == KEYSET
+    assert decode_cursor(next_page_cursor(table, strategy, rows, 2, None)) == (KEYSET, [1])
+
+
+def test_table_without_primary_key_pages_by_offset(database):
+    fill(database, "events", ["payload"], [(f"event{i}",) for i in range(7)])
+    table = make_table("events", ["payload"])
+
+    pages = browse(database, table, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sorted(row for page in pages for row in page) == sorted((f"event{i}",) for i in range(7))
+    assert build_page_query(table, None, 3)[2] == OFFSET
+
+
+def test_binary_key_values_round_trip():
+    cursor = encode_cursor(KEYSET, [b"\x00\xff", 7])
+    assert decode_cursor(cursor) == (KEYSET, [b"\x00\xff", 7])
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor(OFFSET, [10]),          # offset cursor on a keyed table
+    encode_cursor(KEYSET, [1, 2]),        # wrong number of key values
+    "not-a-cursor",
+])
+def test_foreign_or_malformed_cursors_are_rejected(cursor):
+    table = make_table("users", ["id"], primary=("id",))
+    with pytest.raises(ValueError):
+        build_page_query(table, cursor, 10)
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from src.connections.results import ResultStore
+
+pytestmark = pytest.mark.anyio
+
+# One BIGINT column, as a MySQL cursor describes it
+DESCRIPTION = [("id", 8, None, None, None, None, 1, 0, 63)]
+BATCHES = 10
+BATCH_ROWS = 1000
+
+
+class FakeStream:
+    """An opened async query stream of BATCHES batches of BATCH_ROWS integers."""
+
+    connection_id = "connection"
+    description = DESCRIPTION
+    columns = [{"name": "id", "type": "bigint"}]
+
+    def __init__(self):
+        self.cancelled = False
+        self.closed_failed = False
+
+    async def __aiter__(self):
+        for batch in range(BATCHES):
+            # Lets concurrent materializations interleave, as network reads would
+            await asyncio.sleep(0)
+            yield [(batch * BATCH_ROWS + row,) for row in range(BATCH_ROWS)]
+
+    async def cancel(self) -> bool:
+        self.cancelled = True
+        return True
+
+    async def close(self, failed: bool = False) -> None:
+        self.closed_failed = failed
+
+
+@pytest.fixture
+async def result_size(tmp_path) -> int:
+    """Size on disk of one materialized FakeStream result."""
+    store = ResultStore(str(tmp_path / "sizing"), max_bytes=10**9, ttl=60)
+    result = await store.materialize_async(FakeStream(), "user")
+    return result.size
+
+
+def make_store(tmp_path, max_bytes: int) -> ResultStore:
+    return ResultStore(str(tmp_path / "results"), max_bytes=max_bytes, ttl=60)
+
+
+async def test_result_larger_than_the_budget_is_413_and_killed(tmp_path, result_size):
+    store = make_store(tmp_path, result_size // 2)
+    stream = FakeStream()
+
+    with pytest.raises(HTTPException) as error:
+        await store.materialize_async(stream, "user")
+
+    assert error.value.status_code == 413
+    assert stream.cancelled and stream.closed_failed
+    assert store.stats()["inFlightBytes"] == 0
+    assert not list((tmp_path / "results").iterdir())
+
+
+async def test_results_being_written_count_against_the_budget(tmp_path, result_size):
+    store = make_store(tmp_path, result_size * 3 // 2)
+    streams = [FakeStream(), FakeStream()]
+
+    outcomes = await asyncio.gather(
+        *(store.materialize_async(stream, "user") for stream in streams),
+        return_exceptions=True
+    )
+
+    rejected = [outcome for outcome in outcomes if isinstance(outcome, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 507
+    assert sum(stream.cancelled for stream in streams) == 1
+
+    stats = store.stats()
+    assert stats["results"] == 1
+    assert stats["inFlightBytes"] == 0
+    assert stats["bytes"] <= stats["maxBytes"]
+
+
+async def test_writing_evicts_least_recently_read_results(tmp_path, result_size):
+    store = make_store(tmp_path, result_size * 3 // 2)
+    first = await store.materialize_async(FakeStream(), "user")
+
+    second = await store.materialize_async(FakeStream(), "user")
+
+    assert store.get(first.id) is None
+    assert store.get(second.id) is not None
+    assert store.stats()["evictions"] == 1
+    assert store.read_window(second, BATCH_ROWS * BATCHES - 2, 10).column("id").to_pylist() == [9998, 9999]
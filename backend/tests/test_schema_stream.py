@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.connections import schema_stream
+from src.connections.schema import SchemaStatus, TableSchema
+from src.connections.schema_stream import (
+    decode_schema_cursor,
+    encode_schema_stream,
+    schema_stream_events,
+    schema_stream_finished,
+)
+
+pytestmark = pytest.mark.anyio
+
+CONNECTION = SimpleNamespace(id="connection")
+KEYS = ["app.orders", "app.users", "billing.invoices"]
+
+
+class StoredTable:
+    def __init__(self, key: str):
+        self.key = key
+
+    def to_table_schema(self) -> TableSchema:
+        database, name = self.key.split(".", 1)
+        return TableSchema(name=name, database_schema=database, columns=[])
+
+
+@pytest.fixture(autouse=True)
+def stored_schema(monkeypatch):
+    """Three stored tables at schema version 3."""
+    state = SimpleNamespace(schemaStatus=SchemaStatus.READY, schemaVersion=3, tableCount=len(KEYS))
+
+    async def get_schema_state(connection_id):
+        return state
+
+    async def get_connection_tables(connection_id, after=None, limit=None):
+        keys = [key for key in KEYS if after is None or key > after]
+        return [StoredTable(key) for key in keys[:limit]]
+
+    monkeypatch.setattr(schema_stream, "get_schema_state", get_schema_state)
+    monkeypatch.setattr(schema_stream, "get_connection_tables", get_connection_tables)
+    return state
+
+
+async def collect(resume_after=None) -> list:
+    return [event async for event in schema_stream_events(CONNECTION, resume_after)]
+
+
+async def test_done_carries_the_final_cursor_as_its_id():
+    events = await collect()
+
+    assert [event for event, _, _ in events] == ["meta", "table", "table", "table", "done"]
+    _, done_id, done = events[-1]
+    assert done_id == done["cursor"]
+    assert decode_schema_cursor(done_id) == (3, "billing.invoices")
+
+    body = b"".join([chunk async for chunk in encode_schema_stream(iter_events(events), "sse")])
+    assert body.split(b"\n\n")[-2].startswith(b"event: done\nid: " + done_id.encode())
+
+
+async def test_resuming_from_the_final_cursor_sends_no_table():
+    assert await schema_stream_finished(CONNECTION, (3, "billing.invoices"))
+    assert not await schema_stream_finished(CONNECTION, (3, "app.users"))
+
+    events = await collect((3, "billing.invoices"))
+    assert [event for event, _, _ in events] == ["meta", "done"]
+    assert events[0][2]["resumed"] is True
+
+
+async def test_cursor_of_an_older_version_starts_over(stored_schema):
+    stored_schema.schemaVersion = 4
+
+    assert not await schema_stream_finished(CONNECTION, (3, "billing.invoices"))
+    events = await collect((3, "billing.invoices"))
+    assert events[0][2]["resumed"] is False
+    assert len([event for event, _, _ in events if event == "table"]) == len(KEYS)
+
+
+async def iter_events(events):
+    for event in events:
+        yield event
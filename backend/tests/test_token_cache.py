@@ -0,0 +1,90 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from jwt import ExpiredSignatureError
+
+from src.auth import services, tokens
+from src.auth.tokens import VerifiedTokenCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The token cache's clock, set by hand; starts at the real time."""
+    now = SimpleNamespace(value=time.time())
+    monkeypatch.setattr(tokens, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def cache(monkeypatch) -> VerifiedTokenCache:
+    """A fresh cache behind decode_jwt_token."""
+    fresh = VerifiedTokenCache(max_entries=10)
+    monkeypatch.setattr(services, "verified_tokens", fresh)
+    return fresh
+
+
+def make_token(expires_in: float) -> str:
+    return jwt.encode(
+        {"user_id": "user", "roles": {"workspace": "o"}, "exp": int(time.time() + expires_in)},
+        services.SECRET_KEY,
+        algorithm=services.ALGORITHM
+    )
+
+
+def test_cached_token_expires_exactly_at_exp(clock):
+    cache = VerifiedTokenCache(max_entries=10)
+    digest = cache.digest("token")
+    cache.put(digest, {"user_id": "user", "exp": 1000})
+
+    clock.value = 999.5
+    assert cache.get(digest) == {"user_id": "user", "exp": 1000}
+
+    clock.value = 1000
+    with pytest.raises(ExpiredSignatureError):
+        cache.get(digest)
+    # The expired entry is dropped; the next lookup is a plain miss
+    assert cache.get(digest) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = VerifiedTokenCache(max_entries=10)
+    digest = cache.digest("token")
+    cache.put(digest, {"user_id": "user"})
+    assert cache.get(digest) is None
+
+
+def test_decode_skips_verification_until_the_token_expires(cache, clock, monkeypatch):
+    token = make_token(expires_in=60)
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(services.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or real_decode(*args, **kwargs))
+
+    first = services.decode_jwt_token(token)
+    second = services.decode_jwt_token(token)
+    assert first == second
+    assert len(decodes) == 1
+
+    clock.value += 61
+    with pytest.raises(ExpiredSignatureError):
+        services.decode_jwt_token(token)
+    assert cache.stats()["expirations"] == 1
+
+
+def test_callers_cannot_change_cached_claims(cache):
+    token = make_token(expires_in=60)
+
+    verified = services.decode_jwt_token(token)
+    verified["user_id"] = "someone-else"
+    verified["roles"]["workspace"] = "a"
+
+    cached = services.decode_jwt_token(token)
+    assert cached == {"user_id": "user", "roles": {"workspace": "o"}, "exp": cached["exp"]}
+    cached["user_id"] = "someone-else"
+    with pytest.raises(TypeError):
+        cached["roles"]["workspace"] = "a"
+    assert services.decode_jwt_token(token)["user_id"] == "user"
@@ -0,0 +1,114 @@
+import asyncio
+import copy
+import os
+from typing import Optional
+
+import pytest
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pydantic import BaseModel, Field, create_model
+from pymongo.errors import DuplicateKeyError
+
+from src.user import crud
+from src.user.schema import User, UserCreate
+
+pytestmark = pytest.mark.anyio
+
+# Case and whitespace variants of one email, as different providers and clients send it
+EMAILS = ["ada@example.com", "Ada@Example.com", " ADA@example.com ", "ada@EXAMPLE.COM"]
+
+
+def profile(email: str, first_name: str = "Ada") -> UserCreate:
+    return UserCreate(first_name=first_name, last_name="Lovelace", email=email)
+
+
+class FakeUsersCollection:
+    """
+    The users collection with its unique normalized_email index, in memory.
+
+    An upsert checks for a match and inserts after yielding to the event loop,
+    so concurrent upserts race like they can on a server, and the losers get
+    the DuplicateKeyError the unique index raises.
+    """
+
+    def __init__(self):
+        self.documents = []
+
+    def _match(self, query: dict) -> Optional[dict]:
+        for document in self.documents:
+            if all(document.get(field) == value for field, value in query.items()):
+                return copy.deepcopy(document)
+        return None
+
+    async def find_one(self, query: dict) -> Optional[dict]:
+        return self._match(query)
+
+    async def find_one_and_update(self, query: dict, update: dict, upsert: bool = False, return_document=None):
+        existing = self._match(query)
+        if existing is not None or not upsert:
+            return existing
+        await asyncio.sleep(0)
+        document = {"_id": ObjectId(), **query, **update.get("$setOnInsert", {})}
+        if any(other["normalized_email"] == document["normalized_email"] for other in self.documents):
+            raise DuplicateKeyError("E11000 duplicate key error index: unique_normalized_email")
+        self.documents.append(document)
+        return copy.deepcopy(document)
+
+
+@pytest.fixture
+def users(monkeypatch) -> FakeUsersCollection:
+    """
+    Run get_or_create_user against FakeUsersCollection. Beanie documents need a
+    database to be constructed, so the user model is stood in for by a plain
+    pydantic model with the same fields.
+    """
+    collection = FakeUsersCollection()
+    fields = {
+        name: (field.annotation, field)
+        for name, field in User.model_fields.items()
+        if name not in ("id", "revision_id")
+    }
+    StandInUser = create_model(
+        "StandInUser",
+        __base__=BaseModel,
+        id=(Optional[PydanticObjectId], Field(None, alias="_id")),
+        **fields
+    )
+    StandInUser.get_pymongo_collection = staticmethod(lambda: collection)
+    monkeypatch.setattr(crud, "User", StandInUser)
+    return collection
+
+
+async def test_concurrent_first_logins_create_one_user(users):
+    created = await asyncio.gather(*(crud.get_or_create_user(profile(email)) for email in EMAILS * 5))
+
+    assert len(users.documents) == 1
+    assert {user.id for user in created} == {users.documents[0]["_id"]}
+    assert users.documents[0]["normalized_email"] == "ada@example.com"
+
+
+async def test_later_logins_keep_the_stored_profile(users):
+    first = await crud.get_or_create_user(profile("Ada@Example.com"))
+    again = await crud.get_or_create_user(profile("ada@example.com", first_name="Augusta"))
+
+    assert again.id == first.id
+    assert again.first_name == "Ada"
+    assert again.email == "Ada@Example.com"
+
+
+@pytest.mark.skipif(not os.environ.get("MONGO_TEST_URI"), reason="MONGO_TEST_URI is not set")
+async def test_concurrent_first_logins_create_one_user_on_mongodb():
+    import motor.motor_asyncio
+    from beanie import init_beanie
+
+    client = motor.motor_asyncio.AsyncIOMotorClient(os.environ["MONGO_TEST_URI"])
+    database_name = f"meruem_test_{ObjectId()}"
+    try:
+        await init_beanie(database=client[database_name], document_models=[User])
+
+        created = await asyncio.gather(*(crud.get_or_create_user(profile(email)) for email in EMAILS * 5))
+
+        assert len({user.id for user in created}) == 1
+        assert await User.find(User.normalized_email == "ada@example.com").count() == 1
+    finally:
+        await client.drop_database(database_name)